@@ -80,15 +80,13 @@ def benchmark_cluster(benchmark_df, unp):
     # Generate CA matrices
     unp_cluster.ca_distance(PATH_SAVE_CA)
 
-    # Cluster
+    # Cluster. Representative chains of each conformer are selected too, see
+    # unp_cluster.representatives
     unp_cluster.cluster(
         path_save_dd_matx=PATH_SAVE_DD_MATXS,
         path_save_cluster_results=PATH_SAVE_CLUSTER_RESULTS,
     )
 
-    # Post-processing
-    # unp_cluster.select_representatives()
-
     """
     To render CA distance difference maps, dendrograms and swarm plots, uncomment
     the lines between:
@@ -0,0 +1,351 @@
+"""
+Runs conformational state clustering for many UniProt segments in a single long-lived
+process. Segments are read from a manifest of UniProt accessions, paths to updated
+mmCIF files and chain IDs, and spread over a pool of worker processes. Each segment is
+clustered independently: a failing segment is logged and recorded in the summary
+report, without stopping the rest of the batch.
+
+Manifests are CSV or JSONL files with one record per mmCIF file:
+
+    UNP_ACC,MMCIF_PATH,CHAIN_IDS
+    O34926,/path/to/3nc3_updated.cif,A B
+    O34926,/path/to/3nc5_updated.cif,A B
+    P15291,/path/to/2fy7_updated.cif,A
+
+    {"UNP_ACC": "O34926", "MMCIF_PATH": "/path/to/3nc3_updated.cif", "CHAIN_IDS": ["A", "B"]}
+
+Chain IDs are space-separated in CSV manifests and either a list or a space-separated
+string in JSONL manifests.
+"""
+
+# Third party imports
+import json
+import logging
+from pathlib import Path, PosixPath
+from time import perf_counter
+
+from pandas import DataFrame, read_csv
+
+# Custom imports
+from . import cluster_monomers
+from .utils import parallel_utils
+
+logger = logging.getLogger(__name__)
+
+# Fields of each manifest record
+MANIFEST_COLUMNS = ["UNP_ACC", "MMCIF_PATH", "CHAIN_IDS"]
+
+# Columns of the batch summary report
+SUMMARY_COLUMNS = [
+    "UNP_ACC",
+    "NUM_STRUCTURES",
+    "NUM_CHAINS",
+    "NUM_CONFORMERS",
+    "STATUS",
+    "ERROR",
+    "RUNTIME_S",
+]
+
+# Segments run by a worker before it is replaced, bounding memory growth over long
+# batches while keeping imports and process startup amortised
+SEGMENTS_PER_WORKER = 100
+
+
+def load_manifest(path: "PosixPath|str") -> "dict[str, dict[str, list[str]]]":
+    """
+    Reads a CSV or JSONL manifest into the input of
+    cluster_monomers.ClusterConformations() for each UniProt segment. Records for the
+    same accession and mmCIF file are merged, preserving the order of first appearance.
+
+    :param path: Path to manifest, with suffix .csv or .jsonl
+    :type path: PosixPath|str
+    :raises ValueError: Unknown manifest format or missing fields
+    :return: mmCIF paths and chain IDs (as accepted by ClusterConformations), keyed by
+        UniProt accession
+    :rtype: dict[str, dict[str, list[str]]]
+    """
+
+    path = Path(path)
+
+    if path.suffix == ".csv":
+        records = read_csv(path, dtype=str, keep_default_na=False).to_dict("records")
+    elif path.suffix in (".jsonl", ".json"):
+        with open(path) as manifest_file:
+            records = [json.loads(line) for line in manifest_file if line.strip()]
+    else:
+        raise ValueError(
+            f"Manifest {path} must be a CSV (.csv) or JSON Lines (.jsonl) file"
+        )
+
+    segments = {
+        # "O34926" : {"/path/3nc3_updated.cif" : ["A", "B"], ...},
+        # ...
+    }
+
+    for line_num, record in enumerate(records, start=1):
+        missing = [field for field in MANIFEST_COLUMNS if field not in record]
+        if missing:
+            raise ValueError(f"Record {line_num} of {path} is missing fields {missing}")
+
+        chain_ids = record["CHAIN_IDS"]
+        if isinstance(chain_ids, str):
+            chain_ids = chain_ids.split()
+
+        mmcifs_and_chains = segments.setdefault(record["UNP_ACC"], {})
+        chains = mmcifs_and_chains.setdefault(str(record["MMCIF_PATH"]), [])
+        chains.extend(chain for chain in chain_ids if chain not in chains)
+
+    logger.info(f"Loaded {len(segments)} UniProt segments from {path}")
+
+    return segments
+
+
+def run_segment(
+    unp: str,
+    mmcifs_and_chains: "dict[str, list[str]]",
+    path_ca: PosixPath,
+    path_clusters: PosixPath,
+    path_dd: PosixPath = None,
+    nproc: int = 1,
+    force: bool = False,
+    archive: bool = False,
+    alignment: str = "dense",
+    dd_mode: str = "all",
+    dd_min_score: float = None,
+    representative_mode: str = "medoid",
+) -> dict:
+    """
+    Generates CA distance matrices and clusters the chains of a single UniProt
+    segment. Any exception raised is caught, logged and reported in the returned
+    summary, so one segment cannot end a batch.
+
+    :param unp: UniProt accession
+    :type unp: str
+    :param mmcifs_and_chains: Paths to updated mmCIF files (keys) and the desired
+        chains (values), as for cluster_monomers.ClusterConformations()
+    :type mmcifs_and_chains: dict[str, list[str]]
+    :param path_ca: Path to save CA distance matrices
+    :type path_ca: PosixPath
+    :param path_clusters: Path to save clustering results
+    :type path_clusters: PosixPath
+    :param path_dd: Path to save distance difference matrices, defaults to None
+    :type path_dd: PosixPath, optional
+    :param nproc: Maximum number of processes within the segment, defaults to 1
+    :type nproc: int, optional
+    :param force: Force regeneration of all matrices, defaults to False
+    :type force: bool, optional
+    :param archive: Save matrices in one matrix archive per segment, defaults to False
+    :type archive: bool, optional
+    :param alignment: Residue alignment of CA distance matrices, as for
+        cluster_monomers.ClusterConformations(), defaults to "dense"
+    :type alignment: str, optional
+    :param dd_mode: Distance difference matrices to save, as for
+        cluster_monomers.ClusterConformations.cluster(), defaults to "all"
+    :type dd_mode: str, optional
+    :param dd_min_score: Lowest score of pairs saved if dd_mode="score", defaults to
+        None
+    :type dd_min_score: float, optional
+    :param representative_mode: Representative chain flagged for each conformer, as
+        for cluster_monomers.ClusterConformations.cluster(), defaults to "medoid"
+    :type representative_mode: str, optional
+    :return: Summary of the segment, with keys SUMMARY_COLUMNS
+    :rtype: dict
+    """
+
+    summary = {
+        "UNP_ACC": unp,
+        "NUM_STRUCTURES": len(mmcifs_and_chains),
+        "NUM_CHAINS": sum(len(chains) for chains in mmcifs_and_chains.values()),
+        "NUM_CONFORMERS": 0,
+        "STATUS": "success",
+        "ERROR": "",
+    }
+
+    start = perf_counter()
+    unp_cluster = None
+    try:
+        # Before any matrices are generated
+        cluster_monomers.check_cluster_modes(dd_mode, dd_min_score, representative_mode)
+
+        unp_cluster = cluster_monomers.ClusterConformations(
+            unp=unp,
+            mmcifs_and_chains=mmcifs_and_chains,
+            nproc=nproc,
+            force=force,
+            archive=archive,
+            alignment=alignment,
+        )
+
+        unp_cluster.ca_distance(path_ca)
+        unp_cluster.cluster(
+            path_save_dd_matx=path_dd,
+            path_save_cluster_results=path_clusters,
+            dd_mode=dd_mode,
+            dd_min_score=dd_min_score,
+            representative_mode=representative_mode,
+        )
+
+        summary["NUM_CONFORMERS"] = unp_cluster.cluster_df["CONFORMER_ID"].nunique()
+
+    except Exception as error:
+        logger.error(f"Clustering failed for {unp}", exc_info=True)
+        summary["STATUS"] = "failed"
+        summary["ERROR"] = f"{type(error).__name__}: {error}"
+
+    finally:
+        if unp_cluster is not None:
+            unp_cluster.close()
+
+    summary["RUNTIME_S"] = round(perf_counter() - start, 3)
+
+    return summary
+
+
+def _run_segment_task(task: "tuple[str, dict, dict]") -> dict:
+    """
+    Unpacks a task submitted to the batch pool and runs the segment.
+    """
+
+    unp, mmcifs_and_chains, kwargs = task
+
+    return run_segment(unp, mmcifs_and_chains, **kwargs)
+
+
+def run_batch(
+    segments: "dict[str, dict[str, list[str]]]",
+    path_ca: PosixPath,
+    path_clusters: PosixPath,
+    path_dd: PosixPath = None,
+    nproc: int = None,
+    force: bool = False,
+    archive: bool = False,
+    alignment: str = "dense",
+    dd_mode: str = "all",
+    dd_min_score: float = None,
+    representative_mode: str = "medoid",
+    path_summary: PosixPath = None,
+) -> DataFrame:
+    """
+    Clusters every UniProt segment in a batch. Segments are spread over a pool of
+    worker processes, largest first, each clustered serially within its worker. If
+    only one process is used (single segment or nproc=1), segments run in this process
+    and may plan their own worker pools, up to nproc.
+
+    :param segments: Segments to cluster, as returned by load_manifest()
+    :type segments: dict[str, dict[str, list[str]]]
+    :param path_ca: Path to save CA distance matrices, in a subdirectory per UniProt
+        accession
+    :type path_ca: PosixPath
+    :param path_clusters: Path to save clustering results
+    :type path_clusters: PosixPath
+    :param path_dd: Path to save distance difference matrices, in a subdirectory per
+        UniProt accession, defaults to None
+    :type path_dd: PosixPath, optional
+    :param nproc: Maximum number of processes, defaults to None (all available cores)
+    :type nproc: int, optional
+    :param force: Force regeneration of all matrices, defaults to False
+    :type force: bool, optional
+    :param archive: Save matrices in one matrix archive per segment, defaults to False
+    :type archive: bool, optional
+    :param alignment: Residue alignment of CA distance matrices, as for
+        cluster_monomers.ClusterConformations(), defaults to "dense"
+    :type alignment: str, optional
+    :param dd_mode: Distance difference matrices to save, as for
+        cluster_monomers.ClusterConformations.cluster(), defaults to "all"
+    :type dd_mode: str, optional
+    :param dd_min_score: Lowest score of pairs saved if dd_mode="score", defaults to
+        None
+    :type dd_min_score: float, optional
+    :param representative_mode: Representative chain flagged for each conformer, as
+        for cluster_monomers.ClusterConformations.cluster(), defaults to "medoid"
+    :type representative_mode: str, optional
+    :param path_summary: Path (including file name) to save the summary report as CSV,
+        defaults to None
+    :type path_summary: PosixPath, optional
+    :raises ValueError: Invalid modes, as raised by
+        cluster_monomers.check_cluster_modes(), before any segment is clustered
+    :return: Summary report, one row per segment in manifest order
+    :rtype: pandas.DataFrame
+    """
+
+    cluster_monomers.check_cluster_modes(dd_mode, dd_min_score, representative_mode)
+
+    num_workers = min(
+        nproc or parallel_utils.available_cores(), parallel_utils.available_cores()
+    )
+    num_workers = max(1, min(num_workers, len(segments)))
+
+    # Largest segments first, as scoring grows with the square of the chain count
+    unps = sorted(
+        segments,
+        key=lambda unp: sum(len(chains) for chains in segments[unp].values()),
+        reverse=True,
+    )
+
+    # Workers of the batch pool cannot start pools of their own
+    kwargs = {
+        "path_clusters": path_clusters,
+        "nproc": 1 if num_workers > 1 else nproc,
+        "force": force,
+        "archive": archive,
+        "alignment": alignment,
+        "dd_mode": dd_mode,
+        "dd_min_score": dd_min_score,
+        "representative_mode": representative_mode,
+    }
+
+    # Matrices are saved per segment, as chains of chimeric entries are listed under
+    # several accessions and their files are named by chain only
+    tasks = [
+        (
+            unp,
+            segments[unp],
+            dict(
+                kwargs,
+                path_ca=Path(path_ca).joinpath(unp),
+                path_dd=Path(path_dd).joinpath(unp) if path_dd else None,
+            ),
+        )
+        for unp in unps
+    ]
+
+    logger.info(
+        f"Clustering {len(segments)} UniProt segments on {num_workers} processes"
+    )
+
+    summaries = {}
+    if num_workers > 1:
+        pool = parallel_utils.make_pool(
+            num_workers, maxtasksperchild=SEGMENTS_PER_WORKER
+        )
+        try:
+            for summary in pool.imap_unordered(_run_segment_task, tasks):
+                summaries[summary["UNP_ACC"]] = summary
+                logger.info(
+                    f"Finished {summary['UNP_ACC']} ({summary['STATUS']}), "
+                    f"{len(summaries)}/{len(tasks)} segments done"
+                )
+        finally:
+            pool.close()  # Marks the pool as closed.
+            pool.join()  # Waits for workers to exit.
+    else:
+        for task in tasks:
+            summary = _run_segment_task(task)
+            summaries[summary["UNP_ACC"]] = summary
+
+    summary_df = DataFrame(
+        [summaries[unp] for unp in segments], columns=SUMMARY_COLUMNS
+    )
+
+    num_failed = (summary_df["STATUS"] == "failed").sum()
+    logger.info(
+        f"Batch done: {len(summary_df) - num_failed} segments clustered, "
+        f"{num_failed} failed"
+    )
+
+    if path_summary:
+        Path(path_summary).parent.mkdir(exist_ok=True, parents=True)
+        summary_df.to_csv(path_summary, index=False)
+        logger.info(f"Batch summary saved to {path_summary}")
+
+    return summary_df
@@ -11,14 +11,32 @@ distance difference maps.
 """
 
 # Third-party modules
+from heapq import heappush, heappushpop
+
 import seaborn as sns
 from matplotlib.axes import Axes
 from matplotlib.figure import Figure
-from numpy import column_stack, ndarray, zeros
-from scipy.cluster.hierarchy import dendrogram
+from numpy import (
+    asarray,
+    column_stack,
+    count_nonzero,
+    flatnonzero,
+    float64,
+    full,
+    intp,
+    ndarray,
+    triu_indices,
+    unique,
+    zeros,
+)
+from scipy.cluster.hierarchy import dendrogram, linkage
+from scipy.spatial.distance import squareform
 from sklearn.cluster import AgglomerativeClustering
 
-from cluster_conformers.utils.linear_algebra_utils import upper_triangle
+from cluster_conformers.utils.linear_algebra_utils import (
+    condensed_index,
+    upper_triangle,
+)
 
 
 def make_linkage_matx(model: AgglomerativeClustering) -> "ndarray[any, float]":
@@ -50,52 +68,163 @@ def make_linkage_matx(model: AgglomerativeClustering) -> "ndarray[any, float]":
     return linkage_matrix
 
 
+def cut_tree(children: ndarray, n_clusters: int) -> ndarray:
+    """
+    Cuts a hierarchical clustering tree into a given number of clusters, by undoing
+    the last (highest) n_clusters - 1 merges. Labels are assigned in the same order as
+    Scikit-learn's AgglomerativeClustering.
+
+    :param children: Children of each non-leaf node, as
+        AgglomerativeClustering.children_
+    :type children: np.ndarray
+    :param n_clusters: Number of clusters, between 1 and the number of leaves
+    :type n_clusters: int
+    :return: Cluster label of each leaf
+    :rtype: np.ndarray
+    """
+
+    n_leaves = children.shape[0] + 1
+
+    # Cluster roots, as a max-heap of node indices. The highest node is split into its
+    # children until there are n_clusters roots
+    roots = [-(n_leaves + children.shape[0] - 1)]
+    for _ in range(n_clusters - 1):
+        node_children = children[-roots[0] - n_leaves]
+        heappush(roots, -node_children[0])
+        heappushpop(roots, -node_children[1])
+
+    node_labels = full(2 * n_leaves - 1, -1, dtype=intp)
+    for label, node in enumerate(roots):
+        node_labels[-node] = label
+
+    # Pass labels down from each root to its descendants, highest merge first
+    for merge in range(children.shape[0] - 1, -1, -1):
+        label = node_labels[n_leaves + merge]
+        if label >= 0:
+            for child in children[merge]:
+                if node_labels[child] < 0:
+                    node_labels[child] = label
+
+    return node_labels[:n_leaves]
+
+
+class AgglomerativeTree:
+    """
+    UPGMA tree fitted to a score matrix and cut into clusters. Holds the attributes of
+    a fitted Scikit-learn AgglomerativeClustering model used in this package
+    (children_, distances_, labels_, n_clusters_, n_leaves_ and distance_threshold),
+    so it can be used in place of one.
+    """
+
+    def __init__(
+        self,
+        linkage_matx: "ndarray[any, float]",
+        labels: ndarray,
+        distance_threshold: float = 0,
+    ) -> None:
+        """
+        Constructor -- wraps a linkage matrix and the cluster labels cut from it.
+
+        :param linkage_matx: Linkage matrix, as returned by
+            scipy.cluster.hierarchy.linkage()
+        :type linkage_matx: np.ndarray[any, float]
+        :param labels: Cluster label of each leaf
+        :type labels: np.ndarray
+        :param distance_threshold: Distance at which the tree was cut, defaults to 0
+        :type distance_threshold: float, optional
+        """
+
+        self.children_ = linkage_matx[:, :2].astype(intp)
+        self.distances_ = linkage_matx[:, 2]
+        self.labels_ = labels
+        self.n_clusters_ = int(labels.max()) + 1
+        self.n_leaves_ = labels.shape[0]
+        self.distance_threshold = distance_threshold
+
+
 def cluster_agglomerative(
     score_matx: "ndarray[any, float]", cutoff: float = None
-) -> AgglomerativeClustering:
+) -> "tuple[AgglomerativeTree, ndarray[any, float]]":
     """
     Performs the agglormerative (bottom up) clustering algorithm on a given score
-    matrix.
-
-    :param score_matx: N*N-square, symmetric matrix of scores used for clustering.
+    matrix. The full UPGMA tree is built once, directly from the condensed scores,
+    and, if a cutoff is parsed, cut at that fraction of its height. Trees and labels
+    are identical to those of Scikit-learn's AgglomerativeClustering(
+    linkage="average", metric="precomputed").
+
+    :param score_matx: Condensed scores (upper triangle, as returned by
+        scipy.spatial.distance.pdist()) or N*N-square, symmetric matrix of scores used
+        for clustering.
     :type score_matx: ndarray[any, float]
-    :param cutoff: Threshold below which to begin defining groups as clusters, defaults
-        to None
+    :param cutoff: Threshold below which to begin defining groups as clusters, as a
+        fraction of the highest merge distance, defaults to None
     :type cutoff: float, optional
-    :return: Scikit-learn Agglomerative model fitted to input data.
-    :rtype: sklearn.cluster.AgglomerativeClustering
+    :return: Tree fitted to input data, with labels from the cut, and its linkage
+        matrix.
+    :rtype: tuple[AgglomerativeTree, ndarray[any, float]]
     """
 
-    # Get the cutoff
-    model = AgglomerativeClustering(
-        n_clusters=None,  # Force function to fix number of clusters
-        distance_threshold=0,
-        metric="precomputed",  # Force to use score matrix
-        linkage="average",  # UPGMA
-        compute_distances=True,
-    )
+    scores = asarray(score_matx, dtype=float64)
+    if scores.ndim == 2:
+        scores = squareform(scores, checks=False)
 
-    # Repeat but cluster based on parsed cutoff
-    if cutoff:
+    # UPGMA
+    linkage_matx = linkage(scores, method="average")
 
-        # Fit score matrix to model
-        model = model.fit(score_matx)
-        linkage_matx = make_linkage_matx(model)
+    # Cut the tree where merges are at or above the cutoff, as fitting
+    # AgglomerativeClustering with distance_threshold=cutoff would
+    threshold = cutoff * linkage_matx[:, 2].max() if cutoff else 0
+    n_clusters = count_nonzero(linkage_matx[:, 2] >= threshold) + 1
+    labels = cut_tree(linkage_matx[:, :2].astype(intp), n_clusters)
 
-        cutoff *= linkage_matx[:, 2].max()
+    return AgglomerativeTree(linkage_matx, labels, threshold), linkage_matx
 
-        model = AgglomerativeClustering(
-            n_clusters=None,
-            distance_threshold=cutoff,
-            metric="precomputed",
-            linkage="average",
-            compute_distances=True,
-        )
 
-    # Fit score matrix to model
-    model = model.fit(score_matx)
+def cluster_medoids(
+    score_matx: "ndarray[any, float]", labels: ndarray, tiebreak: ndarray = None
+) -> ndarray:
+    """
+    Medoid of each cluster: the member with the lowest sum of scores to the other
+    members. Ties are broken by the highest tiebreak value, if parsed, then by the
+    first member. Only the scores within each cluster are read, so a cluster of k
+    chains costs O(k^2).
+
+    :param score_matx: Condensed scores (upper triangle, as returned by
+        scipy.spatial.distance.pdist()) or N*N-square, symmetric matrix of scores
+    :type score_matx: ndarray[any, float]
+    :param labels: Cluster label of each chain
+    :type labels: np.ndarray
+    :param tiebreak: Secondary ranking of each chain, higher preferred, e.g. the
+        number of residues observed, defaults to None
+    :type tiebreak: np.ndarray, optional
+    :return: Index of the medoid of each cluster, in order of cluster label
+    :rtype: np.ndarray
+    """
+
+    scores = asarray(score_matx, dtype=float64)
+    if scores.ndim == 2:
+        scores = squareform(scores, checks=False)
+
+    labels = asarray(labels)
+    medoids = []
+    for label in unique(labels):
+        members = flatnonzero(labels == label)
 
-    return model
+        # Square score submatrix of the cluster
+        rows, columns = triu_indices(members.shape[0], k=1)
+        sub_matx = zeros((members.shape[0], members.shape[0]))
+        sub_matx[rows, columns] = scores[
+            condensed_index(labels.shape[0], members[rows], members[columns])
+        ]
+        score_sums = sub_matx.sum(axis=0) + sub_matx.sum(axis=1)
+
+        candidates = members[score_sums == score_sums.min()]
+        if tiebreak is not None:
+            medoids.append(candidates[asarray(tiebreak)[candidates].argmax()])
+        else:
+            medoids.append(candidates[0])
+
+    return asarray(medoids, dtype=intp)
 
 
 def plot_dendrogram(
@@ -169,15 +298,19 @@ def plot_swarmplot(scores: ndarray, axis) -> "tuple[Figure, Axes]":
     values of the data will correspond to their y-values. Their position along the
     x-axis is irrelevant as they're all identical.
 
-    :param scores: Matrix of GLOCON scores.
-    :type scores: Iterable
+    :param scores: Condensed or square matrix of GLOCON scores.
+    :type scores: np.ndarray
     :param axis: Matplotlib axis to plot the swarm plot on.
     :type axis: Axes
     :return: Figure and axis objects containing the plotted swarm plot
     :rtype: tuple(matplotlib.figure.Figure, matplotlib.axes.Axes)
     """
+    # Condensed scores are plotted as they are
+    if scores.ndim == 2:
+        scores = upper_triangle(scores)
+
     # Plot the data
-    sns.swarmplot(data=upper_triangle(scores), ax=axis, size=5)  # vmax=max_dist ,
+    sns.swarmplot(data=scores, ax=axis, size=5)  # vmax=max_dist ,
 
     # Add some formatting
     axis.set_ylabel("GLOCON score (\u212B)")
@@ -4,7 +4,7 @@ The class here performs clustering on a set of parsed chains.
 
 # Third party imports
 from logging import getLogger
-from multiprocessing import Pool
+from multiprocessing.pool import Pool
 from pathlib import PosixPath
 
 import numpy as np
@@ -13,19 +13,37 @@ from matplotlib import use as mpl_use
 from pandas import DataFrame
 
 # Custom imports -- peptide_analysis
-from . import cluster_chains, distance_differences
+from . import cluster_chains
 
 # Custom imports -- utils
 from .utils import (
     appearance_utils,
+    archive_utils,
+    cache_utils,
     download_utils,
     io_utils,
     linear_algebra_utils,
+    parallel_utils,
     parsing_utils,
+    shared_memory_utils,
 )
 
 # Global variable
 CLUSTERING_CUTOFF_PC = 0.7
+
+# Distance difference matrices saved by cluster(): all pairs, pairs of conformer
+# representatives (as flagged in the results), pairs scoring at least a threshold, or
+# none
+DD_SAVE_MODES = ("all", "representatives", "score", "none")
+
+# Residue alignment of CA distance matrices: all UniProt residues from 1, with NaN for
+# those not observed, compared on the leading residues of both chains; or observed
+# residues only, compared on the UniProt residues observed in both chains
+ALIGNMENT_MODES = ("dense", "sparse")
+
+# Representative chain of each conformer: the medoid of its scores, the chain nearest
+# the element-wise median of its CA distance matrices, or none
+REPRESENTATIVE_MODES = ("medoid", "median", "none")
 logger = getLogger(__name__)
 mpl_use("AGG")  # Lighter-weight Matplotlib backend
 
@@ -54,8 +72,10 @@ class ClusterConformations:
         unp: str,
         mmcifs_and_chains: "dict[str, list[str] ]",
         path_save_alphafold: PosixPath = None,
-        nproc: int = 10,  # max 10 chosen based on benchmarking results
+        nproc: int = None,
         force: bool = False,
+        archive: bool = False,
+        alignment: str = "dense",
     ) -> None:
         """
         Constructor -- setup object.
@@ -69,12 +89,30 @@ class ClusterConformations:
         :param path_save_alphafold: Path to save downloaded AlphaFold structre, acting
             as a flag to include it in clustering or not, defaults to None
         :type path_save_alphafold: PosixPath, optional
-        :param nproc: Number of processes to use for multiprocessing, defaults to 10
+        :param nproc: Maximum number of processes to use for multiprocessing. The number
+            used for each stage is planned from the estimated work, defaults to None
+            (all available cores)
         :type nproc: int, optional
         :param force: Force re-generation of all matrices, defaults to False
         :type force: bool, optional
+        :param archive: Save CA distance matrices, UniProt residue IDs and distance
+            difference matrices in one matrix archive per directory
+            (archive_utils.MatrixArchive), rather than one file each, defaults to False
+        :type archive: bool, optional
+        :param alignment: Residue alignment of CA distance matrices, one of
+            ALIGNMENT_MODES. "sparse" matrices only hold observed residues, so chains
+            covering a short region of a long protein are compared at the cost of
+            their overlap. Scores are the same in either mode, defaults to "dense"
+        :type alignment: str, optional
+        :raises ValueError: Unknown alignment
         """
 
+        if alignment not in ALIGNMENT_MODES:
+            raise ValueError(
+                f"Unknown residue alignment {alignment}, expected one of "
+                f"{ALIGNMENT_MODES}"
+            )
+
         self.unp = unp  # UniProt accession
 
         self.mmcif_paths = {  # Paths to mmCIFs
@@ -158,16 +196,14 @@ class ClusterConformations:
 
                 # Storing the start-end UniProt residue indices for protein-superpose
                 self.af_unp_range = (
-                    min(afdb_mmcif["unp_res_ids"]),
-                    max(afdb_mmcif["unp_res_ids"]),
+                    int(afdb_mmcif["unp_res_ids"].min()),
+                    int(afdb_mmcif["unp_res_ids"].max()),
                 )
 
-        # Number of threads for multiprocessing. Only use 1 if few unique chains
-        if len(self.pdbe_chain_ids) > 20:  # 20 chains = 190 dd_matrices
-            self.nproc = nproc
-        else:
-            self.nproc = 1
-        logger.debug(f"Using {self.nproc} threads")
+        # Upper limit on processes for multiprocessing. The number used by each stage
+        # (self.nproc) is planned by _plan_workers() from the estimated work
+        self.max_nproc = nproc
+        self.nproc = 1
 
         # Regenerate matrices if already present, defaul=False
         self.force = force
@@ -179,8 +215,89 @@ class ClusterConformations:
         # Convert to Numpy array for performance improvement
         self.pdbe_chain_ids = np.asarray(self.pdbe_chain_ids)
 
+        # Process pool shared by ca_distance() and cluster(), created on first use
+        self._pool = None
+        self._pool_size = 0
+
+        # Matrix archives, opened by ca_distance() and cluster() if archive=True
+        self.archive = archive
+        self.ca_archive = None
+        self.dd_archive = None
+
+        self.alignment = alignment
+
+    def _plan_workers(self, stage: str, work: float, num_tasks: int) -> None:
+        """
+        Sets the number of processes (self.nproc) for a stage of the pipeline from its
+        estimated serial runtime, the available cores and self.max_nproc.
+
+        :param stage: Name of the stage, for logging
+        :type stage: str
+        :param work: Estimated serial runtime of the stage in seconds
+        :type work: float
+        :param num_tasks: Number of independent tasks in the stage
+        :type num_tasks: int
+        """
+
+        self.nproc = parallel_utils.plan_workers(
+            work, num_tasks, max_workers=self.max_nproc
+        )
+
+        logger.info(
+            f"{stage}: {num_tasks} tasks, estimated {work:.2f} s of work, running "
+            + (f"on {self.nproc} processes" if self.nproc > 1 else "serially")
+            + f" ({parallel_utils.available_cores()} cores available, "
+            f"limit {self.max_nproc or 'none'})"
+        )
+
+    def _get_pool(self) -> Pool:
+        """
+        Returns the process pool of the object, creating it on first use so that CA
+        matrix generation and scoring run on the same worker processes. The pool is
+        only restarted if a later stage is planned to use more processes.
+
+        :return: Pool of at least self.nproc worker processes
+        :rtype: multiprocessing.Pool
+        """
+
+        if self._pool is not None and self._pool_size < self.nproc:
+            self._close_pool()
+
+        if self._pool is None:
+            logger.debug(f"Starting pool of {self.nproc} processes")
+            self._pool = parallel_utils.make_pool(self.nproc)
+            self._pool_size = self.nproc
+
+        return self._pool
+
+    def _close_pool(self) -> None:
+        """
+        Shuts down the process pool of the object, if one was started.
+        """
+
+        if self._pool is not None:
+            self._pool.close()  # Marks the pool as closed.
+            self._pool.join()  # Waits for workers to exit.
+            self._pool = None
+            self._pool_size = 0
+
+    def close(self) -> None:
+        """
+        Shuts down the process pool of the object, if one was started, and closes any
+        matrix archives. Called at the end of cluster(), but should be called directly
+        if cluster() is not run after ca_distance().
+        """
+
+        self._close_pool()
+
+        for archive in (self.ca_archive, self.dd_archive):
+            if archive is not None:
+                archive.close()
+        self.ca_archive = None
+        self.dd_archive = None
+
     def remove_entry_matxs(
-        self, pdb_ids: "set[str]", path_ca: PosixPath, path_dd: PosixPath
+        self, pdb_ids: "set[str]", path_ca: PosixPath, path_dd: PosixPath = None
     ):
         """
         Function to remove all CA and distance difference matrices for a given set of
@@ -188,13 +305,32 @@ class ClusterConformations:
         the archive, rendering their CA and distance difference matrices invalid.
         Removing them here will ensure that they are re-generated during the rest of the
         pipeline.
+
+        Updated entries are also detected by ca_distance() from its cache manifest, so
+        this is only needed to discard matrices unconditionally. If archive=True, the
+        entries' records are removed from the matrix archives instead.
         """
 
+        if self.archive:
+            for path_archive in (
+                archive_utils.ca_archive_path(path_ca, self.unp),
+                archive_utils.dd_archive_path(path_dd, self.unp) if path_dd else None,
+            ):
+                if path_archive is None or not path_archive.exists():
+                    continue
+
+                with archive_utils.MatrixArchive(path_archive) as archive:
+                    for key in archive.keys():
+                        if any(pdb_id in key for pdb_id in pdb_ids):
+                            logger.debug(f"Removing {key} from {path_archive}")
+                            archive.delete(key)
+            return
+
         # Remove CA and DD matrices
         for pdb_id in pdb_ids:
             # Define expression for deletion
-            path_ca_matx = path_ca.glob(f"{pdb_id}*.npz")
-            path_dd_matx = path_dd.glob(f"{self.unp}*{pdb_id}*.npz")
+            path_ca_matx = path_ca.glob(f"{pdb_id}*.np[yz]")
+            path_dd_matx = path_dd.glob(f"{self.unp}*{pdb_id}*.npz") if path_dd else []
 
             # Delete files
             logger.debug(
@@ -206,245 +342,703 @@ class ClusterConformations:
                         logger.debug(f"Removing {file}")
                         file.unlink()
 
-    def _generate_ca_matx(self, pdbe_chain_id: str) -> "tuple[dict]":
-        """
-        Method for calculating and saving the CA distance matrix for a given PDB-chain
-        ID string.
-
-        :return: tuple of dictionaries to send to fields in the ClusterConformers object
-        :rtype: _type_
-        """
-        # Path to save (or already saved) CA matrix
-        path_save_this_ca_matx = self.path_save_base_ca.joinpath(
-            f"{pdbe_chain_id}_ca_distance_matrix"
-        )
-
-        # Path to save serialist list of
-        path_save_this_unp = self.path_save_unps.joinpath(f"{pdbe_chain_id}.pickle")
-
-        # Check if the file already exists
-        if not path_save_this_ca_matx.with_suffix(".npz").exists() or self.force:
-
-            pdbe_chain_id_split = pdbe_chain_id.split("_")
-            # Extract x, y, z, and UNP index info from mmCIF/chain
-            mmcif = io_utils.load_mmcif(self.mmcif_paths[pdbe_chain_id_split[0]])
-            xyz_unp_dict = parsing_utils.parse_mmcif(mmcif, pdbe_chain_id_split[1])
-
-            # Serialise the unimputed array of UniProt residue indices
-            io_utils.serial_dump(xyz_unp_dict["unp_res_ids"], path_save_this_unp)
-
-            # Make square CA matrix
-            xyz_unp_dict = parsing_utils.fill_missing_unps(xyz_unp_dict)
-            ca_matx = linear_algebra_utils.generate_ca_matx(
-                xyz_unp_dict["cartn_x"],
-                xyz_unp_dict["cartn_y"],
-                xyz_unp_dict["cartn_z"],
-            )
-
-            # Write matrix file if specified
-            io_utils.save_compressed_matrix(ca_matx, path_save_this_ca_matx)
-            logger.debug(
-                f"Generated CA matrix for {pdbe_chain_id}, saved to {path_save_this_ca_matx}"
-            )
-
-        else:
-            logger.debug(
-                f"CA matrix for {pdbe_chain_id} already exists, skipping generation"
-            )
-
-        return {  # UniProt residue ID list
-            pdbe_chain_id: path_save_this_unp
-        }, {  # Path to saved CA matrix
-            pdbe_chain_id: path_save_this_ca_matx.with_suffix(".npz")
-        }
-
-    def ca_distance(self, path_save: PosixPath = None) -> None:
+    def ca_distance(
+        self, path_save: PosixPath = None, updated_entries: "set[str]" = None
+    ) -> None:
         """
         Calculates a pairwise CA distance matrix for all parsed mmCIF/chains. Stores
         a reference to matrices in dictionary and saves matrix files if path provided.
         Can be called as a public method to generate CA distance matrices.
 
+        Saved matrices are recorded in a cache manifest, with the hash of the CA atoms
+        they were generated from. Matrices are reused while their mmCIF file is
+        unchanged (same size and modification time). Otherwise the file is parsed and
+        only chains whose CA atoms changed are regenerated.
+
+        If archive=True, matrices and UniProt residue IDs are saved in the matrix
+        archive of the segment in path_save, as "ca/<pdbe_chain_id>" and
+        "unp/<pdbe_chain_id>", rather than as files.
+
         :param path_save: Path to save CA distance matrices, defaults to None
         :type path_save: PosixPath, optional
+        :param updated_entries: PDBe IDs of entries to parse and check against the
+            cache manifest even if their mmCIF files appear unchanged, defaults to None
+        :type updated_entries: set[str], optional
         """
 
         self.ca_matxs = {  # CA distance matrices. Ordered
             # "1atp_A" : path (as pathlib.PosixPath) to serilised np.ndarray(...) file,
             # "2adp_B" : path (as pathlib.PosixPath) to serilised np.ndarray(...) file,
             # ...
+            # or keys in self.ca_archive, "ca/1atp_A", if archive=True
         }
 
         self.unp_res_ids = {
             # "1atp_A" : path (as pathlib.PosixPath) to serilised np.array(),
             # "2adp_B" : path (as pathlib.PosixPath) to serilised np.array(),
             # ...
+            # or keys in self.ca_archive, "unp/1atp_A", if archive=True
         }
 
-        # Dir to save the raw UniProt residue IDs as 1D np.array()s
-        self.path_save_unps = path_save.joinpath("unp_residue_ids")
-        self.path_save_unps.mkdir(exist_ok=True, parents=True)
-
         self.path_save_base_ca = path_save
 
+        if self.archive:
+            path_save.mkdir(exist_ok=True, parents=True)
+            self.path_save_unps = None
+            if self.ca_archive is not None:
+                self.ca_archive.close()
+            self.ca_archive = archive_utils.MatrixArchive(
+                archive_utils.ca_archive_path(path_save, self.unp)
+            )
+        else:
+            # Dir to save the raw UniProt residue IDs as 1D np.array()s
+            self.path_save_unps = path_save.joinpath("unp_residue_ids")
+            self.path_save_unps.mkdir(exist_ok=True, parents=True)
+
+        self.cache_manifest = cache_utils.CacheManifest(
+            path_save.joinpath(f"{self.unp}{cache_utils.CACHE_MANIFEST_SUFFIX}")
+        )
+        updated_entries = set(updated_entries or [])
+
         # Track progress
         logger.info("Calculating CA distance matrices...")
 
-        # # Generate CA matrices from loaded mmCIF files if force=True parsed
-        pool = Pool(processes=self.nproc)
-        try:
-            results = pool.map(self._generate_ca_matx, self.pdbe_chain_ids)
+        # One task per mmCIF file, covering all of its chains which cannot be reused
+        # from the cache without parsing the file
+        tasks = []
+        for pdbe_id, chain_ids in self.chains.items():
+            mmcif_path = self.mmcif_paths[pdbe_id]
+            chains_to_check = []
+
+            for chain_id in chain_ids:
+                pdbe_chain_id = f"{pdbe_id}_{chain_id}"
+                if self.archive:
+                    self.ca_matxs[pdbe_chain_id] = f"ca/{pdbe_chain_id}"
+                    self.unp_res_ids[pdbe_chain_id] = f"unp/{pdbe_chain_id}"
+                else:
+                    self.ca_matxs[pdbe_chain_id] = path_save.joinpath(
+                        f"{pdbe_chain_id}_ca_distance_matrix.npy"
+                    )
+                    self.unp_res_ids[pdbe_chain_id] = self.path_save_unps.joinpath(
+                        f"{pdbe_chain_id}.pickle"
+                    )
 
-            for i in results:
-                self.unp_res_ids.update(i[0])
-                self.ca_matxs.update(i[1])
-        finally:
-            pool.close()  # Marks the pool as closed.
-            pool.join()  # Waits for workers to exit.
+                if (
+                    self.force
+                    or pdbe_id in updated_entries
+                    or not self._ca_matx_saved(pdbe_chain_id)
+                    or not cache_utils.ca_entry_matches_source(
+                        self.cache_manifest.ca_entry(pdbe_chain_id),
+                        chain_id,
+                        mmcif_path,
+                        self.alignment,
+                    )
+                ):
+                    chains_to_check.append(chain_id)
+                else:
+                    logger.debug(
+                        f"CA matrix for {pdbe_chain_id} is up to date, skipping "
+                        "generation"
+                    )
 
-    def _dd_matx_to_score(self, label: str) -> "dict[str: float]":
-        """
-        Function to either generate de novo or retrieve existing distance-difference
-        matrix, calculate its score and then return the result as a key-value paired
-        dictionary. The value is the score and the key is a unique label attributed to
-        the two chains contributing to the distance difference matrix.
+            if chains_to_check:
+                tasks.append(
+                    (
+                        pdbe_id,
+                        mmcif_path,
+                        chains_to_check,
+                        None if self.archive else self.path_save_base_ca,
+                        self.path_save_unps,
+                        # Entries of saved matrices only, so missing matrices
+                        # are always generated
+                        {
+                            f"{pdbe_id}_{chain_id}": self.cache_manifest.ca_entry(
+                                f"{pdbe_id}_{chain_id}"
+                            )
+                            for chain_id in chains_to_check
+                            if self._ca_matx_saved(f"{pdbe_id}_{chain_id}")
+                        },
+                        self.force,
+                        self.alignment,
+                    )
+                )
 
-        :return: _description_
-        :rtype: _type_
-        """
+        self._plan_workers(
+            "CA distance matrices",
+            parallel_utils.estimate_ca_work([task[1] for task in tasks]),
+            num_tasks=len(tasks),
+        )
 
-        label_list = label.split("_")
-        id_A = f"{label_list[1]}_{label_list[2]}"
-        id_B = f"{label_list[-2]}_{label_list[-1]}"
+        if self.nproc > 1:
+            results = self._get_pool().starmap(_generate_ca_matxs, tasks)
+        else:
+            results = [_generate_ca_matxs(*task) for task in tasks]
 
-        # Check if distance difference matrix already exists. If it does, skip
-        # and load the saved file.
-        # TODO: Make sure all data pertaining to updated models are removed
+        for ca_entries, chain_matxs in results:
+            for pdbe_chain_id, entry in ca_entries.items():
+                self.cache_manifest.record_ca(pdbe_chain_id, entry)
 
-        key = f"{label_list[1]}_{label_list[2]}_{label_list[3]}_{label_list[4]}_{label_list[5]}"
-        dd_matx_file = self.path_save_base_dd.joinpath(f"{self.unp}_{key}")
+            # Matrices returned to be archived
+            for pdbe_chain_id, (packed_ca_matx, unp_res_ids) in chain_matxs.items():
+                self.ca_archive.put(self.ca_matxs[pdbe_chain_id], packed_ca_matx)
+                self.ca_archive.put(self.unp_res_ids[pdbe_chain_id], unp_res_ids)
 
-        # Note: "dd_matx" = "distance difference matrix"
-        if not dd_matx_file.with_suffix(".npz").exists() or self.force:
+        if self.ca_archive is not None:
+            self.ca_archive.flush()
 
-            dd_matx = distance_differences.generate_matx_diff(
-                io_utils.load_matrix(self.ca_matxs[id_A]),
-                io_utils.load_matrix(self.ca_matxs[id_B]),
-                path_save=dd_matx_file,
-            )
-            logger.debug(
-                f"Generated distance difference matrix from scratch for {key}."
-                f"Saved to {dd_matx_file.with_suffix('.npz')}"
+        if tasks:
+            self.cache_manifest.save()
+
+    def _ca_matx_saved(self, pdbe_chain_id: str) -> bool:
+        """
+        Whether the CA distance matrix and UniProt residue IDs of a chain are saved,
+        as files or in the matrix archive.
+        """
+
+        if self.archive:
+            return (
+                self.ca_matxs[pdbe_chain_id] in self.ca_archive
+                and self.unp_res_ids[pdbe_chain_id] in self.ca_archive
             )
 
+        return (
+            io_utils.packed_matrix_exists(self.ca_matxs[pdbe_chain_id])
+            and self.unp_res_ids[pdbe_chain_id].exists()
+        )
+
+    def _load_clustering_inputs(
+        self, chain_indices: "list[int]"
+    ) -> "tuple[list[np.ndarray], list[np.ndarray]]":
+        """
+        Loads the CA distance matrices and UniProt residue IDs of the selected chains
+        once, so pairwise scoring does not re-read files. CA distance matrices are
+        returned packed (linear_algebra_utils.PackedTriangularMatrix) and
+        memory-mapped, unless only available in the square format of earlier versions.
+
+        :param chain_indices: Indices of the chains to load, into self.pdbe_chain_ids
+        :type chain_indices: list[int]
+        :return: Packed CA distance matrices and UniProt residue IDs for each selected
+            chain
+        :rtype: tuple[list[np.ndarray], list[np.ndarray]]
+        """
+
+        pdbe_chain_ids = self.pdbe_chain_ids[chain_indices]
+
+        if self.archive:
+            ca_matxs = [
+                self.ca_archive.get(self.ca_matxs[pdbe_chain_id])
+                for pdbe_chain_id in pdbe_chain_ids
+            ]
         else:
-            # TODO: This needs checking to see if it'll work
-            dd_matx = io_utils.load_matrix(dd_matx_file.with_suffix(".npz"))
-            logger.debug(
-                f"Loaded distance difference matrix for {key} from existing file: "
-                f"{dd_matx_file.with_suffix('.npz')}"
-            )
+            ca_matxs = [
+                io_utils.load_packed_matrix(self.ca_matxs[pdbe_chain_id], form="packed")
+                for pdbe_chain_id in pdbe_chain_ids
+            ]
+
+        return ca_matxs, self._load_unp_res_ids(chain_indices)
+
+    def _load_unp_res_ids(self, chain_indices: "list[int]") -> "list[np.ndarray]":
+        """
+        Loads the UniProt residue IDs of the selected chains, as saved by
+        ca_distance().
+
+        :param chain_indices: Indices of the chains to load, into self.pdbe_chain_ids
+        :type chain_indices: list[int]
+        :return: UniProt residue IDs of each selected chain
+        :rtype: list[np.ndarray]
+        """
 
-        # Calculate score
-        score = linear_algebra_utils.calc_score(
-            dd_matx,
-            io_utils.serial_load(self.unp_res_ids[id_A]),
-            io_utils.serial_load(self.unp_res_ids[id_B]),
+        if self.archive:
+            return [
+                np.asarray(self.ca_archive.get(self.unp_res_ids[pdbe_chain_id]))
+                for pdbe_chain_id in self.pdbe_chain_ids[chain_indices]
+            ]
+
+        return [
+            np.asarray(io_utils.serial_load(self.unp_res_ids[pdbe_chain_id]))
+            for pdbe_chain_id in self.pdbe_chain_ids[chain_indices]
+        ]
+
+    def _chain_cache_keys(self) -> np.ndarray:
+        """
+        Key of each chain in the score cache, "<pdbe_chain_id>:<content hash>". The
+        hash is that of the CA atoms recorded in the cache manifest, so it changes
+        whenever an entry is updated and its matrices regenerated.
+
+        :return: Key of each chain, ordered as self.pdbe_chain_ids
+        :rtype: np.ndarray
+        """
+
+        return np.asarray(
+            [
+                self.cache_manifest.chain_key(pdbe_chain_id)
+                for pdbe_chain_id in self.pdbe_chain_ids
+            ]
         )
 
-        del dd_matx
+    def _load_cached_scores(self, chain_keys: np.ndarray) -> np.ndarray:
+        """
+        Retrieves scores between the parsed chains from the score cache of the UniProt
+        accession. Only pairs in which both chains' keys are unchanged are retrieved.
+
+        :param chain_keys: Key of each chain, as returned by _chain_cache_keys()
+        :type chain_keys: np.ndarray
+        :return: Condensed matrix of cached scores, NaN where a pair is not cached
+        :rtype: np.ndarray
+        """
+
+        cached_keys, cached_scores = io_utils.load_score_cache(self.path_score_cache)
+
+        cache_index = {key: index for index, key in enumerate(cached_keys)}
+        positions = [cache_index.get(key, -1) for key in chain_keys]
+
+        return linear_algebra_utils.remap_condensed(cached_scores, positions)
+
+    def _save_score_cache(self, chain_keys: np.ndarray, scores: np.ndarray) -> None:
+        """
+        Merges the scores between the parsed chains into the score cache of the UniProt
+        accession. Cached chains not parsed in this run are kept, unless superseded by a
+        new key (content hash) of the same chain.
+
+        :param chain_keys: Key of each chain, as returned by _chain_cache_keys()
+        :type chain_keys: np.ndarray
+        :param scores: Condensed matrix of scores between the parsed chains
+        :type scores: np.ndarray
+        """
+
+        cached_keys, cached_scores = io_utils.load_score_cache(self.path_score_cache)
+
+        # Cached chains absent from this run
+        parsed_chains = set(self.pdbe_chain_ids)
+        kept_keys = [
+            key for key in cached_keys if key.rsplit(":", 1)[0] not in parsed_chains
+        ]
+        merged_keys = np.concatenate([chain_keys, np.asarray(kept_keys, dtype=str)])
 
-        logger.debug(f"Score for {key} is {score}")
+        # Previously cached scores between any of the merged chains
+        cache_index = {key: index for index, key in enumerate(cached_keys)}
+        merged_scores = linear_algebra_utils.remap_condensed(
+            cached_scores, [cache_index.get(key, -1) for key in merged_keys]
+        )
 
-        return {key: score}
+        # Scores from this run, the first chains of the merged cache
+        num_chains = chain_keys.shape[0]
+        new_scores = linear_algebra_utils.remap_condensed(
+            scores,
+            np.concatenate(
+                [np.arange(num_chains), np.full(len(kept_keys), -1, dtype=int)]
+            ),
+        )
+        merged_scores = np.where(np.isnan(new_scores), merged_scores, new_scores)
+
+        io_utils.save_score_cache(self.path_score_cache, merged_keys, merged_scores)
+        logger.debug(
+            f"Saved scores for {merged_keys.shape[0]} chains to {self.path_score_cache}"
+        )
 
     def build_clustering_inputs(
         self,
-        path_save_dd_matx: PosixPath,
-    ) -> "tuple[ np.ndarray[any, float], np.ndarray[any, str] ]":
+        path_save_dd_matx: PosixPath = None,
+    ) -> "tuple[ np.ndarray[any, float], np.ndarray[any, int] ]":
         """
         Constructs the requisite data structures for parsing into the
         cluster_agglomerative() function.
 
-        :param path_save_dd_matx: Path to save distance difference matrices.
-        :type path_save_dd_matx: PosixPath
-        :return: Score matrix and label matrix, corresponding to the chain-chain
-            comparisons in the score matrix.
-        :rtype: tuple[ ndarray[any, float], ndarray[any, str] ]
+        Scores are cached per UniProt accession, keyed by chain and a hash of its CA
+        matrix, so only pairs involving new or updated chains are scored (all pairs if
+        force=True). The CA distance matrices of those chains are loaded once and their
+        scores computed in memory. Distance difference matrices are only written if a
+        path is parsed, in which case pairs whose saved matrix is missing or stale
+        (generated from a previous version of either chain) are also scored. If
+        archive=True, they are saved in the matrix archive of the segment in that path,
+        as "dd/<file name without suffix>".
+
+        :param path_save_dd_matx: Path to save distance difference matrices, defaults
+            to None
+        :type path_save_dd_matx: PosixPath, optional
+        :return: Condensed score matrix (upper triangle, as returned by
+            scipy.spatial.distance.pdist()) and the indices of the chains compared for
+            each score, into self.pdbe_chain_ids. Labels are given by pair_label().
+        :rtype: tuple[ ndarray[any, float], ndarray[any, int] ]
         """
 
-        label_matx_linear = []
-        label_matx = []  # Matrix of labels corresponding to score_matx.
+        num_chains = self.pdbe_chain_ids.shape[0]
 
-        self.label_score_reference = {
-            # "1atp_A_to_2adp_B" : float of the score
-            # "1atp_A_to_3amp_C" : float of the score
-            # ...
-        }
+        # Chain-chain comparisons, as indices into self.pdbe_chain_ids, in the order of
+        # the condensed score matrix
+        pairs_array = linear_algebra_utils.pair_indices(num_chains)
 
-        # Converted to attribute for access by _dd_matx_to_score()
         self.path_save_base_dd = path_save_dd_matx
 
-        index_A = 0
+        # Retrieve scores of unchanged pairs from the cache
+        self.path_score_cache = self.path_save_base_ca.joinpath(
+            f"{self.unp}_score_cache.npz"
+        )
+        chain_keys = self._chain_cache_keys()
+        if self.force:
+            pair_scores = np.full(pairs_array.shape[0], np.nan)
+        else:
+            pair_scores = self._load_cached_scores(chain_keys)
+
+        # Distance difference matrices to (re)write
+        save_dd = np.zeros(pairs_array.shape[0], dtype=bool)
+        if path_save_dd_matx:
+            save_dd[:] = self._dd_matxs_to_save(
+                path_save_dd_matx, chain_keys, pairs_array
+            )
 
-        # Iter rows
-        for id_A in self.pdbe_chain_ids:
-            label_row = []  # Structure comparison labels along matrix row
+        to_score = np.isnan(pair_scores) | save_dd
+        pairs_to_score = pairs_array[to_score]
+        logger.info(
+            f"Scoring {pairs_to_score.shape[0]} chain pairs, "
+            f"{pairs_array.shape[0] - pairs_to_score.shape[0]} retrieved from cache"
+        )
 
-            index_B = 0
-            # Fill the row
-            for id_B in self.pdbe_chain_ids:
+        if pairs_to_score.shape[0] > 0:
+            pair_scores[to_score] = self._score_pairs(
+                pairs_to_score, path_save_dd_matx, save_dd[to_score]
+            )
 
-                if index_A < index_B:
+        self._record_dd_matxs(pairs_array[save_dd], chain_keys)
 
-                    # Store label for distance difference matrix
-                    dd_name = f"{self.unp}_{id_A}_to_{id_B}"
-                    label_matx_linear.append(dd_name)
+        # Score of each pair, by position in pairs_array. Look up a pair of chains
+        # with pair_score()
+        self.label_score_reference = pair_scores
 
-                    # Store label for score
-                    score_label = f"{id_A}_to_{id_B}"
-                    label_row.append(score_label)
+        self._save_score_cache(chain_keys, pair_scores)
 
-                    logger.debug(
-                        f"Added {dd_name} to linear label matrix and {score_label} to "
-                        "score label matrix"
-                    )
+        return pair_scores, pairs_array
 
-                else:
-                    label_row.append(0)
-                index_B += 1
+    def save_dd_matxs(self, path_save_dd_matx: PosixPath, pairs: np.ndarray) -> None:
+        """
+        Saves the distance difference matrices of selected chain pairs, once scored by
+        build_clustering_inputs() without saving them. Matrices already saved and
+        current are not regenerated.
 
-            # Label matrices to list
-            label_matx.append(label_row)
-            index_A += 1
+        :param path_save_dd_matx: Path to save distance difference matrices
+        :type path_save_dd_matx: PosixPath
+        :param pairs: Indices of the chains in each pair, into self.pdbe_chain_ids,
+            lowest first
+        :type pairs: np.ndarray
+        """
 
-        # Run distance difference matrix calculations in parallel
-        pool = Pool(processes=self.nproc)
-        try:
-            results = pool.map(self._dd_matx_to_score, label_matx_linear)
+        chain_keys = self._chain_cache_keys()
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        pairs = pairs[self._dd_matxs_to_save(path_save_dd_matx, chain_keys, pairs)]
 
-            for i in results:
-                self.label_score_reference.update(i)
-        finally:
-            pool.close()  # Marks the pool as closed.
-            pool.join()  # Waits for workers to exit.
+        logger.info(f"Saving {pairs.shape[0]} distance difference matrices")
+        if pairs.shape[0] == 0:
+            return
+
+        # Scores are discarded, as already known
+        self._score_pairs(pairs, path_save_dd_matx)
+        self._record_dd_matxs(pairs, chain_keys)
+
+    def _dd_matxs_to_save(
+        self, path_save_dd_matx: PosixPath, chain_keys: np.ndarray, pairs: np.ndarray
+    ) -> np.ndarray:
+        """
+        Whether the distance difference matrix of each pair is to be (re)written:
+        always if force=True, else if missing from path_save_dd_matx or generated from
+        a previous version of either chain.
+        """
+
+        if self.archive:
+            if self.dd_archive is None:
+                self.dd_archive = archive_utils.MatrixArchive(
+                    archive_utils.dd_archive_path(path_save_dd_matx, self.unp)
+                )
+            saved_dd_matxs = {
+                f"{key[3:]}.npz" for key in self.dd_archive.keys(prefix="dd/")
+            }
+        else:
+            saved_dd_matxs = {path.name for path in path_save_dd_matx.glob("*.npz")}
 
-        # Format results from thread pool into score matrix
-        score_matx = np.asarray(
+        return np.array(
             [
-                [
-                    self.label_score_reference[label] if label != 0 else 0
-                    for label in row
-                ]
-                for row in label_matx
+                self.force
+                or self._dd_matx_fname(index_A, index_B) not in saved_dd_matxs
+                or not self.cache_manifest.dd_is_current(
+                    self._dd_matx_fname(index_A, index_B),
+                    chain_keys[index_A],
+                    chain_keys[index_B],
+                )
+                for index_A, index_B in pairs.tolist()
+            ],
+            dtype=bool,
+        )
+
+    def _record_dd_matxs(self, pairs: np.ndarray, chain_keys: np.ndarray) -> None:
+        """
+        Records the distance difference matrices written for pairs in the cache
+        manifest.
+        """
+
+        for index_A, index_B in pairs.tolist():
+            self.cache_manifest.record_dd(
+                self._dd_matx_fname(index_A, index_B),
+                chain_keys[index_A],
+                chain_keys[index_B],
+            )
+        if pairs.shape[0] > 0:
+            self.cache_manifest.save()
+
+    def _select_dd_pairs(
+        self,
+        dd_mode: str,
+        cluster_labels: np.ndarray,
+        dd_min_score: float = None,
+        representatives: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Chain pairs whose distance difference matrices are saved in a subset mode of
+        cluster(), as indices into self.pdbe_chain_ids.
+
+        :param dd_mode: "representatives", for all pairs of the representatives of
+            each cluster, or "score", for pairs scoring at least dd_min_score
+        :type dd_mode: str
+        :param cluster_labels: Cluster label of each chain
+        :type cluster_labels: np.ndarray
+        :param dd_min_score: Lowest score of pairs saved in "score" mode, defaults to
+            None
+        :type dd_min_score: float, optional
+        :param representatives: Index of the representative of each cluster, as
+            returned by select_representatives(), defaults to None (the medoids, as
+            selected by _cluster_medoids())
+        :type representatives: np.ndarray, optional
+        :return: Indices of the chains in each pair, lowest first
+        :rtype: np.ndarray
+        """
+
+        if dd_mode == "score":
+            return self.pair_indices[self.score_matx >= dd_min_score]
+
+        # One representative per cluster, compared to each other
+        if representatives is None:
+            representatives = self._cluster_medoids(cluster_labels)
+        representatives = np.sort(representatives)
+
+        return representatives[
+            linear_algebra_utils.pair_indices(representatives.shape[0])
+        ]
+
+    def pair_label(self, index_A: int, index_B: int) -> str:
+        """
+        Label of a chain-chain comparison, "<pdbe_chain_id>_to_<pdbe_chain_id>", as
+        used to name distance difference matrices.
+
+        :param index_A: Index of the first chain, into self.pdbe_chain_ids
+        :type index_A: int
+        :param index_B: Index of the second chain, into self.pdbe_chain_ids
+        :type index_B: int
+        :return: Label of the comparison
+        :rtype: str
+        """
+
+        return f"{self.pdbe_chain_ids[index_A]}_to_{self.pdbe_chain_ids[index_B]}"
+
+    def pair_score(self, pdbe_chain_id_A: str, pdbe_chain_id_B: str) -> float:
+        """
+        Score between two chains, once cluster() or build_clustering_inputs() has run.
+
+        :param pdbe_chain_id_A: PDBe chain ID of the first chain, e.g. "1atp_A"
+        :type pdbe_chain_id_A: str
+        :param pdbe_chain_id_B: PDBe chain ID of the second chain
+        :type pdbe_chain_id_B: str
+        :return: Score of the comparison, 0 for a chain with itself
+        :rtype: float
+        """
+
+        index_A = np.flatnonzero(self.pdbe_chain_ids == pdbe_chain_id_A)[0]
+        index_B = np.flatnonzero(self.pdbe_chain_ids == pdbe_chain_id_B)[0]
+        if index_A == index_B:
+            return 0.0
+
+        return float(
+            self.label_score_reference[
+                linear_algebra_utils.condensed_index(
+                    self.pdbe_chain_ids.shape[0], index_A, index_B
+                )
             ]
         )
 
-        return np.maximum(score_matx, score_matx.transpose()), np.asarray(label_matx)
+    def _dd_matx_fname(self, index_A: int, index_B: int) -> str:
+        """
+        File name of the distance difference matrix of a chain-chain comparison.
+        """
+
+        return f"{self.unp}_{self.pair_label(index_A, index_B)}.npz"
+
+    def _score_pairs(
+        self,
+        pairs: np.ndarray,
+        path_save_dd_matx: PosixPath = None,
+        save_dd: np.ndarray = None,
+    ) -> np.ndarray:
+        """
+        Computes the scores of the selected chain pairs. The CA distance matrices of
+        the chains involved are loaded once into shared memory and their distance
+        differences summed in chunks of similar estimated cost, in parallel where
+        worthwhile. Residue overlaps of all pairs are counted at once from the chains'
+        UniProt residue coverage.
+
+        :param pairs: Indices of the chains in each pair, into self.pdbe_chain_ids
+        :type pairs: np.ndarray
+        :param path_save_dd_matx: Path to save distance difference matrices, defaults
+            to None
+        :type path_save_dd_matx: PosixPath, optional
+        :param save_dd: Whether to save the distance difference matrix of each pair,
+            defaults to None (all pairs, if a path is parsed)
+        :type save_dd: np.ndarray, optional
+        :return: Score of each pair
+        :rtype: np.ndarray
+        """
+
+        if save_dd is None:
+            save_dd = np.ones(pairs.shape[0], dtype=bool)
+
+        # Load chains involved into shared memory. Workers attach to the store by
+        # name, so tasks only carry chain indices
+        chain_indices, store_pairs = np.unique(pairs, return_inverse=True)
+        store_pairs = store_pairs.reshape(pairs.shape)
+
+        ca_matxs, unp_res_ids = self._load_clustering_inputs(chain_indices)
+        chain_lengths = [
+            linear_algebra_utils.PackedTriangularMatrix(ca_matx).n
+            for ca_matx in ca_matxs
+        ]
+
+        # Residues shared by each pair, in one batched product
+        overlaps = linear_algebra_utils.overlap_counts(
+            linear_algebra_utils.coverage_matrix(unp_res_ids), store_pairs
+        )
+
+        # Sparse matrices are aligned by the UniProt residue IDs of their rows
+        fields = {"ca_matxs": ca_matxs}
+        if self.alignment == "sparse":
+            fields["unp_res_ids"] = unp_res_ids
+        store = shared_memory_utils.SharedArrayStore.create(fields)
+        del ca_matxs, fields
+
+        try:
+            # Plan processes from the estimated work, then group pairs into chunks of
+            # similar estimated cost
+            pair_costs = parallel_utils.estimate_pair_costs(
+                chain_lengths,
+                store_pairs,
+                overlaps if self.alignment == "sparse" else None,
+            )
+            self._plan_workers(
+                "Distance difference scoring",
+                parallel_utils.estimate_dd_work(pair_costs),
+                num_tasks=pairs.shape[0],
+            )
+            chunks = parallel_utils.make_chunks(
+                [
+                    (
+                        position,
+                        store_A,
+                        store_B,
+                        self.pair_label(index_A, index_B),
+                        save,
+                    )
+                    for position, (
+                        (store_A, store_B),
+                        (index_A, index_B),
+                        save,
+                    ) in enumerate(
+                        zip(store_pairs.tolist(), pairs.tolist(), save_dd.tolist())
+                    )
+                ],
+                pair_costs,
+                num_chunks=self.nproc * parallel_utils.CHUNKS_PER_PROCESS,
+            )
+            shared_inputs = (
+                store.handle,
+                self.unp,
+                path_save_dd_matx,
+                self.archive,
+                self.alignment,
+            )
+            tasks = [(shared_inputs, chunk) for chunk in chunks]
+
+            # Sums of distance differences, filled in as chunks finish, and statistics
+            # of saved matrices by position
+            dd_sums = np.zeros(pairs.shape[0])
+            dd_stats = {}
+
+            if self.nproc > 1:
+                results = self._get_pool().imap_unordered(_sum_dd_matxs, tasks)
+            else:
+                # Chunks are summed against this process' own store
+                results = (
+                    _sum_dd_chunk(store, *shared_inputs[1:], chunk) for chunk in chunks
+                )
+
+            for chunk_sums in results:
+                for position, dd_sum, dd_record, stats in chunk_sums:
+                    dd_sums[position] = dd_sum
+                    if stats is not None:
+                        dd_stats[position] = stats
+
+                    # Matrices returned to be archived
+                    if dd_record is not None:
+                        index_A, index_B = pairs[position]
+                        self.dd_archive.put_encoded(
+                            f"dd/{self._dd_matx_fname(index_A, index_B)[:-4]}",
+                            dd_record,
+                        )
+        finally:
+            store.unlink()
+            if self.dd_archive is not None:
+                self.dd_archive.flush()
+
+        unp_lengths = np.asarray([ids.shape[0] for ids in unp_res_ids])
+
+        scores = linear_algebra_utils.calc_scores(
+            dd_sums,
+            overlaps,
+            unp_lengths[store_pairs[:, 0]],
+            unp_lengths[store_pairs[:, 1]],
+        )
+
+        if dd_stats:
+            self._record_dd_stats(path_save_dd_matx, pairs, scores, dd_stats)
+
+        return scores
+
+    def _record_dd_stats(
+        self,
+        path_save_dd_matx: PosixPath,
+        pairs: np.ndarray,
+        scores: np.ndarray,
+        dd_stats: "dict[int, dict]",
+    ) -> None:
+        """
+        Records the statistics and scores of saved distance difference matrices in the
+        statistics index of the segment in path_save_dd_matx, used to scale distance
+        difference maps without loading the matrices.
+        """
+
+        stats_index = cache_utils.DDStatsIndex(
+            cache_utils.dd_stats_path(path_save_dd_matx, self.unp)
+        )
+        for position, stats in dd_stats.items():
+            index_A, index_B = pairs[position]
+            stats_index.record(
+                self._dd_matx_fname(index_A, index_B)[:-4],
+                {**stats, "score": float(scores[position])},
+                path_save_dd_matx,
+            )
+        stats_index.save()
 
     def cluster(
         self,
         path_save_cluster_results: PosixPath = None,
         path_save_dd_matx: PosixPath = None,
+        dd_mode: str = "all",
+        dd_min_score: float = None,
+        representative_mode: str = "medoid",
     ) -> None:
         """
         Clusters the chains parsed by sum-based score. Clustering results are stored to
@@ -453,26 +1047,54 @@ class ClusterConformations:
         format
         - self.cluster_dict : dictionary of per-chain clustering results, predominently
         used by class in `protein-superpose`
+        - self.representatives : whether each chain is the representative of its
+        conformer, as set by select_representatives(), also saved in the
+        REPRESENTATIVE column of self.cluster_df
 
         Also writes distance difference matrices and clustering results if paths parsed
         as arguments.
 
         Along with ca_distance(), this is the only other public method of the class.
 
+        Distance difference matrices are only needed for scoring, so in any dd_mode
+        other than "all" they are scored in memory and discarded. Those of the selected
+        pairs are saved once clustered, which costs a fraction of saving them all.
+
         :param path_save_dd_matx: Path to save calculated CA distance-difference
             matrices, defaults to None
         :type path_save_dd_matx: PosixPath, optional
         :param path_save_cluster_results: PosixPath to save clustering results,
             defaults to None
         :type path_save_cluster_results: PosixPath, optional
+        :param dd_mode: Distance difference matrices to save, one of DD_SAVE_MODES:
+            "all", "representatives" (pairs of the conformers' representatives, as
+            selected by representative_mode, or medoids if "none"), "score" (pairs
+            scoring at least dd_min_score) or "none", defaults to "all"
+        :type dd_mode: str, optional
+        :param dd_min_score: Lowest score of pairs saved if dd_mode="score", defaults
+            to None
+        :type dd_min_score: float, optional
+        :param representative_mode: Representative chain selected for each conformer,
+            one of REPRESENTATIVE_MODES: "medoid" (from the score matrix), "median"
+            (from the CA distance matrices) or "none", defaults to "medoid"
+        :type representative_mode: str, optional
+        :raises ValueError: Unknown dd_mode or representative_mode, or no
+            dd_min_score for dd_mode="score"
         """
 
+        check_cluster_modes(dd_mode, dd_min_score, representative_mode)
+
+        if dd_mode == "none":
+            path_save_dd_matx = None
+
         if path_save_dd_matx:
             path_save_dd_matx.mkdir(exist_ok=True, parents=True)
 
         logger.info("Generating distance difference matrices...")
-        self.score_matx, self.label_matx = self.build_clustering_inputs(
-            path_save_dd_matx
+
+        # Scores are condensed, use scipy.spatial.distance.squareform() for N*N form
+        self.score_matx, self.pair_indices = self.build_clustering_inputs(
+            path_save_dd_matx if dd_mode == "all" else None
         )
 
         # If all scores==0, place all chains into a single cluster
@@ -481,12 +1103,10 @@ class ClusterConformations:
 
             # Begin clustering
             logger.info("Clustering structures into conformational states...")
-            self.model = cluster_chains.cluster_agglomerative(
+            self.model, self.linkage_matx = cluster_chains.cluster_agglomerative(
                 self.score_matx, cutoff=CLUSTERING_CUTOFF_PC
             )
 
-            self.linkage_matx = cluster_chains.make_linkage_matx(self.model)
-
             # Cluster labels
             cluster_labels = self.model.labels_
 
@@ -497,6 +1117,24 @@ class ClusterConformations:
             cluster_labels = np.full(self.chains_all.shape[0], 0)
             self.linkage_matx = np.array([0])
 
+        # Representative of each conformer, flagged in the results and compared in
+        # the distance difference matrices saved with dd_mode="representatives"
+        representatives = None
+        if representative_mode != "none":
+            logger.info("Selecting representative structures...")
+            representatives = self.select_representatives(
+                representative_mode, cluster_labels
+            )
+
+        # Save the distance difference matrices selected from the results
+        if path_save_dd_matx and dd_mode != "all":
+            self.save_dd_matxs(
+                path_save_dd_matx,
+                self._select_dd_pairs(
+                    dd_mode, cluster_labels, dd_min_score, representatives
+                ),
+            )
+
         # Store clustering results to object as table
         unps_redundant = np.full(self.chains_all.shape[0], self.unp)
         pdbes = self.pdbe_chain_ids.astype("S4")
@@ -511,6 +1149,13 @@ class ClusterConformations:
             }
         )
 
+        # Flag representative chains, for superposition to read from the results
+        if representatives is not None:
+            self.cluster_df["REPRESENTATIVE"] = [
+                self.representatives[pdbe_chain_id]
+                for pdbe_chain_id in self.pdbe_chain_ids
+            ]
+
         # Add clustering results to dictionary for parsing into process_clusters in
         # protein-superpose
         self.cluster_dict = {}
@@ -532,24 +1177,17 @@ class ClusterConformations:
             )
             self.cluster_df.to_csv(path_save_all_conf, index=False)
 
-            # Save score dictionary
-            io_utils.serial_dump(
-                self.label_score_reference,
-                path_save_cluster_results.joinpath(
-                    f"{self.unp}_chain_label_scores_dict.pickle"
-                ),
-            )
-
-            # Save score matrix
-            io_utils.save_compressed_matrix(
+            # Save condensed score matrix
+            io_utils.save_condensed_matrix(
                 matrix=self.score_matx,
                 path=path_save_cluster_results.joinpath(f"{self.unp}_score_matrix"),
                 label="Score matrix",
             )
 
-            # Save label matrix
+            # Save chain IDs labelling the score matrix. Labels of each score are read
+            # with io_utils.load_pair_labels()
             io_utils.save_string_based_matx(
-                matrix=self.label_matx,
+                matrix=self.pdbe_chain_ids,
                 path=path_save_cluster_results.joinpath(f"{self.unp}_label_matrix"),
                 label="Label matrix",
             )
@@ -571,107 +1209,427 @@ class ClusterConformations:
                 ),
             )
 
+        # No further parallel steps
+        self.close()
+
         logger.info("Clustering done.")
 
-    def select_representatives(self) -> None:
+    def select_representatives(
+        self, mode: str = "medoid", labels: np.ndarray = None
+    ) -> np.ndarray:
         """
-        Method to select representative structures from the set of predicted clusters.
-
-        TODO:
-         - Find runtime improvements, currently very slow
-         - Must be either saved in DataFrame format or merged with the exhisting
-           clustering CSV
-         - Make toggleable.
+        Selects a representative chain for each predicted conformer. By default this
+        is the medoid (_cluster_medoids()), read from self.score_matx without loading
+        any matrices. Alternatively, mode="median" selects the chain whose CA distance
+        matrix is nearest the element-wise median of the conformer's matrices
+        (linear_algebra_utils.median_deviations()), for which each conformer's
+        matrices are loaded once and stacked. Called by cluster() unless disabled,
+        while the CA matrices are open.
+
+        Sets self.representatives, whether each chain (keyed by PDBe chain ID) is the
+        representative of its conformer.
+
+        :param mode: "medoid" or "median", defaults to "medoid"
+        :type mode: str, optional
+        :param labels: Conformer ID of each chain, defaults to None (the CONFORMER_ID
+            column of self.cluster_df)
+        :type labels: np.ndarray, optional
+        :raises ValueError: Unknown mode
+        :return: Index of the representative of each conformer, in order of
+            conformer ID
+        :rtype: np.ndarray
         """
 
-        self.representatives = {}
+        if labels is None:
+            labels = self.cluster_df["CONFORMER_ID"].to_numpy()
+        labels = np.asarray(labels)
 
-        for conformer_id in self.cluster_df["CONFORMER_ID"].unique():
-            # Show info to the user
-            logger.info(
-                "Identifying representative structures for predicted conformer "
-                f"{conformer_id}"
+        if mode == "medoid":
+            representatives = self._cluster_medoids(labels)
+        elif mode == "median":
+            representatives = np.array(
+                [
+                    self._median_representative(np.flatnonzero(labels == conformer_id))
+                    for conformer_id in np.unique(labels)
+                ],
+                dtype=np.intp,
             )
+        else:
+            raise ValueError(
+                f"Unknown representative mode {mode}, expected medoid or median"
+            )
+
+        is_representative = np.zeros(labels.shape[0], dtype=bool)
+        is_representative[representatives] = True
+        self.representatives = dict(
+            zip(self.pdbe_chain_ids.tolist(), is_representative.tolist())
+        )
+
+        for conformer_id, index in zip(np.unique(labels), representatives):
+            logger.debug(
+                f"Representative for conformer {conformer_id} = "
+                f"{self.pdbe_chain_ids[index]}"
+            )
+
+        return representatives
+
+    def _cluster_medoids(self, labels: np.ndarray) -> np.ndarray:
+        """
+        Medoid of each conformer, the chain with the lowest sum of scores to the rest
+        of its conformer (cluster_chains.cluster_medoids()). Ties, as when all scores
+        are zero, go to the chain with the most UniProt residues observed.
+
+        :param labels: Conformer ID of each chain
+        :type labels: np.ndarray
+        :return: Index of the medoid of each conformer, in order of conformer ID
+        :rtype: np.ndarray
+        """
+
+        coverage = np.asarray(
+            [
+                ids.shape[0]
+                for ids in self._load_unp_res_ids(
+                    np.arange(self.pdbe_chain_ids.shape[0])
+                )
+            ]
+        )
+
+        return cluster_chains.cluster_medoids(
+            self.score_matx, labels, tiebreak=coverage
+        )
+
+    def _median_representative(self, chain_indices: np.ndarray) -> int:
+        """
+        Chain of a conformer whose CA distance matrix is nearest the element-wise
+        median of the conformer's matrices.
+
+        :param chain_indices: Indices of the conformer's chains, into
+            self.pdbe_chain_ids
+        :type chain_indices: np.ndarray
+        :return: Index of the representative chain
+        :rtype: int
+        """
 
-            # Select rows in predicted conformation
-            chains_in_conformer = self.cluster_df[
-                self.cluster_df["CONFORMER_ID"] == conformer_id
+        if chain_indices.shape[0] == 1:
+            return chain_indices[0]
+
+        ca_matxs, unp_res_ids = self._load_clustering_inputs(chain_indices)
+
+        # Sparse matrices are compared over UniProt residues from 1, as dense
+        if self.alignment == "sparse":
+            num_res = int(min(ids.max() for ids in unp_res_ids))
+            ca_matxs = [
+                linear_algebra_utils.expand_packed(ca_matx, ids, num_res)
+                for ca_matx, ids in zip(ca_matxs, unp_res_ids)
             ]
 
-            # Convert to iterable of PDB ID - chain. E.g. 1pdb_A
-            pdbe_chain_ids = (
-                chains_in_conformer["PDBe_ID"] + "_" + chains_in_conformer["CHAIN_ID"]
+        deviations = linear_algebra_utils.median_deviations(ca_matxs)
+
+        return chain_indices[np.argmin(deviations)]
+
+
+def check_cluster_modes(
+    dd_mode: str = "all",
+    dd_min_score: float = None,
+    representative_mode: str = "medoid",
+) -> None:
+    """
+    Checks the modes parsed to ClusterConformations.cluster(), so callers can reject
+    them before any CA distance matrices are generated.
+
+    :param dd_mode: Distance difference matrices to save, one of DD_SAVE_MODES,
+        defaults to "all"
+    :type dd_mode: str, optional
+    :param dd_min_score: Lowest score of pairs saved if dd_mode="score", defaults to
+        None
+    :type dd_min_score: float, optional
+    :param representative_mode: Representative chain selected for each conformer, one
+        of REPRESENTATIVE_MODES, defaults to "medoid"
+    :type representative_mode: str, optional
+    :raises ValueError: Unknown dd_mode or representative_mode, or no dd_min_score for
+        dd_mode="score"
+    """
+
+    if dd_mode not in DD_SAVE_MODES:
+        raise ValueError(
+            f"Unknown distance difference save mode {dd_mode}, expected one of "
+            f"{DD_SAVE_MODES}"
+        )
+    if dd_mode == "score" and dd_min_score is None:
+        raise ValueError('dd_min_score must be parsed if dd_mode="score"')
+    if representative_mode not in REPRESENTATIVE_MODES:
+        raise ValueError(
+            f"Unknown representative mode {representative_mode}, expected one of "
+            f"{REPRESENTATIVE_MODES}"
+        )
+
+
+def _generate_ca_matxs(
+    pdbe_id: str,
+    mmcif_path: str,
+    chain_ids: "list[str]",
+    path_save_ca: PosixPath = None,
+    path_save_unps: PosixPath = None,
+    ca_entries: "dict[str, dict]" = None,
+    force: bool = False,
+    alignment: str = "dense",
+) -> "tuple[dict[str, dict], dict[str, tuple[np.ndarray, np.ndarray]]]":
+    """
+    Calculates and saves the CA distance matrices for the given chains of a PDBe
+    entry. The mmCIF file is loaded and its _atom_site loop parsed once for all chains.
+    A chain's matrix is only regenerated if its CA atoms differ from those recorded in
+    its cache manifest entry (or force=True). Coordinates are only held by the process
+    running this task; the parent receives the updated manifest entries.
+
+    If no paths to save are given, regenerated matrices (packed, as saved by
+    io_utils.save_packed_matrix()) and UniProt residue IDs are returned instead, for
+    the parent to add to its matrix archive.
+
+    :param pdbe_id: PDBe ID of the entry
+    :type pdbe_id: str
+    :param mmcif_path: Path to the updated mmCIF file of the entry
+    :type mmcif_path: str
+    :param chain_ids: Chains of the entry to check and generate CA matrices for
+    :type chain_ids: list[str]
+    :param path_save_ca: Path to save CA distance matrices, defaults to None
+    :type path_save_ca: PosixPath, optional
+    :param path_save_unps: Path to save UniProt residue IDs, defaults to None
+    :type path_save_unps: PosixPath, optional
+    :param ca_entries: Cache manifest entries of the chains' saved matrices, keyed by
+        PDBe chain ID, defaults to None
+    :type ca_entries: dict[str, dict], optional
+    :param force: Regenerate existing matrices, defaults to False
+    :type force: bool, optional
+    :param alignment: Residue alignment of the matrices, "dense" (UniProt residues
+        from 1) or "sparse" (observed residues, in the order of their UniProt residue
+        IDs as saved), defaults to "dense"
+    :type alignment: str, optional
+    :return: New cache manifest entries, and regenerated matrices and UniProt residue
+        IDs if not saved, keyed by PDBe chain ID
+    :rtype: tuple[dict[str, dict], dict[str, tuple[np.ndarray, np.ndarray]]]
+    """
+
+    ca_entries = ca_entries or {}
+    new_entries = {}
+    chain_matxs = {}
+
+    # Extract x, y, z, and UNP index info for every chain in a single pass
+    mmcif = io_utils.load_mmcif(mmcif_path)
+    chains_xyz_unp = parsing_utils.parse_mmcif_chains(mmcif, chain_ids)
+
+    for chain_id, xyz_unp_dict in chains_xyz_unp.items():
+        pdbe_chain_id = f"{pdbe_id}_{chain_id}"
+
+        chain_hash = cache_utils.hash_chain(xyz_unp_dict)
+        new_entries[pdbe_chain_id] = cache_utils.make_ca_entry(
+            chain_id, mmcif_path, chain_hash, alignment
+        )
+
+        # Skip chains with identical CA atoms, e.g. where only metadata was updated
+        if not force and cache_utils.ca_entry_matches_hash(
+            ca_entries.get(pdbe_chain_id), chain_id, chain_hash, alignment
+        ):
+            logger.debug(f"CA atoms of {pdbe_chain_id} unchanged, skipping generation")
+            continue
+
+        # Unimputed array of UniProt residue indices
+        unp_res_ids = xyz_unp_dict["unp_res_ids"]
+
+        # Make square CA matrix. Only the upper triangle is saved, so the lower
+        # triangle is not calculated. Sparse matrices hold observed residues only
+        if alignment == "dense":
+            xyz_unp_dict = parsing_utils.fill_missing_unps(xyz_unp_dict)
+        ca_matx = linear_algebra_utils.generate_ca_matx(
+            xyz_unp_dict["cartn_x"],
+            xyz_unp_dict["cartn_y"],
+            xyz_unp_dict["cartn_z"],
+            upper_only=True,
+        )
+
+        if path_save_ca is None:
+            chain_matxs[pdbe_chain_id] = (
+                linear_algebra_utils.PackedTriangularMatrix.pack(
+                    io_utils.round_upper_triangle(ca_matx)
+                ),
+                np.asarray(unp_res_ids, dtype=np.int64),
             )
+            logger.debug(f"Generated CA matrix for {pdbe_chain_id}")
+            continue
 
-            # Create list of CA matrices
-            ca_matxs_in_cluster = [self.ca_matxs.get(key) for key in pdbe_chain_ids]
-
-            # Select the smallest max index position to make truncation
-            max_index_list = []
-            for ca_matx in ca_matxs_in_cluster:
-                max_index_list.append(io_utils.serial_load(ca_matx).shape[0])
-            truncation_index = min(max_index_list)  # Set truncation value
-
-            # Find all median values
-            # Relatively slow -- a performance improvement might be needed here
-            logger.info("Generating matrix of element-wise medians")
-            # progress = appearance_utils.ProgressBar(truncation_index**2)
-            col_index = 0
-            median_matrix = []
-            while col_index < truncation_index:
-                row_index = 0
-                median_matrix_row = []
-
-                while row_index < truncation_index:
-                    median_at_index = np.median(
-                        [
-                            io_utils.serial_load(x)[col_index][row_index]
-                            for x in ca_matxs_in_cluster
-                        ]
-                    )
-                    median_matrix_row.append(median_at_index)
-                    # progress.update()
-                    row_index += 1
+        # Serialise the UniProt residue indices
+        io_utils.serial_dump(
+            unp_res_ids, path_save_unps.joinpath(f"{pdbe_chain_id}.pickle")
+        )
 
-                median_matrix.append(median_matrix_row)
-                col_index += 1
+        # Write packed matrix file, replacing any matrix saved in the compressed format
+        # of earlier versions
+        path_ca_matx = path_save_ca.joinpath(f"{pdbe_chain_id}_ca_distance_matrix")
+        path_saved = io_utils.save_packed_matrix(ca_matx, path_ca_matx)
+        path_ca_matx.with_suffix(".npz").unlink(missing_ok=True)
+        logger.debug(f"Generated CA matrix for {pdbe_chain_id}, saved to {path_saved}")
 
-            median_matrix = np.asarray(median_matrix_row)
+    return new_entries, chain_matxs
 
-            # Find number of medians per CA matrix
-            median_counts_per_chain = {}
-            max_num_medians = 0
-            for id in pdbe_chain_ids:
 
-                ca_matx = io_utils.serial_load(self.ca_matxs[id])
-                ca_matx_truncated = linear_algebra_utils.matx_trim(
-                    ca_matx, truncation_index
-                )
+def _sum_dd_matx(
+    store: shared_memory_utils.SharedArrayStore,
+    index_A: int,
+    index_B: int,
+    key: str,
+    unp: str,
+    path_save_dd_matx: PosixPath = None,
+    archive: bool = False,
+    alignment: str = "dense",
+) -> "tuple[float, tuple[dict, bytes], dict]":
+    """
+    Sums the upper triangle, excluding the diagonal, of the distance difference matrix
+    of a pair of chains held in a shared memory store, for scoring. The sum is computed
+    in one blockwise pass over the packed CA distance matrices, so the distance
+    difference matrix is only built if saved: to path_save_dd_matx, overwriting any
+    existing matrix for the pair, or returned as an archive record if archive=True.
+    Statistics of saved matrices are returned for the parent to index.
+
+    :param store: Store with field "ca_matxs", of packed CA distance matrices, and
+        "unp_res_ids", of the UniProt residue IDs of their rows, if sparse
+    :type store: shared_memory_utils.SharedArrayStore
+    :param index_A: Index of the first chain in the store
+    :type index_A: int
+    :param index_B: Index of the second chain in the store
+    :type index_B: int
+    :param key: Label of the comparison, "<pdbe_chain_id>_to_<pdbe_chain_id>"
+    :type key: str
+    :param unp: UniProt accession
+    :type unp: str
+    :param path_save_dd_matx: Path to save distance difference matrices, defaults to
+        None
+    :type path_save_dd_matx: PosixPath, optional
+    :param archive: Return the distance difference matrix to be added to a matrix
+        archive rather than saving it to path_save_dd_matx, defaults to False
+    :type archive: bool, optional
+    :param alignment: Residue alignment of the CA distance matrices, "dense" or
+        "sparse", defaults to "dense"
+    :type alignment: str, optional
+    :return: Sum of the upper triangle of the distance difference matrix, the encoded
+        matrix if archived (else None) and statistics of the matrix as saved, as
+        returned by linear_algebra_utils.dd_matx_stats() (else None)
+    :rtype: tuple[float, tuple[dict, bytes], dict]
+    """
+
+    packed_ca_A = store.get("ca_matxs", index_A)
+    packed_ca_B = store.get("ca_matxs", index_B)
+
+    # Sum as for calc_score()
+    if alignment == "sparse":
+        unp_res_ids_A = store.get("unp_res_ids", index_A)
+        unp_res_ids_B = store.get("unp_res_ids", index_B)
+        dd_sum = linear_algebra_utils.dd_sum_aligned(
+            packed_ca_A, unp_res_ids_A, packed_ca_B, unp_res_ids_B
+        )
+    else:
+        dd_sum = linear_algebra_utils.dd_sum_packed(packed_ca_A, packed_ca_B)
 
-                # Find number of medians and store
-                num_medians = np.count_nonzero(ca_matx_truncated == median_matrix)
-                median_counts_per_chain[id] = num_medians
+    logger.debug(f"Distance difference sum for {key} is {dd_sum}")
 
-                # Keep track of the highest number of medians in a given CA matrix
-                if num_medians > max_num_medians:
-                    max_num_medians = num_medians
+    if not path_save_dd_matx:
+        return dd_sum, None, None
 
-            representative_chains = {}
-            median_set = False
-            for id, median in median_counts_per_chain.items():
-                if (median == max_num_medians) and (not median_set):
-                    representative_chains[id] = True
-                    median_set = True
-                else:
-                    representative_chains[id] = False
+    # Saved matrices span UniProt residues from 1 in either mode
+    if alignment == "sparse":
+        num_res = int(min(unp_res_ids_A.max(), unp_res_ids_B.max()))
+        packed_ca_A = linear_algebra_utils.expand_packed(
+            packed_ca_A, unp_res_ids_A, num_res
+        )
+        packed_ca_B = linear_algebra_utils.expand_packed(
+            packed_ca_B, unp_res_ids_B, num_res
+        )
 
-            # Assign representative chains dict to field
-            self.representatives.update(representative_chains)
+    # Note: "dd_matx" = "distance difference matrix". Square upper triangle, as
+    # generated by distance_differences.generate_matx_diff()
+    dd_matx = linear_algebra_utils.PackedTriangularMatrix(
+        linear_algebra_utils.dd_packed(packed_ca_A, packed_ca_B)
+    ).to_dense()
 
-            # Debug
-            for key, value in representative_chains.items():
-                if value:
-                    logger.info(f"Representative for conformer {conformer_id} = {key}")
+    # Rounded as by save_compressed_matrix()
+    dd_matx_saved = io_utils.round_upper_triangle(dd_matx)
+    dd_stats = linear_algebra_utils.dd_matx_stats(dd_matx_saved)
+
+    dd_record = None
+    if archive:
+        # Compressed like saved files
+        dd_record = archive_utils.encode_record(dd_matx_saved, compress=True)
+    else:
+        dd_matx_file = path_save_dd_matx.joinpath(f"{unp}_{key}")
+
+        io_utils.save_compressed_matrix(dd_matx, dd_matx_file)
+        logger.debug(
+            f"Saved distance difference matrix for {key} to "
+            f"{dd_matx_file.with_suffix('.npz')}"
+        )
+
+    return dd_sum, dd_record, dd_stats
+
+
+def _sum_dd_chunk(
+    store: shared_memory_utils.SharedArrayStore,
+    unp: str,
+    path_save_dd_matx: PosixPath,
+    archive: bool,
+    alignment: str,
+    chunk: "list[tuple[int, int, int, str, bool]]",
+) -> "list[tuple[int, float, tuple[dict, bytes], dict]]":
+    """
+    Sums the distance difference matrices of a chunk of chain pairs held in a shared
+    memory store. Arguments are as for _sum_dd_matx().
+
+    :param chunk: Pairs as (position, index_A, index_B, label, whether to save the
+        distance difference matrix)
+    :type chunk: list[tuple[int, int, int, str, bool]]
+    :return: Position, distance difference sum, archive record (or None) and
+        statistics of the saved matrix (or None) of each pair in the chunk
+    :rtype: list[tuple[int, float, tuple[dict, bytes], dict]]
+    """
+
+    return [
+        (
+            position,
+            *_sum_dd_matx(
+                store,
+                index_A,
+                index_B,
+                key,
+                unp,
+                path_save_dd_matx if save_dd else None,
+                archive,
+                alignment,
+            ),
+        )
+        for position, index_A, index_B, key, save_dd in chunk
+    ]
+
+
+def _sum_dd_matxs(
+    task: "tuple[tuple, list[tuple[int, int, int, str, bool]]]",
+) -> "list[tuple[int, float, tuple[dict, bytes], dict]]":
+    """
+    Worker task summing the distance difference matrices of a chunk of chain pairs.
+    The task carries the handle of the shared memory store holding the chains, which
+    is attached to for the duration of the chunk.
+
+    :param task: Inputs shared by all pairs -- (store handle, UniProt accession, path
+        to save distance difference matrices, whether they are archived, residue
+        alignment) -- and the chunk of pairs, as parsed to _sum_dd_chunk()
+    :type task: tuple[tuple, list[tuple[int, int, int, str, bool]]]
+    :return: Results of _sum_dd_chunk()
+    :rtype: list[tuple[int, float, tuple[dict, bytes], dict]]
+    """
+
+    (store_handle, *shared_inputs), chunk = task
+
+    store = shared_memory_utils.SharedArrayStore.attach(store_handle)
+    try:
+        return _sum_dd_chunk(store, *shared_inputs, chunk)
+    finally:
+        store.close()  # Release this process' mapping once the chunk is done
 
 
 def render_dendrogram(
@@ -777,7 +1735,7 @@ def render_swarmplot(
     appearance_utils.init_plot_appearance()
 
     try:
-        score_matx = io_utils.load_matrix(
+        score_matx = io_utils.load_condensed_matrix(
             path_results.joinpath(f"{unp}_score_matrix.npz")
         )
 
@@ -787,7 +1745,7 @@ def render_swarmplot(
         )
         return
 
-    if np.array_equal(score_matx, np.array([0])):
+    if score_matx.size == 0 or np.array_equal(score_matx, np.array([0])):
         logger.info("Single cluster for segment. Not rendering swarm plot.")
         return
 
@@ -14,20 +14,50 @@ Generates distance difference maps as 2D histograms to visualise the residue-res
 differences between protein structures, within and between conformational states.
 """
 
+from functools import partial
 from pathlib import PosixPath
+from typing import Callable
 
 # Standard package imports
 import seaborn as sns
 from matplotlib import colormaps
+from matplotlib.cm import ScalarMappable
+from matplotlib.colors import Normalize
 from matplotlib import pyplot as plt
-from numpy import ndarray, where
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.image import imsave
+from numpy import arange, asarray, ndarray, triu, uint32, where
 import logging
 
 # Custom module imports
-from .utils import io_utils, linear_algebra_utils
+from .utils import (
+    archive_utils,
+    cache_utils,
+    io_utils,
+    linear_algebra_utils,
+    parallel_utils,
+)
 
 logger = logging.getLogger(__name__)
 
+# Read-only matrix archives opened by this process, keyed by path
+_open_archives = {}
+
+# Distance difference maps are rendered as one raster image per matrix, or as one
+# vector patch per matrix element (seaborn), for publication figures
+DD_MAP_MODES = ("raster", "vector")
+
+# Size of maps rendered as raster images
+DD_MAP_FIGSIZE = (6.4, 4.8)  # Inches
+DD_MAP_DPI = 200
+
+# Figure reused by this process to render distance difference maps as vectors
+_dd_map_figure = None
+
+# Writer reused by this process to render distance difference maps as raster images
+_raster_map_writer = None
+
 # # To suppress Matplotlib debug messages
 # import os
 # os.environ["QT_LOGGING_RULES"] = "qt5ct.debug=false"
@@ -39,6 +69,7 @@ def generate_matx_diff(
     ca_matx1: ndarray,
     ca_matx2: ndarray,
     path_save: "PosixPath|str" = None,
+    stats_index: cache_utils.DDStatsIndex = None,
 ) -> "ndarray|None":
     """
     Executes all the functions needed for calculating and saving the difference matrix
@@ -53,6 +84,9 @@ def generate_matx_diff(
     :type ca_matx2: ndarray
     :param path_save: Path to save location, defaults to None
     :type path_save: PosixPath|str, optional
+    :param stats_index: Index to record the statistics of the saved matrix in, saved
+        by the caller, defaults to None
+    :type stats_index: cache_utils.DDStatsIndex, optional
     :param return_matx: Whether to return the difference matrix, defaults to False
     :type return_matx: bool, optional
     :return: Returns difference matrix if `return_matx=True`, else the distance matrix
@@ -67,12 +101,21 @@ def generate_matx_diff(
     diff_matx = linear_algebra_utils.matx_subtract(ca_matx1, ca_matx2)
 
     # Set all values < 3 (cutoff) Angstroms to zero
-    cutoff = 3.0
-    diff_matx = where(diff_matx < cutoff, 0, diff_matx)
+    diff_matx = where(diff_matx < linear_algebra_utils.DD_CUTOFF, 0, diff_matx)
 
     if path_save:
         io_utils.save_compressed_matrix(diff_matx, path_save)
 
+        if stats_index is not None:
+            path_save = PosixPath(path_save)
+            stats_index.record(
+                path_save.name.removesuffix(".npz"),
+                linear_algebra_utils.dd_matx_stats(
+                    io_utils.round_upper_triangle(diff_matx)
+                ),
+                path_save.parent,
+            )
+
     # Return if parsed on function call
     return diff_matx
 
@@ -106,14 +149,23 @@ def plot_2d_hist(dd_matx, axes, heatmap_kwargs):
     sns.heatmap(dd_matx, ax=axes[0], **heatmap_kwargs)
 
     # Custom formatting
-    axes[0].set_ylabel("Sequence ID (UniProt)", fontweight="demi")
-    axes[0].set_xlabel("Sequence ID (UniProt)", fontweight="demi")
+    label_dd_axes(axes[0], len(dd_matx))
 
-    unp_range = range(0, len(dd_matx), 50)
-    axes[0].set_xticks(unp_range)
-    axes[0].set_yticks(unp_range)
-    axes[0].set_xticklabels(unp_range)
-    axes[0].set_yticklabels(unp_range)
+
+def label_dd_axes(ax, num_res: int) -> None:
+    """
+    Labels the axes of a distance difference map of num_res residues, with a tick
+    every 50 residues.
+    """
+
+    ax.set_ylabel("Sequence ID (UniProt)", fontweight="demi")
+    ax.set_xlabel("Sequence ID (UniProt)", fontweight="demi")
+
+    unp_range = range(0, num_res, 50)
+    ax.set_xticks(unp_range)
+    ax.set_yticks(unp_range)
+    ax.set_xticklabels(unp_range)
+    ax.set_yticklabels(unp_range)
 
 
 def add_colour_bar(fig, axes):
@@ -125,6 +177,124 @@ def add_colour_bar(fig, axes):
     fig.colorbar(axes[0].collections[0], cax=axes[1])
 
 
+class RasterMapWriter:
+    """
+    Writes distance difference maps as PNG images of a fixed size (DD_MAP_FIGSIZE at
+    DD_MAP_DPI), without seaborn. The frame of each map (axis labels, ticks and colour
+    bar) is drawn once for each matrix size. Each matrix is then mapped through the
+    colour map of the heatmap kwargs and written into the pixels of the frame, with
+    one block of pixels per element, so each map costs little more than encoding the
+    image.
+    """
+
+    def __init__(self, heatmap_kwargs: dict) -> None:
+        """
+        Constructor
+
+        :param heatmap_kwargs: Keyword arguments of the heatmap, as returned by
+            make_heatmap_kwargs(), with the shared "vmax"
+        :type heatmap_kwargs: dict
+        """
+
+        self.vmax = heatmap_kwargs["vmax"]
+
+        # Missing residues are semi-transparent, so are blended over the white
+        # background here, for colours to be written straight into the image
+        cmap = heatmap_kwargs["cmap"].copy()
+        bad = asarray(cmap.get_bad())
+        cmap.set_bad(bad[:3] * bad[3] + (1 - bad[3]))
+        self.mappable = ScalarMappable(
+            Normalize(heatmap_kwargs["vmin"], self.vmax), cmap
+        )
+
+        self.fig = Figure(figsize=DD_MAP_FIGSIZE, dpi=DD_MAP_DPI)
+        self.canvas = FigureCanvasAgg(self.fig)
+        self.axes = self.fig.subplots(
+            ncols=2,  # matrix | colour_bar
+            nrows=1,
+            gridspec_kw={"width_ratios": [4, 0.2]},
+        )
+        self.axes[0].set_aspect("equal")
+        self.title = self.axes[0].set_title(" ", fontweight="bold", animated=True)
+
+        # As for seaborn heatmaps
+        self.fig.colorbar(self.mappable, cax=self.axes[1])
+        for spine in self.axes[0].spines.values():
+            spine.set_visible(False)
+
+        # Frame, position of the matrix axes and the pixels of the matrix, by size
+        self.frames = {}
+
+    def _get_frame(self, num_res: int) -> tuple:
+        """
+        Frame for matrices of num_res residues, laid out and drawn on first use.
+        """
+
+        if num_res in self.frames:
+            return self.frames[num_res]
+
+        ax = self.axes[0]
+        ax.set_xlim(0, num_res)
+        ax.set_ylim(num_res, 0)
+        label_dd_axes(ax, num_res)
+        for label in ax.get_xticklabels():
+            label.set_rotation(90)
+
+        # Layout is fixed once drawn, so titles of any length are placed alike
+        self.fig.set_layout_engine("tight")
+        self.canvas.draw()
+        self.fig.set_layout_engine("none")
+
+        # Pixels covered by the matrix, with the first row at the top
+        bbox = ax.get_window_extent()
+        height = self.canvas.get_width_height()[1]
+        pixels = (
+            height - round(bbox.y1),
+            height - round(bbox.y0),
+            round(bbox.x0),
+            round(bbox.x1),
+        )
+
+        self.frames[num_res] = (
+            self.canvas.copy_from_bbox(self.fig.bbox),
+            ax.get_position(),
+            pixels,
+        )
+
+        return self.frames[num_res]
+
+    def write(self, dd_matx: ndarray, title: str, path_save: PosixPath) -> None:
+        """
+        Renders a distance difference matrix and saves the map as a PNG image.
+
+        :param dd_matx: Full, symmetric distance difference matrix
+        :type dd_matx: np.ndarray
+        :param title: Title of the map
+        :type title: str
+        :param path_save: Path (including file name) to save the image
+        :type path_save: PosixPath
+        """
+
+        num_res = dd_matx.shape[0]
+        frame, position, (top, bottom, left, right) = self._get_frame(num_res)
+
+        self.canvas.restore_region(frame)
+        self.axes[0].set_position(position, which="active")
+        self.title.set_text(title)
+        self.axes[0].draw_artist(self.title)
+
+        # Nearest element to each pixel, copied as one 32-bit RGBA value
+        rows = arange(bottom - top) * num_res // (bottom - top)
+        cols = arange(right - left) * num_res // (right - left)
+        rgba = self.mappable.to_rgba(dd_matx, bytes=True).view(uint32)[..., 0]
+
+        pixels = asarray(self.canvas.buffer_rgba())
+        pixels.view(uint32)[top:bottom, left:right, 0] = rgba[rows][:, cols]
+
+        imsave(path_save, pixels)
+        logger.info(f"Figure saved as {path_save}")
+
+
 def get_conformer_id(df, pdb, chain):
     """
     Used to extract the conformer ID from a Pandas DataFrame, given a PDB and chain ID.
@@ -166,25 +336,108 @@ def find_largest_distance_from_matxs(
 ) -> float:
     """
     Finds the largest distance in all distance difference matrices. Used to set the
-    maximum value for the colour bar in the distance difference maps.
+    maximum value for the colour bar in the distance difference maps. Distances of
+    matrices in a statistics index (cache_utils.DDStatsIndex) are read from it, so
+    only the others are loaded, as saved (the upper triangle).
     """
 
     max_distance = 0
+    stats_indexes = {}
 
     for i in dd_matxs_fnames:
-        path_dd_matx = path_matxs.joinpath(i)
-        dd_matx = io_utils.load_matrix_from_tri_upper(path_dd_matx)
+        dd_matx_name = i[:-4] if i.endswith(".npz") else i
+        unp = dd_matx_name.split("_")[0]
+        if unp not in stats_indexes:
+            stats_indexes[unp] = cache_utils.DDStatsIndex(
+                cache_utils.dd_stats_path(path_matxs, unp)
+            )
+
+        stats = stats_indexes[unp].get(dd_matx_name, path_matxs)
+        if stats is None:
+            stats = linear_algebra_utils.dd_matx_stats(
+                io_utils.load_matrix(path_matxs.joinpath(i))
+            )
 
         # Update max distance if larger than current max
-        max_distance = linear_algebra_utils.find_max(dd_matx, starting_max=max_distance)
+        max_distance = max(max_distance, stats["max"])
 
     return max_distance
 
 
+def _open_archive(path_archive: PosixPath) -> archive_utils.MatrixArchive:
+    """
+    Opens a matrix archive read-only, once per process. Archives are kept open, so
+    each map rendered reads a single record, until close_archives() is called.
+    """
+
+    archive = _open_archives.get(path_archive)
+    if archive is None:
+        archive = archive_utils.MatrixArchive(path_archive, read_only=True)
+        _open_archives[path_archive] = archive
+
+    return archive
+
+
+def close_archives() -> None:
+    """
+    Closes the matrix archives opened by this process to load distance difference
+    matrices.
+    """
+
+    for archive in _open_archives.values():
+        archive.close()
+    _open_archives.clear()
+
+
+def load_archived_dd_matx(path_archive: PosixPath, key: str) -> ndarray:
+    """
+    As io_utils.load_matrix_from_tri_upper(), for a matrix saved in a matrix archive.
+    The archive is referred to by path, so loaders can be sent to worker processes.
+    """
+
+    matx_upper_tri = _open_archive(path_archive).get(key)
+
+    return matx_upper_tri.T + matx_upper_tri
+
+
+def collect_dd_matxs(path_matxs: PosixPath) -> "dict[str, Callable[[], ndarray]]":
+    """
+    Finds the distance difference matrices saved in a directory, as .npz files or in
+    matrix archives (ClusterConformations(archive=True)). Archives are opened
+    read-only, for close_archives() to close once the matrices are loaded.
+
+    :param path_matxs: Path to saved distance difference matrices
+    :type path_matxs: PosixPath
+    :return: Function loading each full, symmetric matrix, keyed by its name
+        ("<unp>_<pdbe_chain_id>_to_<pdbe_chain_id>"). Loaders can be pickled.
+    :rtype: dict[str, Callable[[], np.ndarray]]
+    """
+
+    dd_matx_loaders = {}
+
+    for fname in io_utils.get_fnames(path_matxs):
+        if fname.endswith(archive_utils.DD_ARCHIVE_SUFFIX):
+            path_archive = path_matxs.joinpath(fname)
+
+            for key in _open_archive(path_archive).keys(prefix="dd/"):
+                dd_matx_loaders[key[3:]] = partial(
+                    load_archived_dd_matx, path_archive, key
+                )
+
+        elif fname.endswith(".npz"):
+            dd_matx_loaders[fname[:-4]] = partial(
+                io_utils.load_matrix_from_tri_upper, path_matxs.joinpath(fname)
+            )
+
+    return dd_matx_loaders
+
+
 def make_dd_maps(
     path_matxs: PosixPath,
     path_save_maps: PosixPath,
     force: bool = False,
+    nproc: int = None,
+    mode: str = "raster",
 ) -> None:
     """
     Plot all unique distance difference matrices as 2D histograms (heatmaps). Must
@@ -193,68 +446,352 @@ def make_dd_maps(
 
     :param path_save: Path to save CA distance-diiference heatmaps.
     :type path_save: pathlib.Path
+    :param force: Re-render existing maps, defaults to False
+    :type force: bool, optional
+    :param nproc: Maximum number of processes, defaults to None (all available cores)
+    :type nproc: int, optional
+    :param mode: One of DD_MAP_MODES, as for render_dd_maps(), defaults to "raster"
+    :type mode: str, optional
     """
 
-    # Load in the distance difference matrices to find the maximum distance
-    dd_matxs_fnames = io_utils.get_fnames(path_matxs)
+    # Distance difference matrices saved as files or in matrix archives
+    try:
+        dd_matx_loaders = collect_dd_matxs(path_matxs)
+        stats_indexes, dd_stats = collect_dd_stats(path_matxs, dd_matx_loaders)
+
+        scanned_stats = render_dd_maps(
+            dd_matx_loaders, path_save_maps, force, nproc, mode, dd_stats
+        )
+    finally:
+        close_archives()
+
+    # Index matrices scanned, e.g. saved by earlier versions, so they are not loaded
+    # to scale the maps again
+    for dd_matx_name, stats in scanned_stats.items():
+        unp = dd_matx_name.split("_")[0]
+        if unp not in stats_indexes:
+            stats_indexes[unp] = cache_utils.DDStatsIndex(
+                cache_utils.dd_stats_path(path_matxs, unp)
+            )
+        stats_indexes[unp].record(dd_matx_name, stats, path_matxs)
 
-    # Find the maximum distance in all distance difference matrices
-    logger.info("Finding maximum distance")
-    max_distance = find_largest_distance_from_matxs(path_matxs, dd_matxs_fnames)
-    logger.info(f"Maximum distance: {max_distance}")
+    for stats_index in stats_indexes.values():
+        stats_index.save()
 
-    # Assign max distance to heatmap kwargs
-    heatmap_kwargs = make_heatmap_kwargs()
-    heatmap_kwargs["vmax"] = max_distance
 
-    # Make directory to save maps
-    path_save_maps.mkdir(parents=True, exist_ok=True)
+def collect_dd_stats(
+    path_matxs: PosixPath, dd_matx_loaders: "dict[str, Callable[[], ndarray]]"
+) -> "tuple[dict[str, cache_utils.DDStatsIndex], dict[str, dict]]":
+    """
+    Loads the statistics indexes saved with distance difference matrices
+    (ClusterConformations.cluster()) and finds the current statistics of each matrix.
+
+    :param path_matxs: Path to saved distance difference matrices
+    :type path_matxs: PosixPath
+    :param dd_matx_loaders: Function loading each matrix, keyed by its name, as
+        returned by collect_dd_matxs()
+    :type dd_matx_loaders: dict[str, Callable[[], np.ndarray]]
+    :return: Statistics index of each UniProt accession, and statistics of each
+        indexed matrix, keyed by its name
+    :rtype: tuple[dict[str, cache_utils.DDStatsIndex], dict[str, dict]]
+    """
+
+    stats_indexes = {
+        fname[: -len(cache_utils.DD_STATS_SUFFIX)]: cache_utils.DDStatsIndex(
+            path_matxs.joinpath(fname)
+        )
+        for fname in io_utils.get_fnames(path_matxs)
+        if fname.endswith(cache_utils.DD_STATS_SUFFIX)
+    }
 
-    # Plot distance difference maps
-    logger.info("Rendering distance difference maps...")
-    for dd_matx_fname in dd_matxs_fnames:
+    dd_stats = {}
+    for dd_matx_name in dd_matx_loaders:
+        stats_index = stats_indexes.get(dd_matx_name.split("_")[0])
+        stats = stats_index.get(dd_matx_name, path_matxs) if stats_index else None
+        if stats is not None:
+            dd_stats[dd_matx_name] = stats
 
-        # Only render if not already rendered or force=True
-        if not (
-            path_save_maps.joinpath(f"{dd_matx_fname[:-4]}.png").exists() and not force
-        ):
+    return stats_indexes, dd_stats
 
-            # Initialise plot area
-            fig, axes = plt.subplots(
-                # figsize=(10,3),
-                ncols=2,  # matrix | colour_bar
-                nrows=1,
-                gridspec_kw={"width_ratios": [4, 0.2]},
-                tight_layout=True,
-            )
 
-            # Plot heatmap
-            plot_2d_hist(
-                io_utils.load_matrix_from_tri_upper(path_matxs.joinpath(dd_matx_fname)),
-                axes,
-                heatmap_kwargs,
-            )
-            logger.debug(f"Rendered {dd_matx_fname}")
+def render_dd_maps(
+    dd_matx_loaders: "dict[str, Callable[[], ndarray]]",
+    path_save_maps: PosixPath,
+    force: bool = False,
+    nproc: int = None,
+    mode: str = "raster",
+    dd_stats: "dict[str, dict]" = None,
+) -> "dict[str, dict]":
+    """
+    Renders distance difference maps of the matrices returned by collect_dd_matxs(),
+    with a colour bar common to all. Maps are spread over a pool of worker processes,
+    planned from the number of maps to render, each of which reuses one figure for
+    all the maps it renders.
+
+    The colour bar is scaled to the largest distance in all matrices. This is read
+    from the statistics of indexed matrices (collect_dd_stats()), so only those not
+    indexed are loaded to find it, and none if all maps are already rendered.
+
+    Maps are rendered as PNG images of a fixed size by default (RasterMapWriter), or
+    in mode="vector" with one vector patch per matrix element, as by
+    seaborn.heatmap(), saved in both PNG and SVG format for publication figures.
+
+    :param dd_matx_loaders: Function loading each matrix, keyed by its name
+    :type dd_matx_loaders: dict[str, Callable[[], np.ndarray]]
+    :param path_save_maps: Path to save CA distance-diiference heatmaps.
+    :type path_save_maps: pathlib.Path
+    :param force: Re-render existing maps, defaults to False
+    :type force: bool, optional
+    :param nproc: Maximum number of processes, defaults to None (all available cores)
+    :type nproc: int, optional
+    :param mode: One of DD_MAP_MODES, defaults to "raster"
+    :type mode: str, optional
+    :param dd_stats: Statistics of indexed matrices, keyed by name, defaults to None
+    :type dd_stats: dict[str, dict], optional
+    :raises ValueError: Unknown mode
+    :return: Statistics of the matrices loaded to find the largest distance, keyed by
+        name, as returned by linear_algebra_utils.dd_matx_stats()
+    :rtype: dict[str, dict]
+    """
+
+    if dd_stats is None:
+        dd_stats = {}
 
-            # Format plot
-            add_colour_bar(fig, axes)
-            format_2d_hist(axes, " ".join(dd_matx_fname.split("_"))[:-4])
-            logger.debug(f"Formatted {dd_matx_fname}")
+    if mode not in DD_MAP_MODES:
+        raise ValueError(
+            f"Unknown distance difference map mode {mode}, expected one of "
+            f"{DD_MAP_MODES}"
+        )
 
-            # Save plot
-            io_utils.save_figure(
+    # Only render if not already rendered or force=True
+    to_render = []
+    for dd_matx_name in dd_matx_loaders:
+        if path_save_maps.joinpath(f"{dd_matx_name}.png").exists() and not force:
+            logger.debug(f"Skipping {dd_matx_name}")
+        else:
+            to_render.append(dd_matx_name)
+
+    if not to_render:
+        logger.info("All distance difference maps already rendered")
+        return {}
+
+    map_cost = (
+        parallel_utils.DD_MAP_COST
+        if mode == "vector"
+        else parallel_utils.DD_RASTER_MAP_COST
+    )
+    nproc = parallel_utils.plan_workers(
+        len(to_render) * map_cost,
+        len(to_render),
+        max_workers=nproc,
+    )
+    pool = parallel_utils.make_pool(nproc) if nproc > 1 else None
+
+    try:
+        # Find the maximum distance in all distance difference matrices, so maps
+        # share a colour scale with those already rendered. Only matrices not
+        # indexed are loaded
+        to_scan = [
+            (dd_matx_name, load_dd_matx)
+            for dd_matx_name, load_dd_matx in dd_matx_loaders.items()
+            if dd_matx_name not in dd_stats
+        ]
+        logger.info(
+            f"Finding maximum distance, {len(dd_matx_loaders) - len(to_scan)} of "
+            f"{len(dd_matx_loaders)} distance difference matrices indexed"
+        )
+        scanned_stats = dict(
+            pool.imap_unordered(_scan_dd_matx, to_scan, chunksize=16)
+            if pool
+            else map(_scan_dd_matx, to_scan)
+        )
+        max_distance = max(
+            (stats["max"] for stats in (*dd_stats.values(), *scanned_stats.values())),
+            default=0,
+        )
+        logger.info(f"Maximum distance: {max_distance}")
+
+        # Assign max distance to heatmap kwargs
+        heatmap_kwargs = make_heatmap_kwargs()
+        heatmap_kwargs["vmax"] = max_distance
+
+        # Make directory to save maps
+        path_save_maps.mkdir(parents=True, exist_ok=True)
+
+        # Plot distance difference maps
+        logger.info(
+            f"Rendering {len(to_render)} distance difference maps"
+            + (f" on {nproc} processes" if pool else "")
+        )
+        tasks = [
+            (
+                dd_matx_name,
+                dd_matx_loaders[dd_matx_name],
                 path_save_maps,
-                save_fname=f"{dd_matx_fname[:-4]}",
-                png=True,
-                svg=False,  # Can be very expensive
+                heatmap_kwargs,
+                mode,
             )
-            logger.debug(f"Saved {dd_matx_fname}")
+            for dd_matx_name in to_render
+        ]
+        rendered = (
+            pool.imap_unordered(_render_dd_map_task, tasks)
+            if pool
+            else map(_render_dd_map_task, tasks)
+        )
+        for num_rendered, dd_matx_name in enumerate(rendered, start=1):
+            logger.debug(f"Saved {dd_matx_name} ({num_rendered}/{len(tasks)})")
+
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+        # Figure and writer reused by serial rendering
+        _close_dd_map_figure()
+        _close_raster_map_writer()
 
-            # Close plot
-            plt.close(fig)
+    logger.info("Rendering done.")
 
-        else:
-            # Already rendered
-            logger.debug(f"Skipping {dd_matx_fname}")
+    return scanned_stats
 
-    logger.info("Rendering done.")
+
+def _scan_dd_matx(
+    dd_matx_loader: "tuple[str, Callable[[], ndarray]]",
+) -> "tuple[str, dict]":
+    """
+    Statistics of a distance difference matrix, loaded by the parsed function, as
+    saved (the upper triangle).
+    """
+
+    dd_matx_name, load_dd_matx = dd_matx_loader
+
+    return dd_matx_name, linear_algebra_utils.dd_matx_stats(triu(load_dd_matx()))
+
+
+def _get_dd_map_figure() -> "tuple[plt.Figure, ndarray]":
+    """
+    Figure and axes (matrix | colour bar) on which this process renders distance
+    difference maps. The figure and its canvas are created on first use and cleared
+    for each map, rather than a pyplot figure being created and closed per map. Axes
+    are recreated, so each map is laid out as on a new figure.
+    """
+
+    global _dd_map_figure
+
+    if _dd_map_figure is None:
+        _dd_map_figure = plt.figure(tight_layout=True)
+
+    _dd_map_figure.clear()
+    axes = _dd_map_figure.subplots(
+        ncols=2,  # matrix | colour_bar
+        nrows=1,
+        gridspec_kw={"width_ratios": [4, 0.2]},
+    )
+
+    return _dd_map_figure, axes
+
+
+def _close_dd_map_figure() -> None:
+    """
+    Closes the figure reused by this process to render distance difference maps.
+    """
+
+    global _dd_map_figure
+
+    if _dd_map_figure is not None:
+        plt.close(_dd_map_figure)
+        _dd_map_figure = None
+
+
+def _get_raster_map_writer(heatmap_kwargs: dict) -> RasterMapWriter:
+    """
+    Raster map writer of this process, created on first use and replaced if the
+    colour scale changes.
+    """
+
+    global _raster_map_writer
+
+    if _raster_map_writer is None or _raster_map_writer.vmax != heatmap_kwargs["vmax"]:
+        _raster_map_writer = RasterMapWriter(heatmap_kwargs)
+
+    return _raster_map_writer
+
+
+def _close_raster_map_writer() -> None:
+    """
+    Discards the raster map writer of this process.
+    """
+
+    global _raster_map_writer
+
+    _raster_map_writer = None
+
+
+def render_dd_map(
+    dd_matx_name: str,
+    load_dd_matx: "Callable[[], ndarray]",
+    path_save_maps: PosixPath,
+    heatmap_kwargs: dict,
+    mode: str = "raster",
+) -> None:
+    """
+    Renders and saves the distance difference map of one matrix, with the raster map
+    writer or on the figure reused by this process.
+
+    :param dd_matx_name: Name of the matrix, also the file name of the map
+    :type dd_matx_name: str
+    :param load_dd_matx: Function loading the full, symmetric matrix
+    :type load_dd_matx: Callable[[], np.ndarray]
+    :param path_save_maps: Path to save the map
+    :type path_save_maps: PosixPath
+    :param heatmap_kwargs: Keyword arguments of the heatmap, as returned by
+        make_heatmap_kwargs(), with the shared "vmax"
+    :type heatmap_kwargs: dict
+    :param mode: One of DD_MAP_MODES, defaults to "raster"
+    :type mode: str, optional
+    """
+
+    title = " ".join(dd_matx_name.split("_"))
+
+    if mode == "raster":
+        _get_raster_map_writer(heatmap_kwargs).write(
+            load_dd_matx(), title, path_save_maps.joinpath(f"{dd_matx_name}.png")
+        )
+        return
+
+    fig, axes = _get_dd_map_figure()
+
+    # Plot heatmap
+    plot_2d_hist(
+        load_dd_matx(),
+        axes,
+        heatmap_kwargs,
+    )
+    logger.debug(f"Rendered {dd_matx_name}")
+
+    # Format plot
+    add_colour_bar(fig, axes)
+    format_2d_hist(axes, title)
+    logger.debug(f"Formatted {dd_matx_name}")
+
+    # Save plot. save_figure() saves the current figure
+    plt.figure(fig)
+    io_utils.save_figure(
+        path_save_maps,
+        save_fname=dd_matx_name,
+        png=True,
+        svg=True,  # Expensive, so only for publication figures
+    )
+
+
+def _render_dd_map_task(task: "tuple[str, Callable, PosixPath, dict, str]") -> str:
+    """
+    Unpacks a rendering task submitted to the pool and renders the map.
+
+    :return: Name of the rendered matrix
+    :rtype: str
+    """
+
+    render_dd_map(*task)
+
+    return task[0]
@@ -0,0 +1,437 @@
+"""
+Single-file archive of the matrices of one UniProt segment. Clustering a segment of N
+chains otherwise writes N CA distance matrices, N UniProt residue ID files and up to
+N(N-1)/2 distance difference matrices as separate files, which strains the metadata
+servers of shared filesystems.
+
+Archives are append-only: records are added (or replaced) at the end of the file,
+followed by an index of all live records and a fixed-size footer pointing to it. Any
+record can then be read without reading the rest of the file, uncompressed records as
+memory maps. Space left by replaced records and earlier indices is reclaimed by
+compact(), which is run automatically once it exceeds the live data. Records added
+after the last index was written, e.g. by an interrupted run, are discarded on opening.
+
+File layout:
+
+    | header | record | record | ... | index (JSON) | footer |
+
+where the footer is ARCHIVE_MAGIC followed by the offset of the index (uint64).
+"""
+
+# Third party imports
+import json
+import os
+import zlib
+from logging import getLogger
+from pathlib import Path, PosixPath
+
+from numpy import ascontiguousarray, dtype, frombuffer, memmap, ndarray, uint8
+
+logger = getLogger(__name__)
+
+ARCHIVE_MAGIC = b"CCMATX01"  # Start of the header and footer
+FOOTER_SIZE = len(ARCHIVE_MAGIC) + 8
+ALIGNMENT = 64  # Records start at multiples of this many bytes, for memory maps
+SEARCH_CHUNK_SIZE = 1 << 20  # Bytes read at a time when searching for an index
+
+# Archive names, prefixed with the UniProt accession. CA distance matrices and UniProt
+# residue IDs are archived with path_ca, distance difference matrices with path_dd
+CA_ARCHIVE_SUFFIX = "_matrix_archive.npa"
+DD_ARCHIVE_SUFFIX = "_dd_archive.npa"
+
+
+def encode_record(array: ndarray, compress: bool = False) -> "tuple[dict, bytes]":
+    """
+    Encodes an array as an archive record. Records can be encoded by worker processes
+    and added to the archive by the process which owns it with put_encoded().
+
+    :param array: Numeric array
+    :type array: np.ndarray
+    :param compress: Compress the record with zlib, defaults to False. Compressed
+        records are decompressed on reading instead of memory-mapped
+    :type compress: bool, optional
+    :return: Description of the record (dtype, shape, codec) and its contents
+    :rtype: tuple[dict, bytes]
+    """
+
+    array = ascontiguousarray(array)
+    data = array.tobytes()
+
+    meta = {
+        "dtype": array.dtype.str,
+        "shape": list(array.shape),
+        "codec": "zlib" if compress else "raw",
+    }
+
+    return meta, zlib.compress(data, 1) if compress else data
+
+
+def ca_archive_path(path_ca: "PosixPath|str", unp: str) -> PosixPath:
+    """
+    Path to the archive of CA distance matrices and UniProt residue IDs of a segment.
+    """
+
+    return Path(path_ca).joinpath(f"{unp}{CA_ARCHIVE_SUFFIX}")
+
+
+def dd_archive_path(path_dd: "PosixPath|str", unp: str) -> PosixPath:
+    """
+    Path to the archive of distance difference matrices of a segment.
+    """
+
+    return Path(path_dd).joinpath(f"{unp}{DD_ARCHIVE_SUFFIX}")
+
+
+class MatrixArchive:
+    """
+    Append-only archive of named arrays in a single file, with indexed random access.
+    Records are added with put() or put_encoded() and written to disk immediately,
+    but only become visible to other readers once flush() writes the index.
+
+    Only one process may write to an archive at a time.
+    """
+
+    def __init__(self, path: "PosixPath|str", read_only: bool = False) -> None:
+        """
+        Constructor -- opens the archive at path, creating it if needed. Unreadable
+        archives are logged and replaced with an empty archive.
+
+        :param path: Path to archive (including file name)
+        :type path: PosixPath|str
+        :param read_only: Open without creating, repairing or writing to the archive,
+            defaults to False
+        :type read_only: bool, optional
+        :raises FileNotFoundError: Archive opened read-only does not exist
+        """
+
+        self.path = Path(path)
+        self.read_only = read_only
+        self.index = {
+            # "ca/1atp_A" : [offset, nbytes, {"dtype": ..., "shape": ..., "codec": ...}],
+            # ...
+        }
+        self._map = None
+        self._writer = None  # File handle for appending records, opened on first use
+        self._garbage = 0  # Bytes of replaced records, padding and earlier indices
+        self._index_nbytes = 0  # Bytes of the current index and footer
+        self._dirty = False
+
+        if read_only:
+            self._read_index()
+            return
+
+        if not self.path.exists():
+            self._create()
+            return
+
+        try:
+            self._read_index()
+        except ValueError:
+            logger.warning(
+                f"Matrix archive {self.path} is unreadable, all archived matrices will "
+                "be regenerated"
+            )
+            self._create()
+
+    def _create(self) -> None:
+        """
+        Writes an empty archive.
+        """
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.index = {}
+        self._garbage = 0
+
+        with open(self.path, "wb") as archive_file:
+            archive_file.write(ARCHIVE_MAGIC.ljust(ALIGNMENT, b"\0"))
+            self._write_index(archive_file)
+
+    def _read_index(self) -> None:
+        """
+        Loads the index from the last footer of the archive. Anything after the last
+        footer was not flushed and is discarded (the file is truncated unless opened
+        read-only).
+
+        :raises ValueError: No readable index was found
+        """
+
+        with open(self.path, "rb") as archive_file:
+            if archive_file.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+                raise ValueError(f"{self.path} is not a matrix archive")
+
+            end = archive_file.seek(0, os.SEEK_END)
+            index_offset, self.index, footer_end = self._find_index(archive_file, end)
+
+        if footer_end < end:
+            logger.warning(f"Discarding records added to {self.path} after its index")
+            if not self.read_only:
+                os.truncate(self.path, footer_end)
+
+        self._index_nbytes = footer_end - index_offset
+
+        live_bytes = sum(nbytes for _, nbytes, _ in self.index.values())
+        self._garbage = max(0, index_offset - ALIGNMENT - live_bytes)
+
+    @staticmethod
+    def _load_index(archive_file, footer_end: int) -> "tuple[int, dict]|None":
+        """
+        Loads the index pointed to by a footer ending at footer_end, or returns None if
+        there is no valid footer and index there.
+        """
+
+        if footer_end < ALIGNMENT + FOOTER_SIZE:
+            return None
+
+        archive_file.seek(footer_end - FOOTER_SIZE)
+        footer = archive_file.read(FOOTER_SIZE)
+        if footer[: len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+            return None
+
+        index_offset = int.from_bytes(footer[len(ARCHIVE_MAGIC) :], "little")
+        if not ALIGNMENT <= index_offset < footer_end - FOOTER_SIZE:
+            return None
+
+        archive_file.seek(index_offset)
+        try:
+            index = json.loads(
+                archive_file.read(footer_end - FOOTER_SIZE - index_offset)
+            )
+        except ValueError:
+            return None
+
+        return (index_offset, index) if isinstance(index, dict) else None
+
+    def _find_index(self, archive_file, end: int) -> "tuple[int, dict, int]":
+        """
+        Finds the last valid index in the archive. This is normally at the end of the
+        file, otherwise the file is searched backwards for the footer of the last
+        flush, which follows the closing brace of its index.
+
+        :raises ValueError: No valid index was found
+        :return: Offset and contents of the index, and the end of its footer
+        :rtype: tuple[int, dict, int]
+        """
+
+        found = self._load_index(archive_file, end)
+        if found:
+            return (*found, end)
+
+        pattern = b"}" + ARCHIVE_MAGIC
+        search_end = end
+        while search_end > ALIGNMENT:
+            start = max(ALIGNMENT, search_end - SEARCH_CHUNK_SIZE)
+            archive_file.seek(start)
+
+            # Overlap the next chunk, to find footers which span both
+            chunk = archive_file.read(search_end - start + len(pattern) - 1)
+
+            position = chunk.rfind(pattern, 0, search_end - start)
+            while position >= 0:
+                footer_end = start + position + 1 + FOOTER_SIZE
+                found = self._load_index(archive_file, footer_end)
+                if found and footer_end <= end:
+                    return (*found, footer_end)
+                position = chunk.rfind(pattern, 0, position)
+
+            search_end = start
+
+        raise ValueError(f"No index found in {self.path}")
+
+    def _write_index(self, archive_file) -> None:
+        """
+        Writes the index and footer at the current (end) position of the open file.
+        """
+
+        index_offset = archive_file.tell()
+        archive_file.write(json.dumps(self.index, separators=(",", ":")).encode())
+        archive_file.write(ARCHIVE_MAGIC + index_offset.to_bytes(8, "little"))
+
+        self._index_nbytes = archive_file.tell() - index_offset
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def keys(self, prefix: str = "") -> "list[str]":
+        """
+        Names of the records in the archive, optionally only those starting with
+        prefix, in the order they were added.
+        """
+
+        return [key for key in self.index if key.startswith(prefix)]
+
+    def get(self, key: str) -> ndarray:
+        """
+        Reads a record. Uncompressed records are returned as read-only views of a
+        memory map of the archive, so only the pages accessed are read.
+
+        :param key: Name of the record
+        :type key: str
+        :raises KeyError: No record with this name
+        :return: Array
+        :rtype: np.ndarray
+        """
+
+        offset, nbytes, meta = self.index[key]
+
+        # Map again if the record was added after the archive was mapped
+        if self._map is None or offset + nbytes > self._map.shape[0]:
+            if self._writer:
+                self._writer.flush()
+            self._map = memmap(self.path, dtype=uint8, mode="r")
+
+        data = self._map[offset : offset + nbytes]
+
+        if meta["codec"] == "zlib":
+            data = frombuffer(zlib.decompress(data), dtype=uint8)
+
+        return data.view(dtype(meta["dtype"])).reshape(meta["shape"])
+
+    def put(self, key: str, array: ndarray, compress: bool = False) -> None:
+        """
+        Adds a record, replacing any record with the same name.
+
+        :param key: Name of the record, e.g. "ca/1atp_A"
+        :type key: str
+        :param array: Numeric array
+        :type array: np.ndarray
+        :param compress: Compress the record, defaults to False
+        :type compress: bool, optional
+        """
+
+        self.put_encoded(key, encode_record(array, compress=compress))
+
+    def put_encoded(self, key: str, record: "tuple[dict, bytes]") -> None:
+        """
+        Adds a record encoded by encode_record(), replacing any record with the same
+        name.
+
+        :param key: Name of the record
+        :type key: str
+        :param record: Encoded record
+        :type record: tuple[dict, bytes]
+        """
+
+        self._check_writable()
+        meta, data = record
+
+        if self._writer is None:
+            self._writer = open(self.path, "r+b")
+
+        end = self._writer.seek(0, os.SEEK_END)
+        offset = -(-end // ALIGNMENT) * ALIGNMENT
+
+        self._writer.write(b"\0" * (offset - end))
+        self._writer.write(data)
+
+        if key in self.index:
+            self._garbage += self.index[key][1]
+
+        self.index[key] = [offset, len(data), meta]
+        self._dirty = True
+
+    def delete(self, key: str) -> None:
+        """
+        Removes a record from the index, if present. Its space is reclaimed by
+        compact().
+        """
+
+        self._check_writable()
+
+        if key in self.index:
+            self._garbage += self.index.pop(key)[1]
+            self._dirty = True
+
+    def _check_writable(self) -> None:
+        """
+        Raises ValueError if the archive was opened read-only.
+        """
+
+        if self.read_only:
+            raise ValueError(f"Matrix archive {self.path} was opened read-only")
+
+    def flush(self) -> None:
+        """
+        Writes the index of all records added since the last flush, making them
+        visible to readers. The archive is compacted first if more than half of it is
+        unused.
+        """
+
+        if not self._dirty:
+            return
+
+        # Records were appended after the previous index
+        self._garbage += self._index_nbytes
+
+        live_bytes = sum(nbytes for _, nbytes, _ in self.index.values())
+        if self._garbage > live_bytes:
+            self.compact()
+            return
+
+        if self._writer is None:
+            self._writer = open(self.path, "r+b")
+
+        self._writer.seek(0, os.SEEK_END)
+        self._write_index(self._writer)
+        self._writer.close()
+
+        self._writer = None
+        self._map = None
+        self._dirty = False
+
+        logger.debug(f"Saved index of {len(self.index)} records to {self.path}")
+
+    def compact(self) -> None:
+        """
+        Rewrites the archive with only its live records. The new archive is written
+        under a temporary name and moved into place.
+        """
+
+        self._check_writable()
+        if self._writer:
+            self._writer.close()
+            self._writer = None
+
+        path_temp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        old_index = self.index
+        new_index = {}
+
+        with open(self.path, "rb") as old_file, open(path_temp, "wb") as new_file:
+            new_file.write(ARCHIVE_MAGIC.ljust(ALIGNMENT, b"\0"))
+
+            for key, (offset, nbytes, meta) in old_index.items():
+                position = new_file.tell()
+                new_offset = -(-position // ALIGNMENT) * ALIGNMENT
+                new_file.write(b"\0" * (new_offset - position))
+
+                old_file.seek(offset)
+                new_file.write(old_file.read(nbytes))
+                new_index[key] = [new_offset, nbytes, meta]
+
+            self.index = new_index
+            self._write_index(new_file)
+
+        os.replace(path_temp, self.path)
+
+        self._map = None
+        self._garbage = 0
+        self._dirty = False
+
+        logger.debug(f"Compacted {self.path} to {len(self.index)} records")
+
+    def close(self) -> None:
+        """
+        Flushes the index and releases the memory map of the archive.
+        """
+
+        if not self.read_only:
+            self.flush()
+        self._map = None
+
+    def __enter__(self) -> "MatrixArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
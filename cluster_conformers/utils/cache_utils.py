@@ -0,0 +1,413 @@
+"""
+Manifest of cached CA distance and distance difference matrices. Each cached matrix is
+recorded with a hash of the data it was generated from and the version of the
+algorithm generating it, so stale matrices are found and regenerated automatically
+rather than listed by hand.
+
+Summary statistics of saved distance difference matrices are indexed alongside them,
+so distance difference maps can be scaled without loading every matrix.
+"""
+
+# Third party imports
+import json
+import os
+from hashlib import sha1
+from logging import getLogger
+from pathlib import Path, PosixPath
+
+from numpy import ascontiguousarray, float64, int64
+
+logger = getLogger(__name__)
+
+# Version of CA distance matrix generation and scoring. Increment on any change which
+# alters saved matrices or scores, so all cached artefacts are regenerated
+ALGORITHM_VERSION = 1
+
+# Suffix of cache manifests, "<unp>_cache_manifest.json"
+CACHE_MANIFEST_SUFFIX = "_cache_manifest.json"
+
+# Suffix of distance difference matrix statistics indexes, "<unp>_dd_stats.json"
+DD_STATS_SUFFIX = "_dd_stats.json"
+
+# Fields of _atom_site, as parsed for each chain, that matrices are generated from
+HASHED_FIELDS = (
+    ("cartn_x", float64),
+    ("cartn_y", float64),
+    ("cartn_z", float64),
+    ("unp_res_ids", int64),
+)
+
+
+def source_stat(path: "PosixPath|str") -> "dict[str, int]":
+    """
+    Size and modification time of a source file, used to skip hashing files which
+    have not changed since their matrices were cached.
+
+    :param path: Path to source (updated mmCIF) file
+    :type path: PosixPath|str
+    :return: Size in bytes and modification time in nanoseconds
+    :rtype: dict[str, int]
+    """
+
+    stat = os.stat(path)
+
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def hash_chain(chain_xyz_unp: dict) -> str:
+    """
+    Returns a SHA-1 hash of the CA subset of _atom_site for one chain, as returned by
+    parsing_utils.parse_mmcif_chains(), and the algorithm version.
+
+    :param chain_xyz_unp: Cartesian coordinates and UniProt residue IDs of the chain
+    :type chain_xyz_unp: dict[str, np.ndarray]
+    :return: Hexadecimal digest
+    :rtype: str
+    """
+
+    digest = sha1(f"v{ALGORITHM_VERSION}".encode())
+    for field, field_dtype in HASHED_FIELDS:
+        digest.update(
+            ascontiguousarray(chain_xyz_unp[field], dtype=field_dtype).tobytes()
+        )
+
+    return digest.hexdigest()
+
+
+def make_ca_entry(
+    chain_id: str,
+    mmcif_path: "PosixPath|str",
+    chain_hash: str,
+    alignment: str = "dense",
+) -> dict:
+    """
+    Creates the manifest entry of a CA distance matrix.
+
+    :param chain_id: Chain ID in the source mmCIF file
+    :type chain_id: str
+    :param mmcif_path: Path to the source (updated) mmCIF file
+    :type mmcif_path: PosixPath|str
+    :param chain_hash: Hash of the chain, as returned by hash_chain()
+    :type chain_hash: str
+    :param alignment: Residue alignment of the matrix, "dense" (all UniProt residues
+        from 1) or "sparse" (observed residues only), defaults to "dense"
+    :type alignment: str, optional
+    :return: Manifest entry
+    :rtype: dict
+    """
+
+    return {
+        "chain_id": chain_id,
+        "source": str(mmcif_path),
+        **source_stat(mmcif_path),
+        "hash": chain_hash,
+        "version": ALGORITHM_VERSION,
+        "alignment": alignment,
+    }
+
+
+def _entry_matches_alignment(entry: dict, alignment: str) -> bool:
+    """
+    Whether a matrix was generated with the given residue alignment. Entries of
+    earlier versions, without an alignment, are dense.
+    """
+
+    return entry.get("alignment", "dense") == alignment
+
+
+def ca_entry_matches_source(
+    entry: dict, chain_id: str, mmcif_path: "PosixPath|str", alignment: str = "dense"
+) -> bool:
+    """
+    Whether a CA matrix was generated from the same chain of the source file, as it is
+    now, by the current algorithm. Only the size and modification time of the file are
+    compared, so the file is not read.
+
+    :param entry: Manifest entry of the matrix, or None if not recorded
+    :type entry: dict
+    :param chain_id: Chain ID in the source mmCIF file
+    :type chain_id: str
+    :param mmcif_path: Path to the source (updated) mmCIF file
+    :type mmcif_path: PosixPath|str
+    :param alignment: Residue alignment of the matrix, defaults to "dense"
+    :type alignment: str, optional
+    :return: True if the matrix is unchanged
+    :rtype: bool
+    """
+
+    if (
+        not entry
+        or entry.get("version") != ALGORITHM_VERSION
+        or not _entry_matches_alignment(entry, alignment)
+    ):
+        return False
+
+    try:
+        stat = source_stat(mmcif_path)
+    except FileNotFoundError:
+        return False
+
+    return (
+        entry.get("chain_id") == chain_id
+        and entry.get("source") == str(mmcif_path)
+        and entry.get("size") == stat["size"]
+        and entry.get("mtime_ns") == stat["mtime_ns"]
+    )
+
+
+def ca_entry_matches_hash(
+    entry: dict, chain_id: str, chain_hash: str, alignment: str = "dense"
+) -> bool:
+    """
+    Whether a CA matrix was generated from identical coordinates of the same chain by
+    the current algorithm.
+
+    :param entry: Manifest entry of the matrix, or None if not recorded
+    :type entry: dict
+    :param chain_id: Chain ID in the source mmCIF file
+    :type chain_id: str
+    :param chain_hash: Hash of the chain, as returned by hash_chain()
+    :type chain_hash: str
+    :param alignment: Residue alignment of the matrix, defaults to "dense"
+    :type alignment: str, optional
+    :return: True if the matrix is unchanged
+    :rtype: bool
+    """
+
+    return bool(entry) and (
+        entry.get("version") == ALGORITHM_VERSION
+        and entry.get("chain_id") == chain_id
+        and entry.get("hash") == chain_hash
+        and _entry_matches_alignment(entry, alignment)
+    )
+
+
+class CacheManifest:
+    """
+    JSON record of the cached matrices of one UniProt accession. CA distance matrices
+    are keyed by PDBe chain ID, "1atp_A", and distance difference matrices by file
+    name, "P12345_1atp_A_to_2adp_B.npz":
+
+        {
+            "ca": {"1atp_A": {"chain_id": "A", "source": ..., "size": ...,
+                              "mtime_ns": ..., "hash": ..., "version": 1,
+                              "alignment": "dense"}, ...},
+            "dd": {"P12345_1atp_A_to_2adp_B.npz": {"chains": [<key>, <key>],
+                                                   "version": 1}, ...}
+        }
+
+    Distance difference matrices are current if the keys (chain ID and hash) of both
+    chains compared are unchanged.
+    """
+
+    def __init__(self, path: "PosixPath|str") -> None:
+        """
+        Constructor -- loads the manifest saved at path, if any.
+
+        :param path: Path to manifest (including file name)
+        :type path: PosixPath|str
+        """
+
+        self.path = Path(path)
+        self.entries = {"ca": {}, "dd": {}}
+
+        try:
+            with open(self.path) as manifest_file:
+                self.entries.update(json.load(manifest_file))
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError):
+            logger.warning(
+                f"Cache manifest {self.path} is unreadable, all cached matrices will be "
+                "regenerated"
+            )
+            self.entries = {"ca": {}, "dd": {}}
+
+    def ca_entry(self, pdbe_chain_id: str) -> dict:
+        """
+        Returns the entry of a CA distance matrix, or None if not recorded.
+        """
+
+        return self.entries["ca"].get(pdbe_chain_id)
+
+    def record_ca(self, pdbe_chain_id: str, entry: dict) -> None:
+        """
+        Records a generated CA distance matrix, as created by make_ca_entry().
+        """
+
+        self.entries["ca"][pdbe_chain_id] = entry
+
+    def chain_key(self, pdbe_chain_id: str) -> str:
+        """
+        Key of a chain, "<pdbe_chain_id>:<hash>", which changes whenever its CA
+        distance matrix is regenerated from different coordinates.
+
+        :param pdbe_chain_id: PDBe chain ID, e.g. "1atp_A"
+        :type pdbe_chain_id: str
+        :raises KeyError: No CA distance matrix is recorded for the chain
+        :return: Key of the chain
+        :rtype: str
+        """
+
+        return f"{pdbe_chain_id}:{self.entries['ca'][pdbe_chain_id]['hash']}"
+
+    def dd_is_current(self, file_name: str, key_A: str, key_B: str) -> bool:
+        """
+        Whether a saved distance difference matrix was generated from the current
+        versions of both chains.
+
+        :param file_name: File name of the matrix
+        :type file_name: str
+        :param key_A: Key of the first chain, as returned by chain_key()
+        :type key_A: str
+        :param key_B: Key of the second chain, as returned by chain_key()
+        :type key_B: str
+        :return: True if the matrix is current
+        :rtype: bool
+        """
+
+        entry = self.entries["dd"].get(file_name)
+
+        return bool(entry) and (
+            entry.get("version") == ALGORITHM_VERSION
+            and entry.get("chains") == [key_A, key_B]
+        )
+
+    def record_dd(self, file_name: str, key_A: str, key_B: str) -> None:
+        """
+        Records a saved distance difference matrix and the keys of the chains compared.
+        """
+
+        self.entries["dd"][file_name] = {
+            "chains": [key_A, key_B],
+            "version": ALGORITHM_VERSION,
+        }
+
+    def save(self) -> None:
+        """
+        Writes the manifest. A temporary file is written first and moved into place,
+        so an interrupted write never leaves a truncated manifest.
+        """
+
+        path_temp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(path_temp, "w") as manifest_file:
+            json.dump(self.entries, manifest_file, indent=1, sort_keys=True)
+        os.replace(path_temp, self.path)
+
+        logger.debug(f"Saved cache manifest to {self.path}")
+
+
+def dd_stats_path(path_dd: "PosixPath|str", unp: str) -> PosixPath:
+    """
+    Path of the statistics index of the distance difference matrices of a UniProt
+    accession, saved in the distance difference matrix directory.
+    """
+
+    return Path(path_dd).joinpath(f"{unp}{DD_STATS_SUFFIX}")
+
+
+class DDStatsIndex:
+    """
+    JSON index of summary statistics of the saved distance difference matrices of one
+    UniProt accession, keyed by matrix name, "P12345_1atp_A_to_2adp_B":
+
+        {"P12345_1atp_A_to_2adp_B": {"max": 12.3, "sum": 456.7, "nnz": 89,
+                                     "score": 1.2, "version": 1, "size": ...,
+                                     "mtime_ns": ...}, ...}
+
+    Statistics are those of the matrix as saved, as returned by
+    linear_algebra_utils.dd_matx_stats(), with the score of the pair if known.
+    Matrices saved as files are recorded with their size and modification time, so
+    entries of matrices since overwritten are ignored. Entries of archived matrices
+    are current until replaced, as archived matrices are only written alongside them.
+    """
+
+    def __init__(self, path: "PosixPath|str") -> None:
+        """
+        Constructor -- loads the index saved at path, if any.
+
+        :param path: Path to index (including file name)
+        :type path: PosixPath|str
+        """
+
+        self.path = Path(path)
+        self.entries = {}
+        self.changed = False
+
+        try:
+            with open(self.path) as index_file:
+                self.entries = json.load(index_file)
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError):
+            logger.warning(
+                f"Distance difference statistics index {self.path} is unreadable, "
+                "statistics will be recomputed"
+            )
+
+    def get(self, name: str, path_dd: "PosixPath|str") -> dict:
+        """
+        Returns the statistics of a saved distance difference matrix, or None if not
+        recorded or the matrix has changed since.
+
+        :param name: Name of the matrix, its file name without suffix
+        :type name: str
+        :param path_dd: Path to the distance difference matrix directory
+        :type path_dd: PosixPath|str
+        :return: Statistics of the matrix
+        :rtype: dict
+        """
+
+        entry = self.entries.get(name)
+        if not entry or entry.get("version") != ALGORITHM_VERSION:
+            return None
+
+        # Matrices saved as files
+        if "size" in entry:
+            try:
+                stat = source_stat(Path(path_dd).joinpath(f"{name}.npz"))
+            except FileNotFoundError:
+                return None
+
+            if (entry["size"], entry["mtime_ns"]) != (stat["size"], stat["mtime_ns"]):
+                return None
+
+        return entry
+
+    def record(self, name: str, stats: dict, path_dd: "PosixPath|str") -> None:
+        """
+        Records the statistics of a saved distance difference matrix, with the size
+        and modification time of its file, if saved as a file in path_dd.
+
+        :param name: Name of the matrix, its file name without suffix
+        :type name: str
+        :param stats: Statistics of the matrix, and its score if known
+        :type stats: dict
+        :param path_dd: Path to the distance difference matrix directory
+        :type path_dd: PosixPath|str
+        """
+
+        entry = {**stats, "version": ALGORITHM_VERSION}
+        try:
+            entry.update(source_stat(Path(path_dd).joinpath(f"{name}.npz")))
+        except FileNotFoundError:
+            pass  # Archived
+
+        self.entries[name] = entry
+        self.changed = True
+
+    def save(self) -> None:
+        """
+        Writes the index if changed, via a temporary file as CacheManifest.save().
+        """
+
+        if not self.changed:
+            return
+
+        path_temp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        with open(path_temp, "w") as index_file:
+            json.dump(self.entries, index_file, indent=1, sort_keys=True)
+        os.replace(path_temp, self.path)
+        self.changed = False
+
+        logger.debug(f"Saved distance difference statistics index to {self.path}")
@@ -5,17 +5,22 @@ relate to matrices and figures.
 """
 
 from logging import getLogger
-from os import rename
-from pathlib import PosixPath
+from os import getpid, rename, replace
+from pathlib import Path, PosixPath
 from pickle import dump, load
 from subprocess import check_output
 
 # Third party imports
 from gemmi import cif
 from matplotlib import pyplot as plt
-from numpy import around, float32
+from numpy import around, array_equal, asarray, float32, float64
 from numpy import load as np_load
-from numpy import ndarray, savez_compressed, triu
+from numpy import save as np_save
+from numpy import char, ndarray, savez_compressed, triu, triu_indices
+from scipy.spatial.distance import squareform
+
+# Custom imports
+from . import linear_algebra_utils
 
 # Load logger
 logger = getLogger(__name__)
@@ -93,6 +98,191 @@ def save_compressed_matrix(
     savez_compressed(path, matrix)
 
 
+def round_upper_triangle(matrix: ndarray) -> ndarray:
+    """
+    Upper triangle of an N*N-square, symmetric matrix, rounded to 1 d.p. and as
+    float32, as saved by save_compressed_matrix(). The lower triangle is zero.
+
+    :param matrix: Any N*N-square, symmetric matrix.
+    :type matrix: np.ndarray
+    :return: Rounded upper triangle
+    :rtype: np.ndarray
+    """
+
+    return float32(around(triu(matrix), 1))
+
+
+def save_packed_matrix(matrix: ndarray, path: "PosixPath|str") -> PosixPath:
+    """
+    Saves the upper triangle of an N*N-square, symmetric matrix in packed form, as
+    linear_algebra_utils.PackedTriangularMatrix, so only N(N+1)/2 values are stored.
+    Values are rounded to 1 d.p. and stored as float32, as by save_compressed_matrix().
+
+    Matrices are saved uncompressed as .npy files, which load_packed_matrix() opens as
+    memory maps. They are written under a temporary name and moved into place, so
+    readers never map a partly written matrix.
+
+    :param matrix: Any N*N-square, symmetric matrix.
+    :type matrix: np.ndarray
+    :param path: Path to save the matrix, with or without suffix
+    :type path: pathlib.Path|str
+    :return: Path to the saved matrix
+    :rtype: pathlib.Path
+    """
+
+    packed = linear_algebra_utils.PackedTriangularMatrix.pack(
+        round_upper_triangle(matrix)
+    )
+
+    path = Path(path).with_suffix(".npy")
+    path_temp = path.with_name(f".{path.name}.{getpid()}.tmp")
+
+    with open(path_temp, "wb") as matx_file:
+        np_save(matx_file, packed)
+    replace(path_temp, path)
+
+    return path
+
+
+def load_packed_matrix(path: "PosixPath|str", form: str = "dense") -> "ndarray|object":
+    """
+    Loads a matrix saved by save_packed_matrix(). Uncompressed (.npy) matrices are
+    opened as read-only memory maps, so pages are read from, and shared through, the
+    OS page cache as they are accessed. A .npz file with the same name is loaded if no
+    .npy file exists. Square matrices saved by save_compressed_matrix(), as by earlier
+    versions, are loaded in the same forms.
+
+    :param path: Path to saved matrix, with either suffix or none
+    :type path: PosixPath|str
+    :param form: Form to return: "packed" for the packed vector, "view" for a
+        linear_algebra_utils.PackedTriangularMatrix of it or "dense" for the N*N upper
+        triangular matrix, defaults to "dense"
+    :type form: str, optional
+    :raises ValueError: Unknown form
+    :return: Matrix in the requested form
+    :rtype: np.ndarray|linear_algebra_utils.PackedTriangularMatrix
+    """
+
+    if form not in ("packed", "view", "dense"):
+        raise ValueError(f"Unknown matrix form {form}, use packed, view or dense")
+
+    path = Path(path)
+
+    if path.with_suffix(".npy").exists():
+        matx = np_load(path.with_suffix(".npy"), mmap_mode="r")
+    else:
+        matx = load_matrix(path.with_suffix(".npz"))
+
+    # Square matrix of earlier versions
+    if matx.ndim == 2:
+        if form == "dense":
+            return matx
+        matx = linear_algebra_utils.PackedTriangularMatrix.pack(matx)
+
+    if form == "packed":
+        return matx
+
+    view = linear_algebra_utils.PackedTriangularMatrix(matx)
+
+    return view if form == "view" else view.to_dense()
+
+
+def packed_matrix_exists(path: "PosixPath|str") -> bool:
+    """
+    Whether a matrix can be loaded by load_packed_matrix(), in any format.
+
+    :param path: Path to saved matrix, with either suffix or none
+    :type path: PosixPath|str
+    :return: True if a .npy or .npz file exists
+    :rtype: bool
+    """
+
+    path = Path(path)
+
+    return path.with_suffix(".npy").exists() or path.with_suffix(".npz").exists()
+
+
+def migrate_to_packed_matrix(path: "PosixPath|str", keep: bool = False) -> PosixPath:
+    """
+    Converts a square matrix saved by save_compressed_matrix(), or as an uncompressed
+    square matrix, to the packed, uncompressed format of save_packed_matrix(). The
+    values are unchanged, as all formats store the same rounded, float32 upper
+    triangle. A .npz file is removed once the .npy file has been written and checked,
+    unless keep=True. Packed matrices are left as they are.
+
+    :param path: Path to saved matrix (.npz or .npy)
+    :type path: PosixPath|str
+    :param keep: Keep the .npz file, defaults to False
+    :type keep: bool, optional
+    :raises ValueError: The converted matrix differs from the original
+    :return: Path to the packed matrix
+    :rtype: pathlib.Path
+    """
+
+    path = Path(path)
+
+    if path.suffix == ".npy":
+        matx = np_load(path)
+    else:
+        matx = load_matrix(path)
+
+    if matx.ndim == 1:
+        return path
+
+    path_packed = save_packed_matrix(matx, path)
+
+    # Unmodelled residues are NaN
+    if not array_equal(load_packed_matrix(path_packed), triu(matx), equal_nan=True):
+        raise ValueError(f"Matrix {path} changed on conversion")
+
+    if not keep and path.suffix == ".npz":
+        path.unlink()
+
+    return path_packed
+
+
+def save_condensed_matrix(
+    matrix: ndarray, path: "PosixPath|str", label: str = None
+) -> None:
+    """
+    Saves a condensed matrix (upper triangle of an N*N-square, symmetric matrix without
+    the diagonal, as returned by scipy.spatial.distance.pdist()) as .npz file, rounded
+    and stored as for save_compressed_matrix().
+
+    :param matrix: Condensed matrix
+    :type matrix: np.ndarray
+    :param path: Path to save the matrix.
+    :type path: pathlib.Path|str
+    :param label: Identification label in case save is unsuccessful, defaults to None
+    :type label: str, optional
+    """
+
+    try:
+        savez_compressed(path, float32(around(matrix, 1)))
+    except Exception:
+        logger.error(f"Could not save matrix: {label}", exc_info=True)
+
+
+def load_condensed_matrix(path: "PosixPath|str") -> ndarray:
+    """
+    Loads a matrix saved by save_condensed_matrix(). Square matrices saved by
+    save_compressed_matrix(), as by earlier versions, are condensed on loading.
+
+    :param path: Path to saved matrix (including file name)
+    :type path: PosixPath|str
+    :return: Condensed matrix
+    :rtype: np.ndarray
+    """
+
+    matx = load_matrix(path)
+
+    # Upper triangle of a square, symmetric matrix
+    if matx.ndim == 2:
+        matx = squareform(matx + matx.T, checks=False)
+
+    return matx
+
+
 def save_string_based_matx(
     matrix: ndarray, path: "PosixPath|str", label: str = None
 ) -> None:
@@ -130,6 +320,31 @@ def load_matrix(path: "PosixPath|str") -> ndarray:
     return matx
 
 
+def load_pair_labels(path: "PosixPath|str") -> ndarray:
+    """
+    Loads the labels, "<pdbe_chain_id>_to_<pdbe_chain_id>", of each score in a
+    condensed score matrix from the saved label matrix. Label matrices hold the PDBe
+    chain IDs of the clustered chains, or the N*N-square matrix of labels saved by
+    earlier versions.
+
+    :param path: Path to saved label matrix (including file name)
+    :type path: PosixPath|str
+    :return: Label of each chain-chain comparison, in condensed order
+    :rtype: np.ndarray
+    """
+
+    matx = load_matrix(path)
+
+    # Labels are in the upper triangle of N*N label matrices
+    if matx.ndim == 2:
+        return matx[triu_indices(matx.shape[0], k=1)].astype(str)
+
+    pdbe_chain_ids = matx.astype(str)
+    rows, columns = triu_indices(pdbe_chain_ids.shape[0], k=1)
+
+    return char.add(char.add(pdbe_chain_ids[rows], "_to_"), pdbe_chain_ids[columns])
+
+
 def get_fnames(path: "PosixPath|str") -> "list[str]":
     """
     Given a path to a dir containing files, returns a list of file names in the dir
@@ -243,3 +458,47 @@ def load_matrix_from_tri_upper(path: "PosixPath|str") -> ndarray:
     # )
 
     return matx_upper_tri.T + matx_upper_tri
+
+
+def save_score_cache(
+    path: "PosixPath|str", chain_keys: ndarray, scores: ndarray
+) -> None:
+    """
+    Saves a cache of chain-chain scores. Scores are stored in condensed form (the upper
+    triangle, row by row, as scipy.spatial.distance.squareform()), with NaN for pairs
+    that have not been scored.
+
+    :param path: Path to save the cache (including file name)
+    :type path: PosixPath|str
+    :param chain_keys: Key of each chain, "<pdbe_chain_id>:<content hash>"
+    :type chain_keys: np.ndarray
+    :param scores: Condensed scores between all chains in chain_keys
+    :type scores: np.ndarray
+    """
+
+    try:
+        savez_compressed(
+            path,
+            chain_keys=asarray(chain_keys, dtype=str),
+            scores=asarray(scores, dtype=float64),
+        )
+    except Exception:
+        logger.error(f"Could not save score cache: {path}", exc_info=True)
+
+
+def load_score_cache(path: "PosixPath|str") -> "tuple[ndarray, ndarray]":
+    """
+    Loads a cache of chain-chain scores saved by save_score_cache(). Returns empty
+    arrays if no cache has been saved.
+
+    :param path: Path to saved cache (including file name)
+    :type path: PosixPath|str
+    :return: Key of each chain and condensed scores between them
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+
+    try:
+        with np_load(path) as npz_obj:
+            return npz_obj["chain_keys"], npz_obj["scores"]
+    except FileNotFoundError:
+        return asarray([], dtype=str), asarray([], dtype=float64)
@@ -7,20 +7,56 @@ calculations performed in the package, with the scripts they call handling speci
 logic, such as deciding which chains to call these functions on.
 """
 
-from math import dist
+from math import dist, isqrt
 
 from numpy import (
     absolute,
+    arange,
     asarray,
+    column_stack,
+    count_nonzero,
     delete,
+    divide,
+    empty,
+    flatnonzero,
+    float32,
+    float64,
+    full,
+    greater_equal,
+    inf,
+    int64,
     intersect1d,
     isnan,
+    maximum,
+    minimum,
+    nan,
     ndarray,
+    repeat,
+    result_type,
+    rint,
     s_,
+    sort,
+    sqrt,
+    subtract,
     sum,
+    take_along_axis,
+    tril_indices,
     triu_indices,
+    zeros,
 )
 
+# Number of matrix rows calculated at once when only the upper triangle is needed
+CA_MATX_BLOCK_SIZE = 256
+
+# Number of chains whose residue overlaps with all others are calculated at once
+OVERLAP_BLOCK_SIZE = 256
+
+# Distance differences below this many Angstroms are set to zero
+DD_CUTOFF = 3.0
+
+# Number of packed matrix elements whose distance differences are summed at once
+DD_BLOCK_SIZE = 1 << 16
+
 
 def euclidean(
     coords_3D_1: "tuple[float, float, float]", coords_3D_2: "tuple[float, float, float]"
@@ -40,46 +76,94 @@ def euclidean(
     return dist(coords_3D_1, coords_3D_2)
 
 
-def generate_ca_matx(x: "list[float]", y: "list[float]", z: "list[float]") -> ndarray:
+def generate_ca_matx_from_coords(
+    coords: "ndarray[any, float]", dtype: type = float64, upper_only: bool = False
+) -> ndarray:
+    """
+    Vectorised engine for calculating the pair-wise Euclidean distances between all
+    rows of an N*3-dimensional array of Cartesian coordinates. Returns an
+    N*N-dimensional matrix. Rows containing np.NaN (e.g. gaps inserted by
+    parsing_utils.fill_missing_unps()) give np.NaN distances, as with euclidean().
+
+    Distances are accumulated one Cartesian axis at a time so, at most, two N*N
+    arrays are held in memory during the calculation. If only the upper triangle is
+    requested, rows are calculated in blocks, skipping columns left of the diagonal.
+
+    :param coords: N*3 array of Cartesian (x, y, z) coordinates
+    :type coords: ndarray[any, float]
+    :param dtype: Float precision used for the calculation and returned matrix,
+        defaults to float64. Use float32 to halve the memory footprint.
+    :type dtype: type, optional
+    :param upper_only: Only calculate the upper triangle (including the diagonal),
+        leaving zeros in the lower triangle, defaults to False
+    :type upper_only: bool, optional
+    :return: Matrix of Euclidean distances
+    :rtype: np.ndarray
+    """
+
+    coords = asarray(coords, dtype=dtype)
+    num_res = coords.shape[0]
+    ca_dist_matx = zeros((num_res, num_res), dtype=dtype)
+
+    # Whole matrix is one block, unless only the upper triangle is wanted
+    block_size = CA_MATX_BLOCK_SIZE if upper_only else max(num_res, 1)
+
+    for start in range(0, num_res, block_size):
+        stop = min(start + block_size, num_res)
+
+        # Rows start:stop against columns start:N, as a view of the output
+        block = ca_dist_matx[start:stop, start:]
+        axis_diff = zeros(block.shape, dtype=dtype)
+
+        # Sum of squared differences, one axis at a time
+        for axis in range(coords.shape[1]):
+            subtract.outer(
+                coords[start:stop, axis], coords[start:, axis], out=axis_diff
+            )
+            axis_diff *= axis_diff
+            block += axis_diff
+
+        sqrt(block, out=block)
+
+        # Zero the part of this block below the diagonal
+        if upper_only:
+            block[tril_indices(stop - start, k=-1)] = 0
+
+    return ca_dist_matx
+
+
+def generate_ca_matx(
+    x: "list[float]",
+    y: "list[float]",
+    z: "list[float]",
+    dtype: type = float64,
+    upper_only: bool = False,
+) -> ndarray:
     """
     Takes three lists corresponding to x,y,z coordinates and returns a matrix of the
     pair-wise Euclidian distances between all coordinates. Each input must be
     1*N-dimensional and an N*N-dimensional Numpy matrix is returned.
     Requirement: `len(x) == len(y) == len(z)`.
 
+    Wrapper for generate_ca_matx_from_coords().
+
     :param x: Cartesian x coords
     :type x: list[float]
     :param y: Cartesian y coords
     :type y: list[float]
     :param z: Cartesian z coords
     :type z: list[float]
-    :return: List of Euclidean distances
-    :rtype: list[float]
+    :param dtype: Float precision of the returned matrix, defaults to float64
+    :type dtype: type, optional
+    :param upper_only: Only calculate the upper triangle, defaults to False
+    :type upper_only: bool, optional
+    :return: Matrix of Euclidean distances
+    :rtype: np.ndarray
     """
 
-    # Populated and returned
-    ca_dist_matx = []
-
-    # Row loop
-    for x_a, y_a, z_a in zip(x, y, z):
-        distance_row = []
-        res1_coords = (x_a, y_a, z_a)
-
-        # Column loop
-        for x_b, y_b, z_b in zip(x, y, z):
-            res2_coords = (x_b, y_b, z_b)
-
-            # Euclidian distance
-            dist = euclidean(res1_coords, res2_coords)
-
-            # Add element to row
-            distance_row.append(dist)
-
-        # Add row to matrix
-        ca_dist_matx.append(distance_row)
-
-    # For faster linear algebra later
-    return asarray(ca_dist_matx)
+    return generate_ca_matx_from_coords(
+        column_stack((x, y, z)), dtype=dtype, upper_only=upper_only
+    )
 
 
 def matx_subtract(matx1: ndarray, matx2: ndarray) -> ndarray:
@@ -192,6 +276,28 @@ def find_max(matx: ndarray, starting_max: float = 0.0) -> float:
     return max(matx[~isnan(matx)].max(), starting_max)
 
 
+def dd_matx_stats(dd_matx: ndarray) -> dict:
+    """
+    Summary statistics of a distance difference matrix as saved, the upper triangle
+    only, ignoring missing (NaN) elements.
+
+    :param dd_matx: Upper triangle of a distance difference matrix, as saved by
+        io_utils.save_compressed_matrix()
+    :type dd_matx: np.ndarray
+    :return: Largest element ("max", 0 if none observed), sum ("sum") and number of
+        non-zero elements ("nnz")
+    :rtype: dict
+    """
+
+    observed = dd_matx[~isnan(dd_matx)]
+
+    return {
+        "max": float(observed.max()) if observed.size else 0.0,
+        "sum": float(observed.sum()),
+        "nnz": int(count_nonzero(observed)),
+    }
+
+
 def len_overlap(unps1: list, unps2: list) -> int:
     """
     Parse in a distance difference matrix and get the length of the overlap.
@@ -239,3 +345,590 @@ def calc_score(dd_matx: ndarray, unps1: set, unps2: set, res_mask: int = 1) -> f
     score = (pdbe1_pdbe2_ovlp**2) / (len(unps1) * len(unps2)) * upper_triangle_sum
 
     return score
+
+
+def condensed_index(
+    n: int, index_A: "ndarray|int", index_B: "ndarray|int"
+) -> "ndarray|int":
+    """
+    Position of element (index_A, index_B) of an N*N-square, symmetric matrix in its
+    condensed form, the upper triangle without the diagonal, row by row (as returned
+    by scipy.spatial.distance.pdist() or squareform()). Indices may be given in either
+    order but must differ.
+
+    :param n: Number of rows (and columns) of the square matrix
+    :type n: int
+    :param index_A: Row index, or array of row indices
+    :type index_A: np.ndarray|int
+    :param index_B: Column index, or array of column indices
+    :type index_B: np.ndarray|int
+    :return: Position, or array of positions, in the condensed matrix
+    :rtype: np.ndarray|int
+    """
+
+    row = minimum(index_A, index_B)
+    column = maximum(index_A, index_B)
+
+    return n * row - row * (row + 1) // 2 + column - row - 1
+
+
+def remap_condensed(condensed: ndarray, positions: ndarray) -> ndarray:
+    """
+    Reorders and subsets a condensed matrix. Item i of the returned matrix is item
+    positions[i] of the parsed one, or is absent where positions[i] is negative, in
+    which case its elements are NaN.
+
+    :param condensed: Condensed matrix, as returned by scipy.spatial.distance.pdist()
+    :type condensed: np.ndarray
+    :param positions: Position of each item of the returned matrix in the parsed one,
+        -1 if absent
+    :type positions: np.ndarray
+    :return: Condensed matrix of len(positions) items
+    :rtype: np.ndarray
+    """
+
+    positions = asarray(positions, dtype=int64)
+    n_out = positions.shape[0]
+    n_in = int((1 + sqrt(1 + 8 * condensed.shape[0])) // 2) if condensed.size else 0
+
+    remapped = full(n_out * (n_out - 1) // 2, nan)
+
+    # Fill one row of the upper triangle at a time, which is contiguous in the
+    # condensed matrix
+    present = flatnonzero(positions >= 0)
+    for index_A in present:
+        columns = present[present > index_A]
+        remapped[condensed_index(n_out, index_A, columns)] = condensed[
+            condensed_index(n_in, positions[index_A], positions[columns])
+        ]
+
+    return remapped
+
+
+def pair_indices(n: int) -> ndarray:
+    """
+    Row and column indices of each element of a condensed matrix, in order.
+
+    :param n: Number of rows (and columns) of the square matrix
+    :type n: int
+    :return: (N * (N - 1) / 2) * 2 array of row and column indices
+    :rtype: np.ndarray
+    """
+
+    return column_stack(triu_indices(n, k=1)).astype(int64).reshape(-1, 2)
+
+
+def coverage_matrix(unp_res_ids: "list[ndarray]") -> ndarray:
+    """
+    Boolean matrix of the UniProt residues present in each chain. Rows are chains and
+    columns residues, from the lowest to the highest UniProt residue ID of any chain.
+
+    :param unp_res_ids: Unique UniProt residue IDs of each chain
+    :type unp_res_ids: list[np.ndarray]
+    :return: Chains * residues matrix, True where a chain has the residue
+    :rtype: np.ndarray
+    """
+
+    unp_res_ids = [asarray(ids, dtype=int64) for ids in unp_res_ids]
+    lowest = min((ids.min() for ids in unp_res_ids if ids.size), default=0)
+    highest = max((ids.max() for ids in unp_res_ids if ids.size), default=-1)
+
+    coverage = zeros((len(unp_res_ids), highest - lowest + 1), dtype=bool)
+    for row, ids in enumerate(unp_res_ids):
+        coverage[row, ids - lowest] = True
+
+    return coverage
+
+
+def overlap_counts(
+    coverage: ndarray, pairs: ndarray, block_size: int = OVERLAP_BLOCK_SIZE
+) -> ndarray:
+    """
+    Number of UniProt residues shared by each pair of chains, from the product of the
+    coverage matrix with its transpose. The product is calculated for blocks of rows
+    at a time, limiting memory to block_size * chains elements.
+
+    :param coverage: Chains * residues matrix, as returned by coverage_matrix()
+    :type coverage: np.ndarray
+    :param pairs: Row indices of the chains in each pair
+    :type pairs: np.ndarray
+    :param block_size: Rows of the product calculated at once, defaults to
+        OVERLAP_BLOCK_SIZE
+    :type block_size: int, optional
+    :return: Number of shared residues for each pair
+    :rtype: np.ndarray
+    """
+
+    pairs = asarray(pairs, dtype=int64).reshape(-1, 2)
+    counts = zeros(pairs.shape[0], dtype=int64)
+
+    # Counts are exact in float32 up to 2**24 residues
+    coverage = coverage.astype(float32)
+
+    for start in range(0, coverage.shape[0], block_size):
+        in_block = flatnonzero(
+            (pairs[:, 0] >= start) & (pairs[:, 0] < start + block_size)
+        )
+        if in_block.size == 0:
+            continue
+
+        block_overlaps = coverage[start : start + block_size] @ coverage.T
+        counts[in_block] = rint(
+            block_overlaps[pairs[in_block, 0] - start, pairs[in_block, 1]]
+        )
+
+    return counts
+
+
+def calc_scores(
+    dd_sums: ndarray, overlaps: ndarray, lengths_A: ndarray, lengths_B: ndarray
+) -> ndarray:
+    """
+    Calculates the distance-based scores of many chain pairs at once, as calc_score(),
+    from the sums of their distance difference matrices' upper triangles.
+
+    :param dd_sums: Sum of the upper triangle of each pair's distance difference
+        matrix, excluding the diagonal
+    :type dd_sums: np.ndarray
+    :param overlaps: Number of UniProt residues shared by each pair
+    :type overlaps: np.ndarray
+    :param lengths_A: Number of UniProt residues of the first chain of each pair
+    :type lengths_A: np.ndarray
+    :param lengths_B: Number of UniProt residues of the second chain of each pair
+    :type lengths_B: np.ndarray
+    :return: CA distance-based clustering score of each pair
+    :rtype: np.ndarray
+    """
+
+    overlaps = asarray(overlaps, dtype=int64)
+    lengths = asarray(lengths_A, dtype=int64) * asarray(lengths_B, dtype=int64)
+
+    return (overlaps**2) / lengths * asarray(dd_sums, dtype=float64)
+
+
+def packed_length(n: int) -> int:
+    """
+    Number of elements in the packed upper triangle (including the diagonal) of an N*N
+    matrix, N(N+1)/2.
+
+    :param n: Number of rows (and columns) of the matrix
+    :type n: int
+    :return: Length of the packed triangle
+    :rtype: int
+    """
+
+    return n * (n + 1) // 2
+
+
+class PackedTriangularMatrix:
+    """
+    Upper triangle, including the diagonal, of an N*N-square, symmetric matrix stored
+    as a vector of N(N+1)/2 elements. Elements are packed column by column, so element
+    (i, j), i <= j, is at index j(j+1)/2 + i:
+
+        [[a, b, d],
+         [., c, e],   ->   [a, b, c, d, e, f]
+         [., ., f]]
+
+    The leading n*n block of the matrix is then the first n(n+1)/2 elements, so
+    matrices are trimmed to a shorter chain by slicing, without copying. The packed
+    vector may be a memory map, in which case elements are only read as accessed.
+    """
+
+    def __init__(self, packed: ndarray) -> None:
+        """
+        Constructor -- wraps a packed vector, which is not copied.
+
+        :param packed: Packed upper triangle, as returned by pack()
+        :type packed: np.ndarray
+        :raises ValueError: Length of the vector is not N(N+1)/2 for any N
+        """
+
+        self.packed = packed
+        self.n = (isqrt(8 * packed.shape[0] + 1) - 1) // 2
+
+        if packed.ndim != 1 or packed_length(self.n) != packed.shape[0]:
+            raise ValueError(
+                f"Vector of shape {packed.shape} is not a packed triangular matrix"
+            )
+
+    @staticmethod
+    def pack(matx: ndarray) -> ndarray:
+        """
+        Packs the upper triangle of a square matrix. The lower triangle is ignored.
+
+        :param matx: N*N-square matrix
+        :type matx: np.ndarray
+        :return: Packed upper triangle, N(N+1)/2 elements
+        :rtype: np.ndarray
+        """
+
+        # Lower triangle of the transpose, row by row, is the upper triangle column
+        # by column
+        return asarray(matx).T[tril_indices(matx.shape[0])]
+
+    @classmethod
+    def from_dense(cls, matx: ndarray) -> "PackedTriangularMatrix":
+        """
+        Packs the upper triangle of a square matrix.
+
+        :param matx: N*N-square matrix
+        :type matx: np.ndarray
+        :return: Packed matrix
+        :rtype: PackedTriangularMatrix
+        """
+
+        return cls(cls.pack(matx))
+
+    @property
+    def shape(self) -> "tuple[int, int]":
+        """
+        Shape of the dense matrix.
+        """
+
+        return (self.n, self.n)
+
+    def __getitem__(self, index: "tuple[int, int]") -> float:
+        """
+        Returns element (i, j) of the symmetric matrix.
+        """
+
+        i, j = sorted(index)
+
+        if not 0 <= i <= j < self.n:
+            raise IndexError(f"Index {index} out of range for shape {self.shape}")
+
+        return self.packed[packed_length(j) + i]
+
+    def leading(self, n: int) -> "PackedTriangularMatrix":
+        """
+        Leading n*n block of the matrix, as a view of the first n(n+1)/2 elements.
+
+        :param n: Number of rows (and columns) to keep
+        :type n: int
+        :return: Packed leading block
+        :rtype: PackedTriangularMatrix
+        """
+
+        return PackedTriangularMatrix(self.packed[: packed_length(min(n, self.n))])
+
+    def to_dense(self, symmetric: bool = False) -> ndarray:
+        """
+        Unpacks the matrix.
+
+        :param symmetric: Fill the lower triangle from the upper triangle, defaults to
+            False (lower triangle is zero, as for saved CA distance matrices)
+        :type symmetric: bool, optional
+        :return: N*N-square matrix
+        :rtype: np.ndarray
+        """
+
+        matx = zeros(self.shape, dtype=self.packed.dtype)
+        columns, rows = tril_indices(self.n)
+        matx[rows, columns] = self.packed
+
+        if symmetric:
+            matx[columns, rows] = self.packed
+
+        return matx
+
+
+def leading_packed_pair(
+    packed_A: ndarray, packed_B: ndarray
+) -> "tuple[ndarray, ndarray]":
+    """
+    Trims two packed CA distance matrices to the leading block of the shorter chain,
+    as trim_to_smallest() for square matrices, as views.
+
+    :param packed_A: Packed upper triangle of the first matrix
+    :type packed_A: np.ndarray
+    :param packed_B: Packed upper triangle of the second matrix
+    :type packed_B: np.ndarray
+    :return: Packed leading blocks of both matrices, of equal length
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+
+    # Leading blocks are prefixes, so the shorter vector is the smaller matrix
+    length = min(packed_A.shape[0], packed_B.shape[0])
+
+    return packed_A[:length], packed_B[:length]
+
+
+def dd_sum_packed(
+    packed_A: ndarray,
+    packed_B: ndarray,
+    cutoff: float = DD_CUTOFF,
+    block_size: int = DD_BLOCK_SIZE,
+) -> float:
+    """
+    Sum of the upper triangle of the distance difference matrix of two packed CA
+    distance matrices, as scored by calc_score(): absolute differences below cutoff are
+    zero and NaNs (unmodelled residues) ignored. Differences are computed and summed in
+    blocks of the packed vectors, in one pass and into fixed buffers, so no N*N array
+    is created. The diagonal of a distance matrix is zero (or NaN), so it adds nothing
+    to the sum.
+
+    :param packed_A: Packed upper triangle of the first matrix, as
+        PackedTriangularMatrix.pack()
+    :type packed_A: np.ndarray
+    :param packed_B: Packed upper triangle of the second matrix
+    :type packed_B: np.ndarray
+    :param cutoff: Smallest distance difference summed, defaults to DD_CUTOFF
+    :type cutoff: float, optional
+    :param block_size: Number of elements per block, defaults to DD_BLOCK_SIZE
+    :type block_size: int, optional
+    :return: Sum of distance differences over the leading block of the shorter chain
+    :rtype: float
+    """
+
+    packed_A, packed_B = leading_packed_pair(packed_A, packed_B)
+    length = packed_A.shape[0]
+
+    diff_buffer = empty(min(block_size, length), dtype=result_type(packed_A, packed_B))
+    keep_buffer = empty(diff_buffer.shape[0], dtype=bool)
+
+    dd_sum = 0.0
+    for start in range(0, length, block_size):
+        stop = min(start + block_size, length)
+        diff = diff_buffer[: stop - start]
+        keep = keep_buffer[: stop - start]
+
+        subtract(packed_A[start:stop], packed_B[start:stop], out=diff)
+        absolute(diff, out=diff)
+        greater_equal(diff, cutoff, out=keep)  # False for NaN
+
+        dd_sum += float(sum(diff, where=keep, dtype=float64))
+
+    return dd_sum
+
+
+def dd_packed(
+    packed_A: ndarray, packed_B: ndarray, cutoff: float = DD_CUTOFF
+) -> ndarray:
+    """
+    Packed distance difference matrix of two packed CA distance matrices, as
+    distance_differences.generate_matx_diff() for square matrices. Only needed where
+    the matrix is saved; scores are summed by dd_sum_packed().
+
+    :param packed_A: Packed upper triangle of the first matrix
+    :type packed_A: np.ndarray
+    :param packed_B: Packed upper triangle of the second matrix
+    :type packed_B: np.ndarray
+    :param cutoff: Smallest distance difference kept, defaults to DD_CUTOFF
+    :type cutoff: float, optional
+    :return: Packed upper triangle of the distance difference matrix over the leading
+        block of the shorter chain
+    :rtype: np.ndarray
+    """
+
+    packed_A, packed_B = leading_packed_pair(packed_A, packed_B)
+
+    dd = absolute(subtract(packed_A, packed_B))
+    dd[dd < cutoff] = 0  # NaNs are kept
+
+    return dd
+
+
+def packed_position(index_A: "ndarray|int", index_B: "ndarray|int") -> "ndarray|int":
+    """
+    Position of element (index_A, index_B) of a square, symmetric matrix in its packed
+    upper triangle, as PackedTriangularMatrix. Indices may be given in either order.
+
+    :param index_A: Row index, or array of row indices
+    :type index_A: np.ndarray|int
+    :param index_B: Column index, or array of column indices
+    :type index_B: np.ndarray|int
+    :return: Position, or array of positions, in the packed vector
+    :rtype: np.ndarray|int
+    """
+
+    row = minimum(index_A, index_B)
+    column = maximum(index_A, index_B)
+
+    return column * (column + 1) // 2 + row
+
+
+def align_residues(
+    unp_res_ids_A: ndarray, unp_res_ids_B: ndarray
+) -> "tuple[ndarray, ndarray]":
+    """
+    Aligns two chains on the UniProt residues observed in both.
+
+    :param unp_res_ids_A: Unique UniProt residue IDs of the first chain
+    :type unp_res_ids_A: np.ndarray
+    :param unp_res_ids_B: Unique UniProt residue IDs of the second chain
+    :type unp_res_ids_B: np.ndarray
+    :return: Indices of the shared residues in each chain, in UniProt order
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+
+    _, index_A, index_B = intersect1d(
+        unp_res_ids_A, unp_res_ids_B, assume_unique=True, return_indices=True
+    )
+
+    return index_A, index_B
+
+
+def strict_upper_block(start: int, stop: int) -> "tuple[ndarray, ndarray]":
+    """
+    Row and column indices of the elements above the diagonal in columns start to
+    stop (exclusive) of a square matrix, column by column.
+
+    :param start: First column
+    :type start: int
+    :param stop: Column after the last
+    :type stop: int
+    :return: Row and column indices
+    :rtype: tuple[np.ndarray, np.ndarray]
+    """
+
+    columns = arange(start, stop)
+    column_offsets = columns * (columns - 1) // 2 - start * (start - 1) // 2
+
+    rows = arange(packed_length(stop - 1) - packed_length(start - 1))
+    rows -= repeat(column_offsets, columns)
+
+    return rows, repeat(columns, columns)
+
+
+def dd_sum_aligned(
+    packed_A: ndarray,
+    unp_res_ids_A: ndarray,
+    packed_B: ndarray,
+    unp_res_ids_B: ndarray,
+    cutoff: float = DD_CUTOFF,
+    block_size: int = DD_BLOCK_SIZE,
+) -> float:
+    """
+    As dd_sum_packed(), for CA distance matrices of only the observed residues of each
+    chain (rows in the order of their UniProt residue IDs), aligned on the residues
+    observed in both. Shared residue pairs are gathered from the packed matrices in
+    blocks, so a pair costs the square of their overlap rather than of their highest
+    UniProt residue ID.
+
+    The sum equals that of matrices padded from UniProt residue 1
+    (parsing_utils.fill_missing_unps()), as residues missing from either chain add
+    nothing to it.
+
+    :param packed_A: Packed CA distance matrix of the first chain
+    :type packed_A: np.ndarray
+    :param unp_res_ids_A: Unique UniProt residue IDs of the rows of the first matrix
+    :type unp_res_ids_A: np.ndarray
+    :param packed_B: Packed CA distance matrix of the second chain
+    :type packed_B: np.ndarray
+    :param unp_res_ids_B: Unique UniProt residue IDs of the rows of the second matrix
+    :type unp_res_ids_B: np.ndarray
+    :param cutoff: Smallest distance difference summed, defaults to DD_CUTOFF
+    :type cutoff: float, optional
+    :param block_size: Approximate number of residue pairs per block, defaults to
+        DD_BLOCK_SIZE
+    :type block_size: int, optional
+    :return: Sum of distance differences over residue pairs observed in both chains
+    :rtype: float
+    """
+
+    index_A, index_B = align_residues(unp_res_ids_A, unp_res_ids_B)
+    num_shared = index_A.shape[0]
+
+    dd_sum = 0.0
+    start = 1  # Column 0 has no elements above the diagonal
+    while start < num_shared:
+        # Columns whose elements above the diagonal fill about one block
+        stop = (1 + isqrt(1 + 4 * (2 * block_size + start * (start - 1)))) // 2
+        stop = min(max(stop, start + 1), num_shared)
+
+        rows, columns = strict_upper_block(start, stop)
+        diff = absolute(
+            subtract(
+                packed_A[packed_position(index_A[rows], index_A[columns])],
+                packed_B[packed_position(index_B[rows], index_B[columns])],
+            )
+        )
+        dd_sum += float(sum(diff, where=diff >= cutoff, dtype=float64))
+
+        start = stop
+
+    return dd_sum
+
+
+def expand_packed(packed: ndarray, unp_res_ids: ndarray, num_res: int) -> ndarray:
+    """
+    Expands a packed CA distance matrix of observed residues to UniProt residues 1 to
+    num_res, as the matrix of coordinates padded by parsing_utils.fill_missing_unps()
+    and trimmed to num_res residues. Elements of missing residues are NaN.
+
+    :param packed: Packed CA distance matrix of the observed residues
+    :type packed: np.ndarray
+    :param unp_res_ids: Unique UniProt residue IDs of the rows of the matrix
+    :type unp_res_ids: np.ndarray
+    :param num_res: Number of UniProt residues to expand to
+    :type num_res: int
+    :return: Packed CA distance matrix of UniProt residues 1 to num_res
+    :rtype: np.ndarray
+    """
+
+    unp_res_ids = asarray(unp_res_ids, dtype=int64)
+    kept = flatnonzero(unp_res_ids <= num_res)
+
+    expanded = full(packed_length(num_res), nan, dtype=packed.dtype)
+    rows, columns = triu_indices(kept.shape[0])
+    expanded[
+        packed_position(unp_res_ids[kept[rows]] - 1, unp_res_ids[kept[columns]] - 1)
+    ] = packed[packed_position(kept[rows], kept[columns])]
+
+    return expanded
+
+
+def median_deviations(
+    packed_matxs: "list[ndarray]", block_size: int = DD_BLOCK_SIZE
+) -> ndarray:
+    """
+    Mean absolute deviation of each of a set of packed CA distance matrices from their
+    element-wise median, over the leading block of the shortest (as
+    leading_packed_pair()). The matrices are stacked and the medians taken along the
+    stacked axis in blocks of elements, so memory-mapped matrices are read once and
+    the stack holds at most block_size elements of each. Unobserved residues (NaN) are
+    left out of both the medians and the deviations.
+
+    :param packed_matxs: Packed CA distance matrices
+    :type packed_matxs: list[np.ndarray]
+    :param block_size: Number of elements of each matrix stacked at once, defaults to
+        DD_BLOCK_SIZE
+    :type block_size: int, optional
+    :return: Mean absolute deviation of each matrix from the median, inf if it has no
+        observed elements
+    :rtype: np.ndarray
+    """
+
+    num_matxs = len(packed_matxs)
+    length = min(packed_matx.shape[0] for packed_matx in packed_matxs)
+
+    sums = zeros(num_matxs, dtype=float64)
+    counts = zeros(num_matxs, dtype=int64)
+    stack = empty((num_matxs, max(min(block_size, length), 1)), dtype=float32)
+    for start in range(0, length, block_size):
+        stop = min(start + block_size, length)
+        block = stack[:, : stop - start]
+        for i, packed_matx in enumerate(packed_matxs):
+            block[i] = packed_matx[start:stop]
+
+        # NaN-aware median of each element, from the sorted stack with NaNs last
+        ordered = sort(block, axis=0)
+        num_observed = count_nonzero(~isnan(ordered), axis=0)
+        lower = take_along_axis(
+            ordered, maximum((num_observed - 1) // 2, 0)[None], axis=0
+        )
+        upper = take_along_axis(
+            ordered, minimum(num_observed // 2, num_matxs - 1)[None], axis=0
+        )
+        median = (lower + upper) / 2
+
+        deviation = absolute(block - median)
+        observed = ~isnan(deviation)
+        sums += sum(deviation, axis=1, where=observed, dtype=float64)
+        counts += count_nonzero(observed, axis=1)
+
+    deviations = full(num_matxs, inf)
+    divide(sums, counts, out=deviations, where=counts > 0)
+
+    return deviations
@@ -0,0 +1,207 @@
+"""
+Functions for planning the number of worker processes and scheduling tasks of uneven
+cost over a pool of them.
+"""
+
+# Third party imports
+import os
+from heapq import heapify, heapreplace
+from logging import getLogger
+from math import sqrt
+from multiprocessing import Pool, resource_tracker
+from pathlib import Path
+
+from numpy import argsort, asarray, ndarray
+
+logger = getLogger(__name__)
+
+# Chunks made per worker process. More chunks balance load better as results stream
+# back, fewer reduce the per-task overhead of the pool
+CHUNKS_PER_PROCESS = 4
+
+# Cost model, in estimated seconds. Benchmarked on a single core with the example
+# data in benchmark_data/examples
+WORKER_STARTUP_COST = 0.01  # Start one worker process and send it its first task
+CA_COST_PER_BYTE = 2e-8  # Parse mmCIF and generate CA matrices, per byte of file
+DD_COST_PER_ELEMENT = 1.5e-8  # Distance difference and score, per matrix element
+DD_MAP_COST = 1.0  # Render and save one vector distance difference map, ~400 residues
+DD_RASTER_MAP_COST = 0.05  # As DD_MAP_COST, as a raster image
+GZIP_RATIO = 4  # Approximate expansion of gzipped mmCIF files
+
+
+def available_cores() -> int:
+    """
+    Number of CPU cores this process may run on, respecting any affinity mask (e.g.
+    set by a job scheduler).
+
+    :return: Number of usable cores
+    :rtype: int
+    """
+
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Not available on all platforms
+        return os.cpu_count() or 1
+
+
+def estimate_ca_work(mmcif_paths: "list[str]") -> float:
+    """
+    Estimates the time to generate CA distance matrices from a list of mmCIF files,
+    from their size on disk.
+
+    :param mmcif_paths: Paths to (updated) mmCIF files, optionally gzipped
+    :type mmcif_paths: list[str]
+    :return: Estimated serial runtime in seconds
+    :rtype: float
+    """
+
+    num_bytes = 0
+    for mmcif_path in mmcif_paths:
+        mmcif_path = Path(mmcif_path)
+        size = mmcif_path.stat().st_size if mmcif_path.exists() else 0
+        num_bytes += size * GZIP_RATIO if mmcif_path.suffix == ".gz" else size
+
+    return num_bytes * CA_COST_PER_BYTE
+
+
+def estimate_dd_work(pair_costs: "ndarray|list[float]") -> float:
+    """
+    Estimates the time to score all pairs of chains.
+
+    :param pair_costs: Costs of each pair, as returned by estimate_pair_costs()
+    :type pair_costs: np.ndarray|list[float]
+    :return: Estimated serial runtime in seconds
+    :rtype: float
+    """
+
+    return float(asarray(pair_costs, dtype=float).sum()) * DD_COST_PER_ELEMENT
+
+
+def plan_workers(
+    work: float,
+    num_tasks: int,
+    max_workers: int = None,
+    startup_cost: float = WORKER_STARTUP_COST,
+) -> int:
+    """
+    Chooses the number of worker processes for a stage of work. The runtime with p
+    workers is modelled as work / p + startup_cost * p, which is lowest at
+    p = sqrt(work / startup_cost). The result is limited by the available cores,
+    max_workers and the number of tasks. One worker means the work should run serially
+    in the calling process, without a pool.
+
+    :param work: Estimated serial runtime of the stage in seconds
+    :type work: float
+    :param num_tasks: Number of independent tasks in the stage
+    :type num_tasks: int
+    :param max_workers: Upper limit on workers, defaults to None (all available cores)
+    :type max_workers: int, optional
+    :param startup_cost: Estimated seconds to start each worker, defaults to
+        WORKER_STARTUP_COST
+    :type startup_cost: float, optional
+    :return: Number of worker processes
+    :rtype: int
+    """
+
+    limit = available_cores()
+    if max_workers:
+        limit = min(limit, max_workers)
+    limit = max(1, min(limit, num_tasks))
+
+    optimal = sqrt(work / startup_cost) if startup_cost > 0 else limit
+    workers = max(1, min(limit, int(optimal)))
+
+    # Parallel only pays off if it beats the serial runtime
+    if workers < 2 or work / workers + startup_cost * workers >= work:
+        workers = 1
+
+    return workers
+
+
+def make_pool(nproc: int, **pool_kwargs) -> Pool:
+    """
+    Starts a pool of worker processes. The multiprocessing resource tracker is started
+    first, so that workers share it with the parent. Otherwise, forked workers start
+    their own tracker on attaching to shared memory, which then unlinks it when they
+    exit.
+
+    :param nproc: Number of worker processes
+    :type nproc: int
+    :param pool_kwargs: Further keyword arguments for multiprocessing.Pool()
+    :return: Process pool
+    :rtype: multiprocessing.Pool
+    """
+
+    resource_tracker.ensure_running()
+
+    return Pool(processes=nproc, **pool_kwargs)
+
+
+def estimate_pair_costs(
+    lengths: "ndarray|list[int]",
+    pairs: "list[tuple[int, int]]",
+    overlaps: "ndarray|list[int]" = None,
+) -> ndarray:
+    """
+    Estimates the relative cost of comparing each pair of chains. Distance difference
+    matrices are trimmed to the shorter chain, so cost grows with the square of the
+    overlapping length.
+
+    :param lengths: Length (CA matrix dimension) of each chain
+    :type lengths: np.ndarray|list[int]
+    :param pairs: Indices of the chains in each comparison
+    :type pairs: list[tuple[int, int]]
+    :param overlaps: Number of residues compared for each pair, where chains are
+        aligned on their shared residues rather than trimmed, defaults to None
+    :type overlaps: np.ndarray|list[int], optional
+    :return: Estimated cost of each pair
+    :rtype: np.ndarray
+    """
+
+    if overlaps is None:
+        lengths = asarray(lengths)
+        pairs = asarray(pairs, dtype=int).reshape(-1, 2)
+        overlaps = lengths[pairs].min(axis=1)
+
+    overlaps = asarray(overlaps).astype(float)
+
+    # Constant term accounts for per-pair overheads for very short chains
+    return overlaps**2 + 1
+
+
+def make_chunks(
+    tasks: list, costs: "ndarray|list[float]", num_chunks: int
+) -> "list[list]":
+    """
+    Groups tasks into chunks of roughly equal total cost. Tasks are placed greedily,
+    most expensive first, into the chunk with the lowest total cost so far. Chunks are
+    returned most expensive first so they start before the cheaper ones.
+
+    :param tasks: Tasks to group
+    :type tasks: list
+    :param costs: Estimated cost of each task
+    :type costs: np.ndarray|list[float]
+    :param num_chunks: Maximum number of chunks to make
+    :type num_chunks: int
+    :return: Non-empty chunks of tasks
+    :rtype: list[list]
+    """
+
+    costs = asarray(costs, dtype=float)
+    num_chunks = max(1, min(num_chunks, len(tasks)))
+
+    chunks = [[] for _ in range(num_chunks)]
+    loads = [(0.0, i) for i in range(num_chunks)]  # (total cost, chunk) min-heap
+    heapify(loads)
+
+    for task_index in argsort(costs, kind="stable")[::-1]:
+        load, chunk_index = loads[0]
+        chunks[chunk_index].append(tasks[task_index])
+        heapreplace(loads, (load + costs[task_index], chunk_index))
+
+    # Most expensive chunk first
+    chunk_order = [chunk_index for _, chunk_index in sorted(loads, reverse=True)]
+
+    logger.debug(f"Grouped {len(tasks)} tasks into {num_chunks} chunks")
+
+    return [chunks[chunk_index] for chunk_index in chunk_order if chunks[chunk_index]]
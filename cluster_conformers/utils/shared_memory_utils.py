@@ -0,0 +1,227 @@
+"""
+Shared memory storage of per-chain NumPy arrays (CA distance matrices, UniProt residue
+indices, etc.) for multiprocessing workers. Arrays are written once by the parent
+process and read by workers, which attach to the store by name rather than receiving
+pickled copies of the arrays with every task.
+"""
+
+# Third party imports
+from logging import getLogger
+from multiprocessing import shared_memory
+
+from numpy import dtype, int64, ndarray, result_type, zeros
+
+logger = getLogger(__name__)
+
+# Stores created or attached to by this process, keyed by their index block names
+_open_stores = {}
+
+
+class SharedArrayStore:
+    """
+    Named fields, each holding one array (1D or 2D) per chain. All arrays of a field
+    are packed into a single shared memory block, with the offset, dimensions and shape
+    of each array held in a second, integer index block.
+
+    A store is reopened in another process from its handle, a dictionary of the block
+    names, dtype and number of arrays of each field. The size of the handle does not
+    depend on the number or size of the arrays stored, so it is cheap to send to
+    workers.
+
+    Only the process which created the store should unlink() it, once all workers are
+    done with it.
+    """
+
+    def __init__(
+        self,
+        handle: "dict[str, dict]",
+        blocks: "dict[str, tuple[shared_memory.SharedMemory]]",
+        owner: bool = False,
+    ) -> None:
+        """
+        Constructor -- wraps opened shared memory blocks. Use create() or attach() to
+        make a store.
+
+        :param handle: Block names, dtype and number of arrays of each field.
+        :type handle: dict[str, dict]
+        :param blocks: Data and index shared memory blocks of each field.
+        :type blocks: dict[str, tuple[SharedMemory]]
+        :param owner: Whether this process created the blocks, defaults to False
+        :type owner: bool, optional
+        """
+
+        self.handle = handle
+        self._blocks = blocks
+        self._owner = owner
+
+        self._data = {}  # Flat view of all arrays in each field
+        self._index = {}  # (offset, ndim, rows, columns) of each array in each field
+
+        for field, (data_block, index_block) in blocks.items():
+            field_handle = handle[field]
+            self._index[field] = ndarray(
+                (field_handle["count"], 4), dtype=int64, buffer=index_block.buf
+            )
+
+            field_dtype = dtype(field_handle["dtype"])
+            self._data[field] = ndarray(
+                (data_block.size // field_dtype.itemsize,),
+                dtype=field_dtype,
+                buffer=data_block.buf,
+            )
+
+        _open_stores[self._key(handle)] = self
+
+    @staticmethod
+    def _key(handle: "dict[str, dict]") -> "tuple[str]":
+        """
+        Unique identifier of a store, from the names of its index blocks.
+        """
+
+        return tuple(field_handle["index"] for field_handle in handle.values())
+
+    @classmethod
+    def create(cls, fields: "dict[str, list[ndarray]]") -> "SharedArrayStore":
+        """
+        Creates a store and copies the parsed arrays into shared memory. Arrays of a
+        field are cast to a common dtype and must be 1D or 2D.
+
+        :param fields: Lists of arrays to store, keyed by field name.
+        :type fields: dict[str, list[np.ndarray]]
+        :return: Store owned by this process
+        :rtype: SharedArrayStore
+        """
+
+        handle = {}
+        blocks = {}
+
+        for field, arrays in fields.items():
+            field_dtype = result_type(*arrays) if arrays else dtype(float)
+
+            # Offset, dimensions and shape of each array in the flattened field
+            index = zeros((len(arrays), 4), dtype=int64)
+            offset = 0
+            for i, array in enumerate(arrays):
+                rows, columns = (array.shape + (1,))[:2]
+                index[i] = offset, array.ndim, rows, columns
+                offset += rows * columns
+
+            # Shared memory blocks cannot be empty
+            data_block = shared_memory.SharedMemory(
+                create=True, size=max(offset * field_dtype.itemsize, 1)
+            )
+            index_block = shared_memory.SharedMemory(
+                create=True, size=max(index.nbytes, 1)
+            )
+
+            # Copy arrays and their index into shared memory
+            data = ndarray((offset,), dtype=field_dtype, buffer=data_block.buf)
+            for (start, _, rows, columns), array in zip(index, arrays):
+                data[start : start + rows * columns] = array.ravel()
+            ndarray(index.shape, dtype=int64, buffer=index_block.buf)[:] = index
+            del data
+
+            handle[field] = {
+                "data": data_block.name,
+                "index": index_block.name,
+                "dtype": field_dtype.str,
+                "count": len(arrays),
+            }
+            blocks[field] = (data_block, index_block)
+
+            logger.debug(
+                f"Stored {len(arrays)} arrays of field {field} in shared memory "
+                f"({offset * field_dtype.itemsize} bytes)"
+            )
+
+        return cls(handle, blocks, owner=True)
+
+    @classmethod
+    def attach(cls, handle: "dict[str, dict]") -> "SharedArrayStore":
+        """
+        Opens the store described by a handle. Stores already open in this process
+        (including those inherited by forked workers) are reused.
+
+        :param handle: Handle of the store, as SharedArrayStore.handle
+        :type handle: dict[str, dict]
+        :return: Store attached to by this process
+        :rtype: SharedArrayStore
+        """
+
+        store = _open_stores.get(cls._key(handle))
+        if store is not None:
+            return store
+
+        blocks = {
+            field: (
+                shared_memory.SharedMemory(name=field_handle["data"]),
+                shared_memory.SharedMemory(name=field_handle["index"]),
+            )
+            for field, field_handle in handle.items()
+        }
+
+        return cls(handle, blocks)
+
+    def get(self, field: str, i: int) -> ndarray:
+        """
+        Returns a read-only view of the i-th array of a field. The view must not be
+        used after the store is closed.
+
+        :param field: Field name
+        :type field: str
+        :param i: Position of the array in the list parsed to create()
+        :type i: int
+        :return: Stored array
+        :rtype: np.ndarray
+        """
+
+        start, ndim, rows, columns = self._index[field][i]
+        array = self._data[field][start : start + rows * columns]
+
+        if ndim == 2:
+            array = array.reshape(rows, columns)
+
+        array.flags.writeable = False
+
+        return array
+
+    def count(self, field: str) -> int:
+        """
+        Number of arrays stored in a field.
+        """
+
+        return self.handle[field]["count"]
+
+    def close(self) -> None:
+        """
+        Closes this process' access to the store. Shared memory is not freed until the
+        owner calls unlink().
+        """
+
+        _open_stores.pop(self._key(self.handle), None)
+
+        # Views over the blocks must be released before closing
+        self._data = {}
+        self._index = {}
+
+        for blocks in self._blocks.values():
+            for block in blocks:
+                block.close()
+
+    def unlink(self) -> None:
+        """
+        Closes and frees the shared memory of the store. Only called by the owner.
+        """
+
+        self.close()
+
+        if self._owner:
+            for blocks in self._blocks.values():
+                for block in blocks:
+                    block.unlink()
+
+    def __enter__(self) -> "SharedArrayStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.unlink()
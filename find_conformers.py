@@ -19,7 +19,7 @@ import sys
 # Custom imports
 import cluster_conformers.cluster_monomers as cluster_monomers
 from cluster_conformers.utils import logging_utils
-from cluster_conformers.distance_differences import make_dd_maps
+from cluster_conformers.distance_differences import DD_MAP_MODES, make_dd_maps
 
 
 def extract_image_format(image_args: str):
@@ -149,6 +149,16 @@ def create_parser(input_args=None):
         type=PosixPath,
     )
 
+    parser.add_argument(
+        "-y",
+        "--dd_map_mode",
+        help="Render distance difference maps as PNG images of a fixed size (raster) "
+        "or with one vector patch per residue pair, saved as PNG and SVG (vector), "
+        "which is much slower. Defaults to raster",
+        choices=DD_MAP_MODES,
+        default="raster",
+    )
+
     parser.add_argument(
         "-a",
         "--path_alpha_fold",
@@ -158,7 +168,12 @@ def create_parser(input_args=None):
     )
 
     parser.add_argument(
-        "-n", "--nproc", help="Max number of threads to utilise", type=int, default=1
+        "-n",
+        "--nproc",
+        help="Max number of processes to utilise. The number used is planned from the "
+        "size of the segment. Defaults to all available cores",
+        type=int,
+        default=None,
     )
 
     parser.add_argument(
@@ -169,10 +184,64 @@ def create_parser(input_args=None):
         action="store_true",
     )
 
+    parser.add_argument(
+        "-e",
+        "--dd_mode",
+        help="Distance difference matrices to save: all, representatives (pairs of "
+        "conformer representatives, as selected by --representative_mode, or "
+        "medoids if none), score (pairs scoring at least --dd_min_score) or none. "
+        "Others are scored in memory only. Defaults to all",
+        choices=cluster_monomers.DD_SAVE_MODES,
+        default="all",
+    )
+
+    parser.add_argument(
+        "-t",
+        "--dd_min_score",
+        help="Lowest score of pairs whose distance difference matrices are saved, "
+        "with --dd_mode score",
+        type=float,
+        default=None,
+    )
+
+    parser.add_argument(
+        "-p",
+        "--representative_mode",
+        help="Representative chain flagged for each conformer in the clustering "
+        "results: medoid (lowest summed score to the rest of its conformer), median "
+        "(CA distance matrix nearest the element-wise median of its conformer's) or "
+        "none. Defaults to medoid",
+        choices=cluster_monomers.REPRESENTATIVE_MODES,
+        default="medoid",
+    )
+
+    parser.add_argument(
+        "-x",
+        "--archive",
+        help="Save matrices in one archive per UniProt accession in the CA and "
+        "distance difference matrix directories, rather than one file per matrix",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "-l",
+        "--alignment",
+        help="Residue alignment of CA distance matrices: dense (UniProt residues from "
+        "1, compared on the leading residues of both chains) or sparse (observed "
+        "residues only, compared on those observed in both chains). Scores are the "
+        "same, but sparse scoring is faster for chains covering a short region of a "
+        "long protein. Defaults to dense",
+        choices=cluster_monomers.ALIGNMENT_MODES,
+        default="dense",
+    )
+
     parser.add_argument(
         "-i",
         "--updated_entries",
-        help="List of updated entries, matrices will be regenerated",
+        help="List of updated entries, checked for changed CA atoms even if their "
+        "mmCIF files appear unchanged. Changed files are otherwise detected from their "
+        "size and modification time",
         # action="append",
         nargs="+",
         type=str,
@@ -197,6 +266,10 @@ def create_parser(input_args=None):
 
     args = parser.parse_args(input_args)
 
+    # Rejected before any matrices are generated
+    if args.dd_mode == "score" and args.dd_min_score is None:
+        parser.error("--dd_min_score is required with --dd_mode score")
+
     # Add parsed list of mmCIFs to dictionary
     structures = extract_structure_format(args.mmcif)
 
@@ -225,18 +298,13 @@ def main():
         path_save_alphafold=args.path_alpha_fold,
         nproc=args.nproc,
         force=args.force,
+        archive=args.archive,
+        alignment=args.alignment,
     )
 
-    # Remove any existing matrices for updated entries
-    if args.updated_entries:
-        unp_cluster.remove_entry_matxs(
-            pdb_ids=args.updated_entries,
-            path_ca=args.path_ca,
-            path_dd=args.path_dd,
-        )
-
-    # Generate CA distance matrices and save
-    unp_cluster.ca_distance(args.path_ca)
+    # Generate CA distance matrices and save. Matrices of updated entries are
+    # regenerated if their CA atoms have changed
+    unp_cluster.ca_distance(args.path_ca, updated_entries=args.updated_entries)
 
     # Perform agglomerative clustering and save results
     if args.path_clusters:
@@ -244,6 +312,9 @@ def main():
         unp_cluster.cluster(
             path_save_dd_matx=args.path_dd,
             path_save_cluster_results=args.path_clusters,
+            dd_mode=args.dd_mode,
+            dd_min_score=args.dd_min_score,
+            representative_mode=args.representative_mode,
         )
 
     elif bool(args.path_clusters):
@@ -255,6 +326,9 @@ def main():
     else:
         pass
 
+    # Shut down worker processes if not already done by cluster()
+    unp_cluster.close()
+
     # Render and save distance difference maps
     if args.path_histogram:
 
@@ -262,6 +336,8 @@ def main():
             path_matxs=args.path_dd,
             path_save_maps=args.path_histogram,
             force=True,
+            nproc=args.nproc,
+            mode=args.dd_map_mode,
         )
 
     # Define residue range if parsed in
@@ -0,0 +1,187 @@
+#!/usr/bin/python3
+
+"""
+This script is a wrapper to run conformational state clustering on many UniProt
+segments in one process. Segments are read from a manifest (CSV or JSONL) of UniProt
+accessions, paths to updated mmCIF files and chain IDs. See
+cluster_conformers.batch_clustering for the manifest format.
+
+A summary report of every segment (number of chains and conformers, status, error
+message and runtime) is saved alongside the clustering results.
+"""
+
+# Third party imports
+import argparse
+from pathlib import PosixPath
+import sys
+
+# Custom imports
+from cluster_conformers import batch_clustering, cluster_monomers
+from cluster_conformers.utils import logging_utils
+
+
+def create_parser(input_args=None):
+    """
+    Collects command-line arguments from the user.
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "-v", "--verbose", help="Increase verbosity", default=False, action="store_true"
+    )
+
+    parser.add_argument(
+        "-b",
+        "--manifest",
+        help="Path to manifest of UniProt accessions, mmCIF paths and chain IDs (CSV "
+        "or JSONL)",
+        type=PosixPath,
+        required=True,
+    )
+
+    parser.add_argument(
+        "-c",
+        "--path_ca",
+        help="Path to save CA distance matrices, in a subdirectory per UniProt "
+        "accession",
+        type=PosixPath,
+        required=True,
+    )
+
+    parser.add_argument(
+        "-s",
+        "--path_clusters",
+        help="Path to save clustering results",
+        type=PosixPath,
+        required=True,
+    )
+
+    parser.add_argument(
+        "-d",
+        "--path_dd",
+        help="Path to save distance difference matrices, in a subdirectory per "
+        "UniProt accession",
+        type=PosixPath,
+        default=None,
+    )
+
+    parser.add_argument(
+        "-r",
+        "--path_summary",
+        help="Path to save batch summary report (CSV). Defaults to "
+        "<path_clusters>/batch_summary.csv",
+        type=PosixPath,
+        default=None,
+    )
+
+    parser.add_argument(
+        "-n",
+        "--nproc",
+        help="Max number of processes to utilise. Defaults to all available cores",
+        type=int,
+        default=None,
+    )
+
+    parser.add_argument(
+        "-f",
+        "--force",
+        help="Force overwrite of existing matrix files",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "-e",
+        "--dd_mode",
+        help="Distance difference matrices to save: all, representatives (pairs of "
+        "conformer representatives, as selected by --representative_mode, or "
+        "medoids if none), score (pairs scoring at least --dd_min_score) or none. "
+        "Others are scored in memory only. Defaults to all",
+        choices=cluster_monomers.DD_SAVE_MODES,
+        default="all",
+    )
+
+    parser.add_argument(
+        "-t",
+        "--dd_min_score",
+        help="Lowest score of pairs whose distance difference matrices are saved, "
+        "with --dd_mode score",
+        type=float,
+        default=None,
+    )
+
+    parser.add_argument(
+        "-p",
+        "--representative_mode",
+        help="Representative chain flagged for each conformer in the clustering "
+        "results: medoid (lowest summed score to the rest of its conformer), median "
+        "(CA distance matrix nearest the element-wise median of its conformer's) or "
+        "none. Defaults to medoid",
+        choices=cluster_monomers.REPRESENTATIVE_MODES,
+        default="medoid",
+    )
+
+    parser.add_argument(
+        "-x",
+        "--archive",
+        help="Save matrices in one archive per UniProt accession in the CA and "
+        "distance difference matrix directories, rather than one file per matrix",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "-l",
+        "--alignment",
+        help="Residue alignment of CA distance matrices: dense (UniProt residues from "
+        "1, compared on the leading residues of both chains) or sparse (observed "
+        "residues only, compared on those observed in both chains). Scores are the "
+        "same, but sparse scoring is faster for chains covering a short region of a "
+        "long protein. Defaults to dense",
+        choices=cluster_monomers.ALIGNMENT_MODES,
+        default="dense",
+    )
+
+    args = parser.parse_args(input_args)
+
+    # Rejected before any segment is clustered
+    if args.dd_mode == "score" and args.dd_min_score is None:
+        parser.error("--dd_min_score is required with --dd_mode score")
+
+    return args
+
+
+def main():
+    """
+    Wrapper to run batch_clustering.run_batch() on a parsed manifest.
+    """
+    args = create_parser(sys.argv[1:])
+
+    # Initialise logger
+    logging_utils.init_logger(verbose=args.verbose)
+
+    segments = batch_clustering.load_manifest(args.manifest)
+
+    summary_df = batch_clustering.run_batch(
+        segments,
+        path_ca=args.path_ca,
+        path_clusters=args.path_clusters,
+        path_dd=args.path_dd,
+        nproc=args.nproc,
+        force=args.force,
+        archive=args.archive,
+        alignment=args.alignment,
+        dd_mode=args.dd_mode,
+        dd_min_score=args.dd_min_score,
+        representative_mode=args.representative_mode,
+        path_summary=args.path_summary
+        or args.path_clusters.joinpath("batch_summary.csv"),
+    )
+
+    # Non-zero exit status if any segment failed
+    if (summary_df["STATUS"] == "failed").any():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
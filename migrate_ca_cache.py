@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+
+"""
+This script converts a directory of CA distance matrices saved as square matrices by
+earlier versions, compressed (.npz) or not (.npy), to packed upper triangles in
+uncompressed .npy files, which are memory-mapped when loaded. Values are unchanged, so
+the cache manifests and score caches of a directory remain valid. Directories saved
+before cache manifests were introduced have none, so their matrices are regenerated,
+along with their UniProt residue IDs, on the next run whether migrated or not.
+Directories which were not migrated are still read, as square matrices are loaded in
+the same way.
+"""
+
+# Third party imports
+import argparse
+import logging
+from pathlib import PosixPath
+import sys
+
+# Custom imports
+from cluster_conformers.utils import cache_utils, io_utils, logging_utils
+
+logger = logging.getLogger(__name__)
+
+
+def create_parser(input_args=None):
+    """
+    Collects command-line arguments from the user.
+    """
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "-v", "--verbose", help="Increase verbosity", default=False, action="store_true"
+    )
+
+    parser.add_argument(
+        "-c",
+        "--path_ca",
+        help="Path to saved CA distance matrices",
+        type=PosixPath,
+        required=True,
+    )
+
+    parser.add_argument(
+        "-k",
+        "--keep",
+        help="Keep .npz matrices after conversion",
+        default=False,
+        action="store_true",
+    )
+
+    return parser.parse_args(input_args)
+
+
+def main():
+    """
+    Wrapper to run io_utils.migrate_to_packed_matrix() on every CA distance matrix in a
+    directory.
+    """
+    args = create_parser(sys.argv[1:])
+
+    # Initialise logger
+    logging_utils.init_logger(verbose=args.verbose)
+
+    # One path per matrix, without suffix, as either or both files may exist
+    paths = sorted(
+        {
+            path.with_suffix("")
+            for path in args.path_ca.glob("*_ca_distance_matrix.np[yz]")
+        }
+    )
+    logger.info(f"Converting {len(paths)} CA distance matrices in {args.path_ca}")
+
+    # Matrices without a manifest entry cannot be validated and are regenerated
+    if paths and not any(args.path_ca.glob(f"*{cache_utils.CACHE_MANIFEST_SUFFIX}")):
+        logger.warning(
+            f"No cache manifest found in {args.path_ca}, matrices will be regenerated "
+            "on the next run even if converted"
+        )
+
+    num_failed = 0
+    for path in paths:
+        # Uncompressed files are read when both exist, as by load_packed_matrix()
+        path = path.with_suffix(".npy" if path.with_suffix(".npy").exists() else ".npz")
+
+        try:
+            path_packed = io_utils.migrate_to_packed_matrix(path, keep=args.keep)
+            logger.debug(f"Converted {path} to {path_packed}")
+        except Exception:
+            logger.error(f"Could not convert {path}", exc_info=True)
+            num_failed += 1
+
+    logger.info(
+        f"{len(paths) - num_failed} CA distance matrices in packed format, "
+        f"{num_failed} failed to convert"
+    )
+
+    # Non-zero exit status if any matrix failed
+    if num_failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Unit tests for the single-file archive of matrices
+"""
+
+# Third party imports
+import pathlib
+import unittest
+
+import numpy as np
+
+# Import functions to test
+from cluster_conformers.utils import archive_utils
+
+# Import modified TestCase class
+from .test_case import TestCaseModified
+
+# Global variables
+PATH_BASE = pathlib.Path("./tests")
+PATH_SAVE_OUTPUT = PATH_BASE.joinpath("test_output", "archive")
+
+
+class TestArchiveUtils(TestCaseModified):
+    def setUp(self):
+        """
+        Starts each test from an empty archive.
+        """
+
+        PATH_SAVE_OUTPUT.mkdir(parents=True, exist_ok=True)
+
+        self.path_archive = PATH_SAVE_OUTPUT.joinpath("A12345_matrix_archive.npa")
+        self.path_archive.unlink(missing_ok=True)
+
+        self.ca_matx = np.arange(12, dtype=np.float32).reshape(3, 4)
+        self.unp_res_ids = np.array([10, 11, 13])
+
+    def test_put_get(self):
+        """
+        Records should be read back as added, with compressed and uncompressed records
+        visible to readers only once flushed.
+        """
+
+        archive = archive_utils.MatrixArchive(self.path_archive)
+        archive.put("ca/1atp_A", self.ca_matx)
+        archive.put("unp/1atp_A", self.unp_res_ids, compress=True)
+
+        self.assertTrue(np.array_equal(archive.get("ca/1atp_A"), self.ca_matx))
+        self.assertEqual(
+            len(archive_utils.MatrixArchive(self.path_archive, read_only=True)),
+            0,
+            msg="Records visible to readers before the index is flushed",
+        )
+
+        archive.close()
+
+        reader = archive_utils.MatrixArchive(self.path_archive, read_only=True)
+        self.assertListEqual(reader.keys(), ["ca/1atp_A", "unp/1atp_A"])
+        self.assertListEqual(reader.keys(prefix="unp/"), ["unp/1atp_A"])
+
+        ca_matx = reader.get("ca/1atp_A")
+        self.assertTrue(np.array_equal(ca_matx, self.ca_matx))
+        self.assertEqual(ca_matx.dtype, np.float32)
+        self.assertTrue(np.array_equal(reader.get("unp/1atp_A"), self.unp_res_ids))
+
+        with self.assertRaises(ValueError, msg="Read-only archive written to"):
+            reader.put("ca/2adp_B", self.ca_matx)
+
+        with self.assertRaises(KeyError):
+            reader.get("ca/2adp_B")
+
+    def test_append_replace(self):
+        """
+        Records should be added to and replaced in an existing archive, with replaced
+        records discarded once unused space exceeds the live records.
+        """
+
+        with archive_utils.MatrixArchive(self.path_archive) as archive:
+            archive.put("ca/1atp_A", self.ca_matx)
+            archive.put("ca/2adp_B", self.ca_matx)
+
+        with archive_utils.MatrixArchive(self.path_archive) as archive:
+            archive.put("ca/1atp_A", self.ca_matx * 2)
+            archive.delete("ca/2adp_B")
+            archive.put("ca/3atp_C", self.ca_matx * 3)
+
+        archive = archive_utils.MatrixArchive(self.path_archive, read_only=True)
+        self.assertListEqual(archive.keys(), ["ca/1atp_A", "ca/3atp_C"])
+        self.assertTrue(np.array_equal(archive.get("ca/1atp_A"), self.ca_matx * 2))
+        self.assertTrue(np.array_equal(archive.get("ca/3atp_C"), self.ca_matx * 3))
+
+        # Replaced records outweigh the live records, so were discarded by flush()
+        size = self.path_archive.stat().st_size
+        with archive_utils.MatrixArchive(self.path_archive) as archive:
+            archive.compact()
+
+        self.assertEqual(
+            self.path_archive.stat().st_size, size, msg="Unused space not reclaimed"
+        )
+        self.assertTrue(
+            np.array_equal(
+                archive_utils.MatrixArchive(self.path_archive, read_only=True).get(
+                    "ca/1atp_A"
+                ),
+                self.ca_matx * 2,
+            )
+        )
+
+    def test_interrupted_write(self):
+        """
+        Records added after the last flush, e.g. by an interrupted run, should be
+        discarded on opening, and unreadable archives replaced.
+        """
+
+        with archive_utils.MatrixArchive(self.path_archive) as archive:
+            archive.put("ca/1atp_A", self.ca_matx)
+
+        # Append without flushing the index
+        archive = archive_utils.MatrixArchive(self.path_archive)
+        archive.put("ca/2adp_B", self.ca_matx)
+        archive._writer.close()
+
+        archive = archive_utils.MatrixArchive(self.path_archive)
+        self.assertListEqual(
+            archive.keys(), ["ca/1atp_A"], msg="Unflushed record not discarded"
+        )
+        archive.put("ca/2adp_B", self.ca_matx)
+        archive.close()
+
+        self.assertListEqual(
+            archive_utils.MatrixArchive(self.path_archive, read_only=True).keys(),
+            ["ca/1atp_A", "ca/2adp_B"],
+        )
+
+        self.path_archive.write_bytes(b"not an archive")
+        self.assertEqual(len(archive_utils.MatrixArchive(self.path_archive)), 0)
+
+
+# Run unit tests on call of script
+if __name__ == "__main__":
+
+    unittest.main()
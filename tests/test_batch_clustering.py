@@ -0,0 +1,172 @@
+"""
+Unit tests for clustering many UniProt segments from a manifest in one process
+"""
+
+# Third party imports
+import io
+import json
+import pathlib
+import unittest
+from contextlib import redirect_stderr
+
+import pandas as pd
+
+# Import functions to test
+import find_conformers_batch
+from cluster_conformers import batch_clustering
+
+# Import modified TestCase class
+from .test_case import TestCaseModified, remove_files_in_dir
+
+# Global variables
+PATH_BASE = pathlib.Path("./tests")
+PATH_TRUNCATED_MOCK_MMCIFS = PATH_BASE.joinpath("mock_data/mock_mmcifs/")
+
+PATH_SAVE_OUTPUT = PATH_BASE.joinpath("test_output", "batch")
+PATH_SAVE_CA = PATH_SAVE_OUTPUT.joinpath("ca_distances")
+PATH_SAVE_CLUSTER_RESULTS = PATH_SAVE_OUTPUT.joinpath("cluster_results")
+
+# Test input: one segment that clusters and one with a missing mmCIF file
+MANIFEST_RECORDS = [
+    {
+        "UNP_ACC": "A12345",
+        "MMCIF_PATH": str(PATH_TRUNCATED_MOCK_MMCIFS.joinpath(f"{pdb}_updated.cif")),
+        "CHAIN_IDS": "A B",
+    }
+    for pdb in ("3nc3", "3nc5", "3nc6", "3nc7")
+] + [
+    {
+        "UNP_ACC": "C12345",
+        "MMCIF_PATH": str(PATH_TRUNCATED_MOCK_MMCIFS.joinpath("0xxx_updated.cif")),
+        "CHAIN_IDS": "A",
+    }
+]
+
+
+class TestBatchClustering(TestCaseModified):
+    def setUp(self):
+        """
+        Writes the test manifest as CSV and JSONL.
+        """
+
+        for path in (PATH_SAVE_OUTPUT, PATH_SAVE_CA, PATH_SAVE_CLUSTER_RESULTS):
+            path.mkdir(parents=True, exist_ok=True)
+
+        self.path_csv = PATH_SAVE_OUTPUT.joinpath("manifest.csv")
+        pd.DataFrame(MANIFEST_RECORDS).to_csv(self.path_csv, index=False)
+
+        self.path_jsonl = PATH_SAVE_OUTPUT.joinpath("manifest.jsonl")
+        with open(self.path_jsonl, "w") as manifest_file:
+            for record in MANIFEST_RECORDS:
+                record = dict(record, CHAIN_IDS=record["CHAIN_IDS"].split())
+                manifest_file.write(json.dumps(record) + "\n")
+
+    def test_load_manifest(self):
+        """
+        CSV and JSONL manifests should produce the same segments, grouped by UniProt
+        accession, in the format accepted by ClusterConformations().
+        """
+
+        segments_csv = batch_clustering.load_manifest(self.path_csv)
+        segments_jsonl = batch_clustering.load_manifest(self.path_jsonl)
+
+        self.assertDictEqual(
+            segments_csv,
+            segments_jsonl,
+            msg="CSV and JSONL manifests are not loaded identically",
+        )
+
+        self.assertListEqual(list(segments_csv.keys()), ["A12345", "C12345"])
+        self.assertEqual(len(segments_csv["A12345"]), 4)
+        for chains in segments_csv["A12345"].values():
+            self.assertListEqual(chains, ["A", "B"])
+
+        with self.assertRaises(ValueError, msg="Unknown manifest format accepted"):
+            batch_clustering.load_manifest(PATH_SAVE_OUTPUT.joinpath("manifest.txt"))
+
+    def test_run_batch(self):
+        """
+        Each segment should be clustered independently, with the failing segment
+        recorded in the summary report rather than ending the batch.
+        """
+
+        remove_files_in_dir(PATH_SAVE_CLUSTER_RESULTS)
+        segments = batch_clustering.load_manifest(self.path_csv)
+        path_summary = PATH_SAVE_OUTPUT.joinpath("batch_summary.csv")
+
+        for nproc in (1, 2):
+            summary_df = batch_clustering.run_batch(
+                segments,
+                path_ca=PATH_SAVE_CA,
+                path_clusters=PATH_SAVE_CLUSTER_RESULTS,
+                nproc=nproc,
+                force=True,
+                path_summary=path_summary,
+            )
+
+            self.assertListEqual(
+                list(summary_df["UNP_ACC"]),
+                ["A12345", "C12345"],
+                msg="Summary report not in manifest order",
+            )
+            self.assertListEqual(
+                list(summary_df["STATUS"]),
+                ["success", "failed"],
+                msg="Segment status not captured in summary report",
+            )
+            self.assertEqual(summary_df["NUM_CHAINS"][0], 8)
+            self.assertTrue(summary_df["ERROR"][1] != "")
+
+            self.assertIsFile(path_summary)
+            self.assertIsFile(
+                PATH_SAVE_CA.joinpath("A12345", "3nc3_A_ca_distance_matrix.npy")
+            )
+            self.assertIsFile(
+                PATH_SAVE_CLUSTER_RESULTS.joinpath(
+                    "A12345_sum_based_clustering_results.csv"
+                )
+            )
+
+    def test_run_batch_invalid_modes(self):
+        """
+        Invalid clustering modes should be rejected before any segment is clustered.
+        """
+
+        path_ca = PATH_SAVE_OUTPUT.joinpath("invalid_modes", "ca_distances")
+        path_ca.mkdir(parents=True, exist_ok=True)
+        remove_files_in_dir(path_ca)
+
+        with self.assertRaises(ValueError, msg="Score mode accepted without threshold"):
+            batch_clustering.run_batch(
+                batch_clustering.load_manifest(self.path_csv),
+                path_ca=path_ca,
+                path_clusters=PATH_SAVE_CLUSTER_RESULTS,
+                nproc=1,
+                dd_mode="score",
+            )
+
+        self.assertListEqual(
+            list(path_ca.iterdir()), [], msg="Matrices generated before rejection"
+        )
+
+        summary = batch_clustering.run_segment(
+            "A12345",
+            batch_clustering.load_manifest(self.path_csv)["A12345"],
+            path_ca=path_ca,
+            path_clusters=PATH_SAVE_CLUSTER_RESULTS,
+            representative_mode="centroid",
+        )
+        self.assertEqual(summary["STATUS"], "failed")
+        self.assertListEqual(list(path_ca.iterdir()), [])
+
+        # Command line
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            find_conformers_batch.create_parser(
+                ["-b", str(self.path_csv), "-c", str(path_ca), "-s", "x", "-e", "score"]
+            )
+
+
+# Run unit tests on call of script
+if __name__ == "__main__":
+
+    unittest.main()
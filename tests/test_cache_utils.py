@@ -0,0 +1,207 @@
+"""
+Unit tests for the cache manifest of CA and distance difference matrices
+"""
+
+# Third party imports
+import os
+import pathlib
+import unittest
+
+import numpy as np
+
+# Import functions to test
+from cluster_conformers.utils import cache_utils
+
+# Import modified TestCase class
+from .test_case import TestCaseModified
+
+# Global variables
+PATH_BASE = pathlib.Path("./tests")
+PATH_SAVE_OUTPUT = PATH_BASE.joinpath("test_output", "cache")
+MOCK_MMCIF_PATH = PATH_BASE.joinpath("mock_data/mock_mmcifs/3nc3_updated.cif")
+
+
+class TestCacheUtils(TestCaseModified):
+    def setUp(self):
+        """
+        Parsed CA atoms of a mock chain.
+        """
+
+        PATH_SAVE_OUTPUT.mkdir(parents=True, exist_ok=True)
+
+        self.chain_xyz_unp = {
+            "cartn_x": np.array([1.0, 2.0, 3.0]),
+            "cartn_y": np.array([0.5, 0.5, 0.5]),
+            "cartn_z": np.array([-1.0, 0.0, 1.0]),
+            "unp_res_ids": np.array([10, 11, 13]),
+        }
+
+    def test_hash_chain(self):
+        """
+        Hashes should depend only on the values of the CA atoms, not the dtypes parsed.
+        """
+
+        chain_hash = cache_utils.hash_chain(self.chain_xyz_unp)
+
+        same_chain = dict(
+            self.chain_xyz_unp,
+            unp_res_ids=self.chain_xyz_unp["unp_res_ids"].astype(np.int32),
+        )
+        self.assertEqual(
+            cache_utils.hash_chain(same_chain),
+            chain_hash,
+            msg="Hash changes with the dtype of UniProt residue IDs",
+        )
+
+        moved_chain = dict(self.chain_xyz_unp, cartn_x=np.array([1.0, 2.0, 3.1]))
+        self.assertNotEqual(
+            cache_utils.hash_chain(moved_chain),
+            chain_hash,
+            msg="Hash does not change when a CA atom moves",
+        )
+
+    def test_ca_entry(self):
+        """
+        CA entries should match while the source file and CA atoms are unchanged, and
+        not match another chain or algorithm version.
+        """
+
+        chain_hash = cache_utils.hash_chain(self.chain_xyz_unp)
+        entry = cache_utils.make_ca_entry("A", MOCK_MMCIF_PATH, chain_hash)
+
+        self.assertTrue(
+            cache_utils.ca_entry_matches_source(entry, "A", MOCK_MMCIF_PATH)
+        )
+        self.assertTrue(cache_utils.ca_entry_matches_hash(entry, "A", chain_hash))
+
+        self.assertFalse(
+            cache_utils.ca_entry_matches_source(entry, "B", MOCK_MMCIF_PATH),
+            msg="Entry matches a different chain of the same file",
+        )
+        self.assertFalse(
+            cache_utils.ca_entry_matches_source(
+                dict(entry, mtime_ns=entry["mtime_ns"] - 1), "A", MOCK_MMCIF_PATH
+            ),
+            msg="Entry matches a modified source file",
+        )
+        self.assertFalse(
+            cache_utils.ca_entry_matches_hash(
+                dict(entry, version=cache_utils.ALGORITHM_VERSION - 1), "A", chain_hash
+            ),
+            msg="Entry from a previous algorithm version matches",
+        )
+        self.assertFalse(cache_utils.ca_entry_matches_hash(None, "A", chain_hash))
+
+        # Entries of earlier versions, without an alignment, are dense
+        self.assertFalse(
+            cache_utils.ca_entry_matches_hash(entry, "A", chain_hash, "sparse"),
+            msg="Dense entry matches a sparse matrix",
+        )
+        self.assertTrue(
+            cache_utils.ca_entry_matches_source(
+                {key: value for key, value in entry.items() if key != "alignment"},
+                "A",
+                MOCK_MMCIF_PATH,
+            ),
+            msg="Entry without an alignment does not match a dense matrix",
+        )
+
+    def test_cache_manifest(self):
+        """
+        Manifests should be reloaded as saved, with distance difference matrices only
+        current for the keys of the chains they were generated from.
+        """
+
+        path_manifest = PATH_SAVE_OUTPUT.joinpath("A12345_cache_manifest.json")
+        if path_manifest.exists():
+            os.remove(path_manifest)
+
+        manifest = cache_utils.CacheManifest(path_manifest)
+        for pdbe_chain_id in ("1atp_A", "2adp_B"):
+            manifest.record_ca(
+                pdbe_chain_id,
+                cache_utils.make_ca_entry(
+                    pdbe_chain_id[-1],
+                    MOCK_MMCIF_PATH,
+                    cache_utils.hash_chain(self.chain_xyz_unp),
+                ),
+            )
+
+        key_A = manifest.chain_key("1atp_A")
+        key_B = manifest.chain_key("2adp_B")
+        manifest.record_dd("A12345_1atp_A_to_2adp_B.npz", key_A, key_B)
+        manifest.save()
+
+        self.assertIsFile(path_manifest)
+
+        reloaded = cache_utils.CacheManifest(path_manifest)
+        self.assertDictEqual(
+            reloaded.entries, manifest.entries, msg="Manifest not reloaded as saved"
+        )
+        self.assertTrue(
+            reloaded.dd_is_current("A12345_1atp_A_to_2adp_B.npz", key_A, key_B)
+        )
+        self.assertFalse(
+            reloaded.dd_is_current("A12345_1atp_A_to_2adp_B.npz", key_A, "2adp_B:0"),
+            msg="Distance difference matrix of an updated chain is current",
+        )
+
+        # Unreadable manifests are discarded rather than raising
+        path_manifest.write_text("{")
+        self.assertDictEqual(
+            cache_utils.CacheManifest(path_manifest).entries, {"ca": {}, "dd": {}}
+        )
+
+    def test_dd_stats_index(self):
+        """
+        Statistics indexes should be reloaded as saved, with the statistics of
+        matrices saved as files only current until the file changes.
+        """
+
+        path_dd = PATH_SAVE_OUTPUT.joinpath("dd_stats")
+        path_dd.mkdir(exist_ok=True)
+        path_index = cache_utils.dd_stats_path(path_dd, "A12345")
+        path_index.unlink(missing_ok=True)
+
+        dd_matx = np.triu(np.arange(16, dtype=np.float32).reshape(4, 4))
+        np.savez_compressed(path_dd.joinpath("A12345_1atp_A_to_2adp_B"), dd_matx)
+        stats = {"max": 15.0, "sum": 70.0, "nnz": 9, "score": 1.5}
+
+        stats_index = cache_utils.DDStatsIndex(path_index)
+        stats_index.record("A12345_1atp_A_to_2adp_B", stats, path_dd)
+        stats_index.record("A12345_1atp_A_to_3atp_C", stats, path_dd)  # Archived
+        stats_index.save()
+
+        self.assertIsFile(path_index)
+
+        reloaded = cache_utils.DDStatsIndex(path_index)
+        self.assertDictEqual(
+            reloaded.entries, stats_index.entries, msg="Index not reloaded as saved"
+        )
+        for dd_matx_name in ("A12345_1atp_A_to_2adp_B", "A12345_1atp_A_to_3atp_C"):
+            self.assertDictEqual(
+                {
+                    key: value
+                    for key, value in reloaded.get(dd_matx_name, path_dd).items()
+                    if key in stats
+                },
+                stats,
+            )
+        self.assertIsNone(reloaded.get("A12345_2adp_B_to_3atp_C", path_dd))
+
+        # Overwritten matrix
+        np.savez_compressed(path_dd.joinpath("A12345_1atp_A_to_2adp_B"), dd_matx * 2)
+        self.assertIsNone(
+            reloaded.get("A12345_1atp_A_to_2adp_B", path_dd),
+            msg="Statistics of an overwritten matrix are current",
+        )
+
+        # Unreadable indexes are discarded rather than raising
+        path_index.write_text("{")
+        self.assertDictEqual(cache_utils.DDStatsIndex(path_index).entries, {})
+
+
+# Run unit tests on call of script
+if __name__ == "__main__":
+
+    unittest.main()
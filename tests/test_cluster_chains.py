@@ -12,6 +12,8 @@ import unittest
 from unittest import mock
 
 import numpy as np
+from scipy.spatial.distance import squareform
+from sklearn.cluster import AgglomerativeClustering
 
 from cluster_conformers import cluster_chains
 
@@ -207,7 +209,9 @@ class TestClusterChains(TestCaseModified):
         # Expected clustering labels
         MOCK_EXPECTED_MODEL.labels_ = np.array([5, 4, 6, 2, 3, 1, 0])
 
-        test_model = cluster_chains.cluster_agglomerative(MOCK_SCORE_MATX, cutoff=None)
+        test_model, test_linkage_matx = cluster_chains.cluster_agglomerative(
+            MOCK_SCORE_MATX, cutoff=None
+        )
         # Only test whether distances, children and labels attributes return the
         # expected output
         self.assertTrue(
@@ -233,7 +237,7 @@ class TestClusterChains(TestCaseModified):
         # Expected clustering labels
         MOCK_EXPECTED_MODEL.labels_ = np.array([2, 4, 0, 0, 3, 1, 0])
 
-        test_model = cluster_chains.cluster_agglomerative(
+        test_model, test_linkage_matx = cluster_chains.cluster_agglomerative(
             MOCK_SCORE_MATX, cutoff=0.7  # or None
         )
         # Only test whether distances, children and labels attributes return the
@@ -248,6 +252,85 @@ class TestClusterChains(TestCaseModified):
 
         self.assertTrue(np.allclose(MOCK_EXPECTED_MODEL.labels_, test_model.labels_))
 
+        self.assertTrue(
+            np.allclose(
+                test_linkage_matx, cluster_chains.make_linkage_matx(test_model)
+            ),
+            msg="Linkage matrix does not describe the fitted tree",
+        )
+
+    def test_cut_tree(self):
+        """
+        Cutting the tree of a single fit should give the same labels as refitting with
+        the distance threshold, for random score matrices and cutoffs.
+        """
+
+        rng = np.random.default_rng(0)
+        for num_chains in (2, 5, 40):
+            score_matx = rng.random((num_chains, num_chains)) * 10
+            score_matx = np.triu(score_matx, 1) + np.triu(score_matx, 1).T
+
+            model, linkage_matx = cluster_chains.cluster_agglomerative(score_matx)
+            for cutoff in (0.1, 0.5, 0.7, 1.0):
+                threshold = cutoff * linkage_matx[:, 2].max()
+                refit_model = AgglomerativeClustering(
+                    n_clusters=None,
+                    distance_threshold=threshold,
+                    metric="precomputed",
+                    linkage="average",
+                ).fit(score_matx)
+
+                n_clusters = np.count_nonzero(model.distances_ >= threshold) + 1
+                self.assertTrue(
+                    np.array_equal(
+                        cluster_chains.cut_tree(model.children_, n_clusters),
+                        refit_model.labels_,
+                    ),
+                    msg=f"Labels of {num_chains} chains cut at {cutoff} differ from "
+                    "refitting",
+                )
+
+    def test_cluster_medoids(self):
+        """
+        Medoids should minimise the summed scores to the other members of their
+        cluster, for condensed and square score matrices.
+        """
+
+        rng = np.random.default_rng(0)
+        score_matx = rng.random((12, 12)) * 10
+        score_matx = np.triu(score_matx, 1) + np.triu(score_matx, 1).T
+        labels = rng.integers(0, 3, 12)
+        labels[-1] = 3  # Singleton cluster
+
+        expected_medoids = []
+        for label in range(4):
+            members = np.flatnonzero(labels == label)
+            sub_matx = score_matx[np.ix_(members, members)]
+            expected_medoids.append(members[sub_matx.sum(axis=1).argmin()])
+
+        for scores in (score_matx, squareform(score_matx)):
+            self.assertListEqual(
+                list(cluster_chains.cluster_medoids(scores, labels)),
+                expected_medoids,
+                msg="Medoid is not the most central member of its cluster",
+            )
+
+        # Ties go to the highest tiebreak value, else the first member
+        tied_scores = np.zeros(squareform(score_matx).shape)
+        tiebreak = np.arange(12) % 5
+        self.assertListEqual(
+            list(cluster_chains.cluster_medoids(tied_scores, labels)),
+            [np.flatnonzero(labels == label)[0] for label in range(4)],
+        )
+        self.assertListEqual(
+            list(cluster_chains.cluster_medoids(tied_scores, labels, tiebreak)),
+            [
+                np.flatnonzero(labels == label)[tiebreak[labels == label].argmax()]
+                for label in range(4)
+            ],
+            msg="Tied medoids not ranked by tiebreak",
+        )
+
     if __name__ == "__main__":
 
         unittest.main()
@@ -3,16 +3,26 @@ Unit tests for the main object which handles clustering of monomeric protein cha
 """
 
 # Third party imports
-# import os
+import itertools
+import os
 import pathlib
+from unittest import mock
 
 import gemmi
 
-# import numpy as np
+import numpy as np
 import pandas as pd
+from scipy.spatial.distance import squareform
 
 # Import functions/classes to test
 from cluster_conformers import cluster_monomers
+from cluster_conformers.utils import (
+    archive_utils,
+    cache_utils,
+    io_utils,
+    linear_algebra_utils,
+    shared_memory_utils,
+)
 
 # Import modified TestCase class
 from .test_case import TestCaseModified, remove_files_in_dir
@@ -163,6 +173,71 @@ class TestClusterMonomersClassicalForce(TestCaseModified):
             path_to_expected_file = PATH_SAVE_CLUSTER_RESULTS.joinpath(file)
             self.assertIsFile(path_to_expected_file)
 
+    def test_pair_scores(self):
+        """
+        Scores saved in condensed form should be labelled by the saved chain IDs and
+        match those looked up by chain.
+        """
+
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+        self.test_cluster_conformers_obj.cluster(
+            path_save_cluster_results=PATH_SAVE_CLUSTER_RESULTS
+        )
+
+        scores = io_utils.load_condensed_matrix(
+            PATH_SAVE_CLUSTER_RESULTS.joinpath(f"{TEST_UNP}_score_matrix.npz")
+        )
+        labels = io_utils.load_pair_labels(
+            PATH_SAVE_CLUSTER_RESULTS.joinpath(f"{TEST_UNP}_label_matrix.npz")
+        )
+
+        self.assertEqual(labels.shape, scores.shape)
+        self.assertEqual(labels.shape[0], 28)
+
+        for label, score in zip(labels, scores):
+            pdbe_chain_id_A, pdbe_chain_id_B = label.split("_to_")
+            self.assertAlmostEqual(
+                self.test_cluster_conformers_obj.pair_score(
+                    pdbe_chain_id_A, pdbe_chain_id_B
+                ),
+                score,
+                delta=0.05,  # Saved scores are rounded
+                msg=f"Saved score for {label} does not match",
+            )
+
+    def test_score_pairs_shared_memory(self):
+        """
+        Serial scoring should read chains from the store it created, rather than
+        attaching to it again per chunk, and the store should be freed if scoring
+        fails before any chunk is summed.
+        """
+
+        unp_cluster = cluster_monomers.ClusterConformations(
+            unp=TEST_UNP, mmcifs_and_chains=TEST_MMCIFS_AND_CHAINS_DICT, nproc=1
+        )
+        unp_cluster.ca_distance(path_save=PATH_SAVE_CA)
+        pairs = np.asarray([[0, 1], [0, 2], [1, 3], [2, 3]])
+        store_class = shared_memory_utils.SharedArrayStore
+
+        with mock.patch.object(
+            store_class, "attach", wraps=store_class.attach
+        ) as mock_attach:
+            scores = unp_cluster._score_pairs(pairs)
+
+        mock_attach.assert_not_called()
+        self.assertEqual(scores.shape, (4,))
+
+        with mock.patch.object(
+            store_class, "unlink", autospec=True, side_effect=store_class.unlink
+        ) as mock_unlink, mock.patch(
+            "cluster_conformers.cluster_monomers.parallel_utils.estimate_pair_costs",
+            side_effect=RuntimeError,
+        ):
+            with self.assertRaises(RuntimeError):
+                unp_cluster._score_pairs(pairs)
+
+        mock_unlink.assert_called_once()
+
     def test_cluster_with_updated_entries(self):
         """
         Tests the main function of the class in the case where a several entries have
@@ -252,6 +327,484 @@ class TestClusterMonomersClassicalForce(TestCaseModified):
             path_to_expected_file = PATH_SAVE_CLUSTER_RESULTS.joinpath(file)
             self.assertIsFile(path_to_expected_file)
 
+    def test_cluster_without_dd_matxs(self):
+        """
+        Tests clustering when no path to save distance difference matrices is parsed.
+        Scores should be identical to those where the matrices are written.
+        """
+
+        remove_files_in_dir(PATH_SAVE_DD_MATXS)
+
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+
+        # Run with and without writing distance difference matrices
+        self.test_cluster_conformers_obj.cluster(path_save_dd_matx=PATH_SAVE_DD_MATXS)
+        score_matx_saved = self.test_cluster_conformers_obj.score_matx
+
+        self.assertTrue(
+            len(list(PATH_SAVE_DD_MATXS.glob(f"{TEST_UNP}_*.npz"))) > 0,
+            msg="Distance difference matrices not saved when path parsed",
+        )
+
+        remove_files_in_dir(PATH_SAVE_DD_MATXS)
+        self.test_cluster_conformers_obj.cluster()
+
+        self.assertEqual(
+            len(list(PATH_SAVE_DD_MATXS.glob(f"{TEST_UNP}_*.npz"))),
+            0,
+            msg="Distance difference matrices saved when no path parsed",
+        )
+
+        self.assertTrue(
+            np.array_equal(
+                self.test_cluster_conformers_obj.score_matx, score_matx_saved
+            ),
+            msg="Scores differ depending on whether distance difference matrices are "
+            "saved",
+        )
+
+    def test_cluster_incremental(self):
+        """
+        Tests re-clustering after an entry is added. Scores of unchanged pairs should
+        be retrieved from the score cache, giving the same scores as clustering all
+        entries from scratch.
+        """
+
+        path_score_cache = PATH_SAVE_CA.joinpath(f"{TEST_UNP}_score_cache.npz")
+
+        # Score all entries from scratch
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+        self.test_cluster_conformers_obj.cluster()
+        expected_score_matx = self.test_cluster_conformers_obj.score_matx
+
+        self.assertIsFile(path_score_cache)
+
+        # Cache scores for all but the last entry, then add it
+        path_score_cache.unlink()
+        mmcifs_and_chains = dict(list(TEST_MMCIFS_AND_CHAINS_DICT.items())[:-1])
+        for test_input in (mmcifs_and_chains, TEST_MMCIFS_AND_CHAINS_DICT):
+            unp_cluster = cluster_monomers.ClusterConformations(
+                unp=TEST_UNP, mmcifs_and_chains=test_input
+            )
+            unp_cluster.ca_distance(path_save=PATH_SAVE_CA)
+
+            with self.assertLogs(cluster_monomers.logger, level="INFO") as logs:
+                unp_cluster.cluster()
+
+        # Only pairs with the two chains of the added entry are scored
+        self.assertIn(
+            f"INFO:{cluster_monomers.logger.name}:Scoring 13 chain pairs, 15 retrieved "
+            "from cache",
+            logs.output,
+            msg="Cached scores are not reused when an entry is added",
+        )
+
+        self.assertTrue(
+            np.array_equal(unp_cluster.score_matx, expected_score_matx),
+            msg="Scores differ when retrieved from the score cache",
+        )
+
+    def test_ca_distance_unchanged_entries(self):
+        """
+        Tests that entries whose mmCIF files were touched or listed as updated, but
+        whose CA atoms are unchanged, are not regenerated or rescored.
+        """
+
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+        self.test_cluster_conformers_obj.cluster(path_save_dd_matx=PATH_SAVE_DD_MATXS)
+
+        self.assertIsFile(PATH_SAVE_CA.joinpath(f"{TEST_UNP}_cache_manifest.json"))
+
+        saved_files = list(PATH_SAVE_CA.glob("*_ca_distance_matrix.npy")) + list(
+            PATH_SAVE_DD_MATXS.glob(f"{TEST_UNP}_*.npz")
+        )
+        mtimes = [os.stat(path).st_mtime_ns for path in saved_files]
+
+        # Update the modification time of one file and list another as updated
+        os.utime(list(TEST_MMCIFS_AND_CHAINS_DICT)[0])
+        unp_cluster = cluster_monomers.ClusterConformations(
+            unp=TEST_UNP, mmcifs_and_chains=TEST_MMCIFS_AND_CHAINS_DICT
+        )
+        unp_cluster.ca_distance(path_save=PATH_SAVE_CA, updated_entries={"3nc7"})
+
+        with self.assertLogs(cluster_monomers.logger, level="INFO") as logs:
+            unp_cluster.cluster(path_save_dd_matx=PATH_SAVE_DD_MATXS)
+
+        self.assertIn(
+            f"INFO:{cluster_monomers.logger.name}:Scoring 0 chain pairs, 28 retrieved "
+            "from cache",
+            logs.output,
+            msg="Pairs of unchanged chains are rescored",
+        )
+        self.assertListEqual(
+            [os.stat(path).st_mtime_ns for path in saved_files],
+            mtimes,
+            msg="Matrices of unchanged chains are regenerated",
+        )
+
+    def test_cluster_dd_modes(self):
+        """
+        Tests saving only selected distance difference matrices. Scores should not
+        depend on which matrices are saved.
+        """
+
+        path_save_dd = PATH_SAVE_OUTPUT.joinpath("dd_modes", "distance_differences")
+        path_save_dd.mkdir(parents=True, exist_ok=True)
+
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+        self.test_cluster_conformers_obj.cluster()
+        expected_score_matx = self.test_cluster_conformers_obj.score_matx
+        num_clusters = np.unique(
+            self.test_cluster_conformers_obj.cluster_df["CONFORMER_ID"]
+        ).shape[0]
+        min_score = np.median(expected_score_matx)
+
+        for dd_mode, num_saved in (
+            ("none", 0),
+            ("representatives", num_clusters * (num_clusters - 1) // 2),
+            ("score", np.count_nonzero(expected_score_matx >= min_score)),
+        ):
+            remove_files_in_dir(path_save_dd)
+
+            self.test_cluster_conformers_obj.cluster(
+                path_save_dd_matx=path_save_dd,
+                dd_mode=dd_mode,
+                dd_min_score=min_score,
+            )
+
+            self.assertTrue(
+                np.array_equal(
+                    self.test_cluster_conformers_obj.score_matx, expected_score_matx
+                ),
+                msg=f"Scores differ when saving {dd_mode} distance difference matrices",
+            )
+            self.assertEqual(
+                len(list(path_save_dd.glob(f"{TEST_UNP}_*.npz"))),
+                num_saved,
+                msg=f"Wrong number of distance difference matrices saved ({dd_mode})",
+            )
+
+        # Pairs of medoids of different clusters, from a mock score matrix of two
+        # clusters, {0, 1, 2} and {3, 4}. Chains 3 and 4 are tied, so the medoid is
+        # the chain with the most residues observed, as for the representatives
+        unp_cluster = self.test_cluster_conformers_obj
+        unp_cluster.score_matx = squareform(
+            [
+                [0, 1, 2, 9, 9],
+                [1, 0, 1, 9, 9],
+                [2, 1, 0, 9, 9],
+                [9, 9, 9, 0, 1],
+                [9, 9, 9, 1, 0],
+            ]
+        )
+        unp_cluster.pair_indices = np.column_stack(np.triu_indices(5, k=1))
+        self.assertListEqual(
+            unp_cluster._select_dd_pairs("representatives", [0, 0, 0, 1, 1]).tolist(),
+            [[1, 4]],
+        )
+        self.assertListEqual(
+            unp_cluster._select_dd_pairs("score", [0, 0, 0, 1, 1], 9).tolist(),
+            [[0, 3], [0, 4], [1, 3], [1, 4], [2, 3], [2, 4]],
+        )
+
+        with self.assertRaises(ValueError, msg="Unknown mode accepted"):
+            self.test_cluster_conformers_obj.cluster(dd_mode="some")
+
+        with self.assertRaises(ValueError, msg="Score mode accepted without threshold"):
+            self.test_cluster_conformers_obj.cluster(dd_mode="score")
+
+    def test_cluster_archive(self):
+        """
+        Tests clustering with all matrices saved in matrix archives. Scores should
+        match those of matrices saved as files, and archived matrices be reused when
+        re-clustering.
+        """
+
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+        self.test_cluster_conformers_obj.cluster()
+        expected_score_matx = self.test_cluster_conformers_obj.score_matx
+
+        path_save_ca = PATH_SAVE_OUTPUT.joinpath("archive", "ca_distances")
+        path_save_dd = PATH_SAVE_OUTPUT.joinpath("archive", "distance_differences")
+        for path in (path_save_ca, path_save_dd):
+            path.mkdir(parents=True, exist_ok=True)
+            remove_files_in_dir(path)
+
+        for force in (True, False):
+            unp_cluster = cluster_monomers.ClusterConformations(
+                unp=TEST_UNP,
+                mmcifs_and_chains=TEST_MMCIFS_AND_CHAINS_DICT,
+                force=force,
+                archive=True,
+            )
+            unp_cluster.ca_distance(path_save=path_save_ca)
+
+            with self.assertLogs(cluster_monomers.logger, level="INFO") as logs:
+                unp_cluster.cluster(path_save_dd_matx=path_save_dd)
+
+            self.assertTrue(
+                np.array_equal(unp_cluster.score_matx, expected_score_matx),
+                msg="Scores differ when matrices are archived",
+            )
+
+        self.assertIn(
+            f"INFO:{cluster_monomers.logger.name}:Scoring 0 chain pairs, 28 retrieved "
+            "from cache",
+            logs.output,
+            msg="Archived distance difference matrices are not reused",
+        )
+
+        # One archive per directory, rather than one file per matrix, indexed with
+        # the statistics and score of each matrix
+        self.assertListEqual(
+            sorted(path.name for path in path_save_dd.iterdir()),
+            [f"{TEST_UNP}_dd_archive.npa", f"{TEST_UNP}_dd_stats.json"],
+        )
+        stats_index = cache_utils.DDStatsIndex(
+            cache_utils.dd_stats_path(path_save_dd, TEST_UNP)
+        )
+        self.assertEqual(len(stats_index.entries), 28)
+        with archive_utils.MatrixArchive(
+            archive_utils.dd_archive_path(path_save_dd, TEST_UNP), read_only=True
+        ) as archive:
+            for key in archive.keys(prefix="dd/"):
+                stats = stats_index.get(key[3:], path_save_dd)
+                self.assertDictEqual(
+                    {field: stats[field] for field in ("max", "sum", "nnz")},
+                    linear_algebra_utils.dd_matx_stats(archive.get(key)),
+                )
+                self.assertEqual(
+                    stats["score"],
+                    unp_cluster.pair_score(
+                        *key[len(f"dd/{TEST_UNP}_") :].split("_to_")
+                    ),
+                )
+        self.assertFalse(any(path_save_ca.glob("*_ca_distance_matrix.np[yz]")))
+        with archive_utils.MatrixArchive(
+            archive_utils.ca_archive_path(path_save_ca, TEST_UNP), read_only=True
+        ) as archive:
+            self.assertEqual(len(archive.keys(prefix="ca/")), 8)
+            self.assertEqual(len(archive.keys(prefix="unp/")), 8)
+
+    def test_cluster_archive_pool_restart(self):
+        """
+        Matrix archives should stay open when the process pool is restarted for a
+        stage planned to use more processes than the last.
+        """
+
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+        self.test_cluster_conformers_obj.cluster()
+        expected_score_matx = self.test_cluster_conformers_obj.score_matx
+
+        path_save_ca = PATH_SAVE_OUTPUT.joinpath("archive_pool", "ca_distances")
+        path_save_dd = PATH_SAVE_OUTPUT.joinpath("archive_pool", "distance_differences")
+        for path in (path_save_ca, path_save_dd):
+            path.mkdir(parents=True, exist_ok=True)
+            remove_files_in_dir(path)
+
+        unp_cluster = cluster_monomers.ClusterConformations(
+            unp=TEST_UNP,
+            mmcifs_and_chains=TEST_MMCIFS_AND_CHAINS_DICT,
+            archive=True,
+        )
+
+        # Each stage planned on one more process than the last
+        num_workers = itertools.count(2)
+        with mock.patch(
+            "cluster_conformers.cluster_monomers.parallel_utils.plan_workers",
+            side_effect=lambda *args, **kwargs: next(num_workers),
+        ):
+            unp_cluster.ca_distance(path_save=path_save_ca)
+            unp_cluster.cluster(
+                path_save_dd_matx=path_save_dd, representative_mode="median"
+            )
+
+        self.assertTrue(
+            np.array_equal(unp_cluster.score_matx, expected_score_matx),
+            msg="Scores differ when the pool is restarted",
+        )
+        with archive_utils.MatrixArchive(
+            archive_utils.dd_archive_path(path_save_dd, TEST_UNP), read_only=True
+        ) as archive:
+            self.assertEqual(len(archive.keys(prefix="dd/")), 28)
+
+    def test_select_representatives(self):
+        """
+        Tests selection of one representative per conformer: the medoid of its scores,
+        ties going to the chain with the most residues observed, or the chain whose CA
+        distance matrix is nearest the element-wise median of its conformer's.
+        """
+
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+
+        with self.assertRaises(ValueError, msg="Unknown representative mode accepted"):
+            self.test_cluster_conformers_obj.cluster(representative_mode="centroid")
+
+        self.test_cluster_conformers_obj.cluster(representative_mode="none")
+        self.assertNotIn("REPRESENTATIVE", self.test_cluster_conformers_obj.cluster_df)
+
+        # Split into two conformers, to select from each
+        labels = np.array([0, 0, 0, 1, 1, 1, 1, 0])
+        self.test_cluster_conformers_obj.cluster_df["CONFORMER_ID"] = labels
+        pdbe_chain_ids = self.test_cluster_conformers_obj.pdbe_chain_ids
+        coverage = [
+            ids.shape[0]
+            for ids in self.test_cluster_conformers_obj._load_unp_res_ids(
+                np.arange(labels.shape[0])
+            )
+        ]
+
+        for mode in ("medoid", "median"):
+            self.test_cluster_conformers_obj.select_representatives(mode)
+            representatives = self.test_cluster_conformers_obj.representatives
+            self.assertCountEqual(representatives, pdbe_chain_ids)
+
+            for conformer_id in (0, 1):
+                chain_indices = np.flatnonzero(labels == conformer_id)
+                if mode == "medoid":
+                    # Mock scores are all zero, so medoids are tied
+                    expected = np.argmax(np.asarray(coverage)[chain_indices])
+                else:
+                    (
+                        ca_matxs,
+                        _,
+                    ) = self.test_cluster_conformers_obj._load_clustering_inputs(
+                        chain_indices
+                    )
+                    expected = np.argmin(
+                        linear_algebra_utils.median_deviations(ca_matxs)
+                    )
+
+                self.assertListEqual(
+                    [
+                        pdbe_chain_id
+                        for pdbe_chain_id in pdbe_chain_ids[chain_indices]
+                        if representatives[pdbe_chain_id]
+                    ],
+                    [pdbe_chain_ids[chain_indices[expected]]],
+                    msg=f"Wrong {mode} representative for conformer {conformer_id}",
+                )
+
+            # Distance difference matrices saved between the same chains
+            self.assertListEqual(
+                self.test_cluster_conformers_obj._select_dd_pairs(
+                    "representatives",
+                    labels,
+                    representatives=self.test_cluster_conformers_obj.select_representatives(
+                        mode, labels
+                    ),
+                ).tolist(),
+                [
+                    sorted(
+                        np.flatnonzero(
+                            [representatives[chain] for chain in pdbe_chain_ids]
+                        ).tolist()
+                    )
+                ],
+                msg=f"Distance difference matrices not saved for {mode} "
+                "representatives",
+            )
+
+        # Medoids, with the same tiebreak, if representatives are not selected
+        self.assertListEqual(
+            self.test_cluster_conformers_obj._select_dd_pairs(
+                "representatives", labels
+            ).tolist(),
+            [
+                np.sort(
+                    self.test_cluster_conformers_obj.select_representatives(
+                        "medoid", labels
+                    )
+                ).tolist()
+            ],
+        )
+
+        # Flagged in the saved clustering results by default
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+        self.test_cluster_conformers_obj.cluster(
+            path_save_cluster_results=PATH_SAVE_CLUSTER_RESULTS
+        )
+        cluster_df = pd.read_csv(
+            PATH_SAVE_CLUSTER_RESULTS.joinpath(
+                f"{TEST_UNP}_sum_based_clustering_results.csv"
+            )
+        )
+        self.assertEqual(
+            cluster_df.groupby("CONFORMER_ID")["REPRESENTATIVE"].sum().tolist(),
+            [1] * cluster_df["CONFORMER_ID"].nunique(),
+            msg="Not one representative per conformer in the clustering results",
+        )
+
+    def test_cluster_sparse(self):
+        """
+        Tests clustering on matrices of observed residues only. Scores and saved
+        distance difference matrices should match those of dense matrices, and dense
+        matrices be regenerated when the alignment changes.
+        """
+
+        with self.assertRaises(ValueError, msg="Unknown alignment accepted"):
+            cluster_monomers.ClusterConformations(
+                unp=TEST_UNP,
+                mmcifs_and_chains=TEST_MMCIFS_AND_CHAINS_DICT,
+                alignment="trimmed",
+            )
+
+        self.test_cluster_conformers_obj.ca_distance(path_save=PATH_SAVE_CA)
+        self.test_cluster_conformers_obj.cluster(path_save_dd_matx=PATH_SAVE_DD_MATXS)
+        expected_score_matx = self.test_cluster_conformers_obj.score_matx
+        expected_dd_matx = io_utils.load_matrix(
+            PATH_SAVE_DD_MATXS.joinpath(
+                self.test_cluster_conformers_obj._dd_matx_fname(0, 1)
+            )
+        )
+
+        path_save_ca = PATH_SAVE_OUTPUT.joinpath("sparse", "ca_distances")
+        path_save_dd = PATH_SAVE_OUTPUT.joinpath("sparse", "distance_differences")
+        for path in (path_save_ca, path_save_dd):
+            path.mkdir(parents=True, exist_ok=True)
+            remove_files_in_dir(path)
+
+        unp_cluster = cluster_monomers.ClusterConformations(
+            unp=TEST_UNP,
+            mmcifs_and_chains=TEST_MMCIFS_AND_CHAINS_DICT,
+            alignment="sparse",
+        )
+        unp_cluster.ca_distance(path_save=path_save_ca)
+        unp_cluster.cluster(path_save_dd_matx=path_save_dd)
+
+        self.assertTrue(
+            np.allclose(unp_cluster.score_matx, expected_score_matx, rtol=1e-12),
+            msg="Scores differ when residues are aligned by UniProt residue ID",
+        )
+        self.assertTrue(
+            np.array_equal(
+                io_utils.load_matrix(
+                    path_save_dd.joinpath(unp_cluster._dd_matx_fname(0, 1))
+                ),
+                expected_dd_matx,
+                equal_nan=True,
+            ),
+            msg="Saved distance difference matrix differs from the dense matrix",
+        )
+        self.assertDictEqual(
+            unp_cluster.representatives,
+            self.test_cluster_conformers_obj.representatives,
+            msg="Representatives differ when residues are aligned by UniProt residue ID",
+        )
+
+        # Sparse matrices are not reused by dense runs
+        unp_cluster = cluster_monomers.ClusterConformations(
+            unp=TEST_UNP, mmcifs_and_chains=TEST_MMCIFS_AND_CHAINS_DICT
+        )
+        with self.assertLogs(cluster_monomers.logger, level="DEBUG") as logs:
+            unp_cluster.ca_distance(path_save=path_save_ca)
+
+        self.assertEqual(
+            sum("Generated CA matrix" in line for line in logs.output),
+            8,
+            msg="Sparse matrices reused for dense alignment",
+        )
+
 
 class TestFigureRendering(TestCaseModified):
     def setUp(self):
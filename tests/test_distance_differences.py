@@ -8,11 +8,13 @@ import unittest
 from unittest import mock
 
 import numpy as np
+from matplotlib.image import imread
 
 # Import functions to test
 from cluster_conformers import distance_differences
+from cluster_conformers.utils import cache_utils, io_utils
 
-from .test_case import TestCaseModified
+from .test_case import TestCaseModified, remove_files_in_dir
 
 # # Modify Python path for custom imports
 # sys.path[0] = str(  # Override default Python import part
@@ -32,7 +34,8 @@ PATH_SERIALISED_MATXS = PATH_BASE.joinpath("mock_serial_matxs", "small_full")
 
 PATH_BASE = str(PATH_BASE)
 PATH_MOCK_MMCIFS = PATH_BASE + "/mock_data/test_mmcifs/"
-PATH_SAVE_CA = pathlib.Path(f"{PATH_BASE}/test_output/ca_distances")
+PATH_SAVE_OUTPUT = pathlib.Path(f"{PATH_BASE}/test_output")
+PATH_SAVE_CA = PATH_SAVE_OUTPUT.joinpath("ca_distances")
 
 # Mock input data
 TEST_UNP = "A12345"
@@ -167,7 +170,111 @@ class TestDistanceDifferences(TestCaseModified):
             f"{type(test_heatmap_kwargs)}",
         )
 
-    # Other plotting functions are not that necessary.
+    def test_make_dd_maps(self):
+        """
+        Test rendering of distance difference maps, serially and in parallel, with
+        maps already rendered skipped.
+        """
+
+        path_dd = PATH_SAVE_OUTPUT.joinpath("dd_maps", "distance_differences")
+        path_maps = PATH_SAVE_OUTPUT.joinpath("dd_maps", "maps")
+        for path in (path_dd, path_maps):
+            path.mkdir(parents=True, exist_ok=True)
+            remove_files_in_dir(path)
+
+        rng = np.random.default_rng(0)
+        for i in range(3):
+            io_utils.save_compressed_matrix(
+                np.triu(rng.random((12, 12)) * 10), path_dd.joinpath(f"{TEST_UNP}_{i}")
+            )
+        expected_maps = [f"{TEST_UNP}_{i}.png" for i in range(3)]
+
+        with mock.patch(
+            "cluster_conformers.distance_differences.parallel_utils.plan_workers",
+            return_value=2,
+        ):
+            distance_differences.make_dd_maps(path_dd, path_maps)
+
+        self.assertListEqual(
+            sorted(path.name for path in path_maps.iterdir()), expected_maps
+        )
+
+        # Matrices saved without statistics are indexed once scanned
+        stats_index = cache_utils.DDStatsIndex(
+            cache_utils.dd_stats_path(path_dd, TEST_UNP)
+        )
+        self.assertListEqual(
+            sorted(stats_index.entries), [f"{TEST_UNP}_{i}" for i in range(3)]
+        )
+
+        # Only the missing map is rendered, scaled without loading any matrix
+        path_maps.joinpath(expected_maps[0]).unlink()
+        with self.assertLogs(distance_differences.logger, level="INFO") as logs:
+            distance_differences.make_dd_maps(path_dd, path_maps, nproc=1)
+
+        for message in (
+            "Finding maximum distance, 3 of 3 distance difference matrices indexed",
+            "Rendering 1 distance difference maps",
+        ):
+            self.assertIn(
+                f"INFO:{distance_differences.logger.name}:{message}", logs.output
+            )
+        self.assertListEqual(
+            sorted(path.name for path in path_maps.iterdir()), expected_maps
+        )
+
+        with self.assertLogs(distance_differences.logger, level="INFO") as logs:
+            distance_differences.make_dd_maps(path_dd, path_maps)
+
+        self.assertIn(
+            f"INFO:{distance_differences.logger.name}:All distance difference maps "
+            "already rendered",
+            logs.output,
+        )
+
+    def test_make_dd_maps_modes(self):
+        """
+        Test raster maps are written at a fixed size for any matrix size, and vector
+        maps are also saved in SVG format.
+        """
+
+        path_dd = PATH_SAVE_OUTPUT.joinpath("dd_map_modes", "distance_differences")
+        path_maps = PATH_SAVE_OUTPUT.joinpath("dd_map_modes", "maps")
+        for path in (path_dd, path_maps):
+            path.mkdir(parents=True, exist_ok=True)
+            remove_files_in_dir(path)
+
+        rng = np.random.default_rng(0)
+        for num_res in (12, 30):
+            dd_matx = np.triu(rng.random((num_res, num_res)) * 10)
+            dd_matx[:, 2] = np.nan  # Missing residue
+            io_utils.save_compressed_matrix(
+                dd_matx, path_dd.joinpath(f"{TEST_UNP}_{num_res}")
+            )
+
+        distance_differences.make_dd_maps(path_dd, path_maps)
+
+        for num_res in (12, 30):
+            image = imread(path_maps.joinpath(f"{TEST_UNP}_{num_res}.png"))
+            self.assertTupleEqual(
+                image.shape[:2],
+                (960, 1280),
+                msg="Raster map not of fixed size",
+            )
+
+        distance_differences.make_dd_maps(path_dd, path_maps, force=True, mode="vector")
+
+        self.assertListEqual(
+            sorted(path.name for path in path_maps.iterdir()),
+            [
+                f"{TEST_UNP}_{num_res}.{suffix}"
+                for num_res in (12, 30)
+                for suffix in ("png", "svg")
+            ],
+        )
+
+        with self.assertRaises(ValueError):
+            distance_differences.make_dd_maps(path_dd, path_maps, mode="pdf")
 
 
 # Run unit tests on call of script
@@ -254,6 +254,119 @@ class TestIOUtils(TestCaseModified):
             msg="Function not loading serialised file correctly.",
         )
 
+    def test_load_condensed_matrix(self):
+        """
+        Condensed score matrices should be loaded as saved, and square score matrices
+        saved by earlier versions converted to the same condensed form.
+        """
+
+        square_matx = np.array([[0.0, 1.2, 3.4], [1.2, 0.0, 5.6], [3.4, 5.6, 0.0]])
+
+        path_condensed = PATH_TEST_SAVE.joinpath("test_condensed_score_matrix")
+        io_utils.save_condensed_matrix(np.array([1.2, 3.4, 5.6]), path_condensed)
+
+        path_square = PATH_TEST_SAVE.joinpath("test_square_score_matrix")
+        io_utils.save_compressed_matrix(square_matx, path_square)
+
+        for path in (path_condensed, path_square):
+            self.assertTrue(
+                np.allclose(
+                    io_utils.load_condensed_matrix(path.with_suffix(".npz")),
+                    [1.2, 3.4, 5.6],
+                ),
+                msg=f"Condensed matrix not loaded from {path.name}",
+            )
+
+    def test_load_pair_labels(self):
+        """
+        Labels of each score should be the same whether loaded from saved chain IDs or
+        an N*N label matrix saved by earlier versions.
+        """
+
+        pdbe_chain_ids = np.array(["1atp_A", "2adp_B", "3amp_C"])
+        expected_labels = ["1atp_A_to_2adp_B", "1atp_A_to_3amp_C", "2adp_B_to_3amp_C"]
+
+        path_chain_ids = PATH_TEST_SAVE.joinpath("test_label_chain_ids")
+        io_utils.save_string_based_matx(pdbe_chain_ids, path_chain_ids)
+
+        label_matx = np.zeros((3, 3), dtype=object)
+        for (index_A, index_B), label in zip(
+            np.argwhere(np.triu(np.ones((3, 3)), 1)), expected_labels
+        ):
+            label_matx[index_A, index_B] = label
+        path_label_matx = PATH_TEST_SAVE.joinpath("test_label_matrix")
+        io_utils.save_string_based_matx(label_matx.astype(str), path_label_matx)
+
+        for path in (path_chain_ids, path_label_matx):
+            self.assertListEqual(
+                list(io_utils.load_pair_labels(path.with_suffix(".npz"))),
+                expected_labels,
+                msg=f"Pair labels not loaded from {path.name}",
+            )
+
+    def test_load_packed_matrix(self):
+        """
+        Packed matrices should load with the same values as the square, compressed
+        format of earlier versions, which is still loaded in every form. Migrated
+        matrices should be identical to the original.
+        """
+
+        PATH_TEST_SAVE.mkdir(parents=True, exist_ok=True)
+        rng = np.random.default_rng(0)
+        matx = rng.random((5, 5)) * 10
+        matx = matx + matx.T
+        matx[1, :] = matx[:, 1] = np.nan  # Unmodelled residue
+
+        path_compressed = PATH_TEST_SAVE.joinpath("test_ca_compressed")
+        io_utils.save_compressed_matrix(matx, path_compressed)
+        expected_matx = io_utils.load_matrix(path_compressed.with_suffix(".npz"))
+
+        path_packed = io_utils.save_packed_matrix(
+            matx, PATH_TEST_SAVE.joinpath("test_ca_packed")
+        )
+        self.assertIsFile(path_packed)
+
+        packed = io_utils.load_packed_matrix(path_packed, form="packed")
+        self.assertIsInstance(packed, np.memmap)
+        self.assertEqual(packed.shape, (15,), msg="Matrix not saved in packed form")
+
+        for path in (path_packed, path_compressed):
+            self.assertTrue(
+                np.array_equal(
+                    io_utils.load_packed_matrix(path), expected_matx, equal_nan=True
+                ),
+                msg=f"Dense matrix loaded from {path.name} differs",
+            )
+            self.assertTrue(
+                np.array_equal(
+                    io_utils.load_packed_matrix(path, form="view").packed,
+                    packed,
+                    equal_nan=True,
+                ),
+                msg=f"Packed matrix loaded from {path.name} differs",
+            )
+
+        with self.assertRaises(ValueError, msg="Unknown matrix form accepted"):
+            io_utils.load_packed_matrix(path_packed, form="sparse")
+
+        self.assertTrue(io_utils.packed_matrix_exists(path_compressed))
+        self.assertFalse(
+            io_utils.packed_matrix_exists(PATH_TEST_SAVE.joinpath("test_ca_missing"))
+        )
+
+        path_migrated = io_utils.migrate_to_packed_matrix(
+            path_compressed.with_suffix(".npz")
+        )
+        self.assertFalse(path_compressed.with_suffix(".npz").exists())
+        self.assertTrue(
+            np.array_equal(
+                io_utils.load_packed_matrix(path_migrated, form="packed"),
+                packed,
+                equal_nan=True,
+            ),
+            msg="Migrated matrix differs from compressed matrix",
+        )
+
 
 # Run unit tests on call of script
 if __name__ == "__main__":
@@ -15,6 +15,7 @@ import unittest
 from unittest import TestCase, mock
 
 import numpy as np
+from scipy.spatial.distance import squareform
 
 # Import functions to test
 from cluster_conformers.utils import linear_algebra_utils
@@ -162,48 +163,7 @@ class TestLinearAlgebraUtils(TestCase):
             f"{test_euclidean_distance}",
         )
 
-    @mock.patch(
-        "cluster_conformers.utils.linear_algebra_utils.euclidean",
-        side_effect=[
-            np.NaN,
-            np.NaN,
-            np.NaN,
-            np.NaN,
-            np.NaN,
-            np.NaN,
-            np.NaN,
-            0.0,
-            7.1414,
-            5018.0,
-            7.4833,
-            29.172,
-            np.NaN,
-            7.1414,
-            0.0,
-            5011.0,
-            8.1854,
-            22.181,
-            np.NaN,
-            5018.0,
-            5011.0,
-            0.0,
-            5014.4,
-            4989.1,
-            np.NaN,
-            7.4833,
-            8.1854,
-            5014.4,
-            0.0,
-            25.981,
-            np.NaN,
-            29.172,
-            22.181,
-            4989.1,
-            25.981,
-            0.0,
-        ],
-    )
-    def test_generate_ca_matx(self, mock_euclidean):
+    def test_generate_ca_matx(self):
         """
         Test for the function that generates a distance matrix from 3 lists of
         equal-length (length=N) atomic coordinates. The 3 lists should contain the
@@ -222,7 +182,7 @@ class TestLinearAlgebraUtils(TestCase):
 
         # Test the output
         self.assertTrue(
-            np.array_equal(
+            np.allclose(
                 test_matx,
                 np.array(
                     [
@@ -234,11 +194,62 @@ class TestLinearAlgebraUtils(TestCase):
                         [np.NaN, 29.172, 22.181, 4989.1, 25.981, 0.0],
                     ]
                 ),
+                rtol=1e-4,
                 equal_nan=True,
             ),
             msg="Function is not constructing the correct array from input lists. ",
         )
 
+    def test_generate_ca_matx_from_coords(self):
+        """
+        Regression test for the vectorised CA distance matrix engine. Output must match
+        the original nested-loop implementation, built from euclidean(), including
+        np.NaN rows and columns for gaps in the UniProt sequence.
+        """
+        # Random coordinates with gaps, as inserted by fill_missing_unps()
+        rng = np.random.default_rng(seed=0)
+        coords = rng.uniform(-100.0, 100.0, size=(300, 3))
+        coords[[0, 1, 57, 299]] = np.NaN
+
+        # Original nested-loop implementation
+        expected_matx = np.array(
+            [
+                [linear_algebra_utils.euclidean(res1, res2) for res2 in coords]
+                for res1 in coords
+            ]
+        )
+
+        # Full matrix
+        test_matx = linear_algebra_utils.generate_ca_matx_from_coords(coords)
+        self.assertTrue(
+            np.allclose(test_matx, expected_matx, equal_nan=True),
+            msg="Vectorised CA matrix does not match the nested-loop implementation.",
+        )
+        self.assertEqual(test_matx.dtype, np.float64)
+
+        # Single precision
+        test_matx = linear_algebra_utils.generate_ca_matx_from_coords(
+            coords, dtype=np.float32
+        )
+        self.assertEqual(
+            test_matx.dtype,
+            np.float32,
+            msg="CA matrix should be returned with the requested precision.",
+        )
+        self.assertTrue(
+            np.allclose(test_matx, expected_matx, atol=1e-3, equal_nan=True),
+            msg="Single precision CA matrix is not within tolerance.",
+        )
+
+        # Upper triangle only -- spans several row blocks
+        test_matx = linear_algebra_utils.generate_ca_matx_from_coords(
+            coords, upper_only=True
+        )
+        self.assertTrue(
+            np.allclose(test_matx, np.triu(expected_matx), equal_nan=True),
+            msg="Upper triangle of CA matrix is incorrect or lower triangle non-zero.",
+        )
+
     def test_matx_subtract(self):
         """
         Tests the matx_subtract() function. The tested function should take two
@@ -578,6 +589,21 @@ class TestLinearAlgebraUtils(TestCase):
             msg="Function cannot handle np.NaN values contained in parsed matrix. ",
         )
 
+    def test_dd_matx_stats(self):
+        """
+        Statistics of a distance difference matrix should ignore NaN values, with a
+        maximum of 0 if no elements are observed.
+        """
+
+        self.assertDictEqual(
+            linear_algebra_utils.dd_matx_stats(np.triu(MOCK_MATX_4)),
+            {"max": 6.0, "sum": 11.0, "nnz": 3},
+        )
+        self.assertDictEqual(
+            linear_algebra_utils.dd_matx_stats(np.full((2, 2), np.nan)),
+            {"max": 0.0, "sum": 0.0, "nnz": 0},
+        )
+
     def test_len_overlap(self):
         """
         Tests the function which calculates the length of the overlap between two parsed
@@ -730,6 +756,310 @@ class TestLinearAlgebraUtils(TestCase):
             msg="Increasing the residue mask returns incorrect score.",
         )
 
+    def test_condensed_index(self):
+        """
+        Positions of square matrix elements in the condensed matrix should match those
+        of scipy's squareform(), in either index order.
+        """
+
+        square_matx = np.arange(36, dtype=float).reshape(6, 6)
+        square_matx = np.triu(square_matx, 1) + np.triu(square_matx, 1).T
+        condensed = squareform(square_matx)
+
+        rows, columns = np.nonzero(~np.eye(6, dtype=bool))
+        self.assertTrue(
+            np.array_equal(
+                condensed[linear_algebra_utils.condensed_index(6, rows, columns)],
+                square_matx[rows, columns],
+            ),
+            msg="Condensed positions do not match squareform()",
+        )
+
+        self.assertTrue(
+            np.array_equal(
+                linear_algebra_utils.pair_indices(6),
+                np.column_stack([rows, columns])[rows < columns],
+            ),
+            msg="Pair indices not in condensed order",
+        )
+
+    def test_remap_condensed(self):
+        """
+        Remapped condensed matrices should hold the elements of the selected items,
+        with NaN for absent items.
+        """
+
+        rng = np.random.default_rng(0)
+        square_matx = rng.random((5, 5))
+        square_matx = np.triu(square_matx, 1) + np.triu(square_matx, 1).T
+
+        positions = np.array([3, -1, 0, 4])
+        expected_matx = square_matx[np.ix_(positions, positions)]
+        expected_matx[1, :] = expected_matx[:, 1] = np.nan
+
+        remapped = linear_algebra_utils.remap_condensed(
+            squareform(square_matx), positions
+        )
+
+        self.assertTrue(
+            np.allclose(
+                remapped,
+                expected_matx[np.triu_indices(4, k=1)],
+                equal_nan=True,
+            ),
+            msg="Condensed matrix not remapped correctly",
+        )
+
+        self.assertEqual(
+            linear_algebra_utils.remap_condensed(np.array([]), [-1, -1]).shape, (1,)
+        )
+
+    def test_overlap_counts(self):
+        """
+        Overlaps counted from the coverage matrix, in blocks of any size, should match
+        the intersections of UniProt residue ID sets.
+        """
+
+        unp_res_ids = [
+            np.array([1, 2, 3, 4, 5]),
+            np.array([3, 4, 5, 6]),
+            np.array([10, 11]),
+            np.array([2, 4, 6, 8, 10]),
+        ]
+        pairs = linear_algebra_utils.pair_indices(len(unp_res_ids))
+
+        expected_overlaps = [
+            linear_algebra_utils.len_overlap(unp_res_ids[a], unp_res_ids[b])
+            for a, b in pairs
+        ]
+
+        coverage = linear_algebra_utils.coverage_matrix(unp_res_ids)
+        self.assertEqual(coverage.shape, (4, 11))
+        self.assertEqual(coverage.sum(), 16)
+
+        for block_size in (1, 3, linear_algebra_utils.OVERLAP_BLOCK_SIZE):
+            self.assertListEqual(
+                linear_algebra_utils.overlap_counts(
+                    coverage, pairs, block_size=block_size
+                ).tolist(),
+                expected_overlaps,
+                msg=f"Overlaps not counted correctly in blocks of {block_size}",
+            )
+
+    def test_calc_scores(self):
+        """
+        Batched scores should equal those of calc_score() for each pair.
+        """
+
+        rng = np.random.default_rng(0)
+        dd_matx = rng.random((4, 4))
+        unps1 = {1, 2, 3, 4}
+        unps2 = {2, 3, 4, 5, 6}
+
+        dd_sum = np.sum(linear_algebra_utils.upper_triangle(dd_matx, res_mask=1))
+
+        self.assertAlmostEqual(
+            linear_algebra_utils.calc_scores(
+                np.array([dd_sum]), np.array([3]), np.array([4]), np.array([5])
+            )[0],
+            linear_algebra_utils.calc_score(dd_matx, unps1, unps2),
+            msg="Batched score differs from calc_score()",
+        )
+
+    def test_packed_triangular_matrix(self):
+        """
+        Packed matrices should hold the upper triangle column by column, with the
+        leading block of the matrix as a prefix, and unpack to the original matrix.
+        """
+
+        matx = np.array([[1.0, 2.0, 4.0], [2.0, 3.0, 5.0], [4.0, 5.0, 6.0]])
+
+        packed_matx = linear_algebra_utils.PackedTriangularMatrix.from_dense(matx)
+
+        self.assertListEqual(
+            packed_matx.packed.tolist(),
+            [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+            msg="Upper triangle not packed column by column",
+        )
+        self.assertTupleEqual(packed_matx.shape, (3, 3))
+        self.assertEqual(packed_matx[2, 1], 5.0)
+        self.assertEqual(packed_matx[1, 2], 5.0)
+
+        self.assertTrue(np.array_equal(packed_matx.to_dense(), np.triu(matx)))
+        self.assertTrue(np.array_equal(packed_matx.to_dense(symmetric=True), matx))
+
+        leading = packed_matx.leading(2)
+        self.assertTrue(
+            np.shares_memory(leading.packed, packed_matx.packed),
+            msg="Leading block copied",
+        )
+        self.assertTrue(
+            np.array_equal(leading.to_dense(symmetric=True), matx[:2, :2]),
+            msg="Leading block differs from trimmed matrix",
+        )
+
+        with self.assertRaises(IndexError):
+            packed_matx[0, 3]
+
+        with self.assertRaises(ValueError, msg="Invalid packed length accepted"):
+            linear_algebra_utils.PackedTriangularMatrix(np.zeros(4))
+
+    def test_dd_sum_packed(self):
+        """
+        Distance difference sums of packed matrices should match those of the square
+        distance difference matrix, for chains of different lengths with unmodelled
+        residues, in any block size.
+        """
+
+        rng = np.random.default_rng(0)
+        ca_matxs = []
+        for num_res in (30, 37):
+            coords = rng.random((num_res, 3)) * 20
+            coords[rng.random(num_res) < 0.1] = np.nan
+            ca_matxs.append(
+                linear_algebra_utils.generate_ca_matx_from_coords(
+                    coords, dtype=np.float32, upper_only=True
+                )
+            )
+        packed_A, packed_B = (
+            linear_algebra_utils.PackedTriangularMatrix.pack(ca_matx)
+            for ca_matx in ca_matxs
+        )
+
+        # Square distance difference matrix, as generated before scoring
+        ca_matx_A, ca_matx_B = linear_algebra_utils.trim_to_smallest(*ca_matxs)
+        dd_matx = np.abs(ca_matx_A - ca_matx_B)
+        dd_matx = np.where(dd_matx < linear_algebra_utils.DD_CUTOFF, 0, dd_matx)
+        expected_sum = np.sum(
+            linear_algebra_utils.upper_triangle(dd_matx, res_mask=1), dtype=np.float64
+        )
+
+        for block_size in (1, 100, linear_algebra_utils.DD_BLOCK_SIZE):
+            self.assertAlmostEqual(
+                linear_algebra_utils.dd_sum_packed(
+                    packed_A, packed_B, block_size=block_size
+                ),
+                expected_sum,
+                places=6,
+                msg=f"Sum differs in blocks of {block_size}",
+            )
+
+        self.assertTrue(
+            np.array_equal(
+                linear_algebra_utils.PackedTriangularMatrix(
+                    linear_algebra_utils.dd_packed(packed_B, packed_A)
+                ).to_dense(),
+                np.triu(dd_matx),
+                equal_nan=True,
+            ),
+            msg="Packed distance difference matrix differs from the square matrix",
+        )
+
+    def test_dd_sum_aligned(self):
+        """
+        Distance difference sums of matrices of observed residues, aligned on their
+        UniProt residue IDs, should match those of the matrices padded from UniProt
+        residue 1, in any block size.
+        """
+
+        rng = np.random.default_rng(0)
+        packed_dense, packed_sparse, unp_res_ids = [], [], []
+        for num_res in (40, 52):
+            coords = rng.random((num_res, 3)) * 20
+
+            # Unobserved residues, in no particular order of parsing
+            observed = rng.permutation(np.flatnonzero(rng.random(num_res) > 0.2))
+            padded = np.full_like(coords, np.nan)
+            padded[observed] = coords[observed]
+
+            packed_dense.append(
+                linear_algebra_utils.PackedTriangularMatrix.pack(
+                    linear_algebra_utils.generate_ca_matx_from_coords(
+                        padded, dtype=np.float32, upper_only=True
+                    )
+                )
+            )
+            packed_sparse.append(
+                linear_algebra_utils.PackedTriangularMatrix.pack(
+                    linear_algebra_utils.generate_ca_matx_from_coords(
+                        coords[observed], dtype=np.float32, upper_only=True
+                    )
+                )
+            )
+            unp_res_ids.append(observed + 1)
+
+        expected_sum = linear_algebra_utils.dd_sum_packed(*packed_dense)
+
+        for block_size in (1, 100, linear_algebra_utils.DD_BLOCK_SIZE):
+            self.assertAlmostEqual(
+                linear_algebra_utils.dd_sum_aligned(
+                    packed_sparse[0],
+                    unp_res_ids[0],
+                    packed_sparse[1],
+                    unp_res_ids[1],
+                    block_size=block_size,
+                ),
+                expected_sum,
+                places=6,
+                msg=f"Aligned sum differs in blocks of {block_size}",
+            )
+
+        # Expanded to the shorter chain, as trimmed for dense distance differences
+        self.assertTrue(
+            np.array_equal(
+                linear_algebra_utils.expand_packed(
+                    packed_sparse[1], unp_res_ids[1], 40
+                ),
+                linear_algebra_utils.leading_packed_pair(*packed_dense)[1],
+                equal_nan=True,
+            ),
+            msg="Expanded matrix differs from the padded matrix",
+        )
+
+    def test_median_deviations(self):
+        """
+        Deviations from the element-wise median should match those of the stacked
+        leading blocks, ignoring unobserved residues, in any block size.
+        """
+
+        rng = np.random.default_rng(1)
+        packed_matxs = []
+        for num_res in (20, 26, 23, 31):
+            coords = rng.random((num_res, 3)) * 20
+            coords[rng.random(num_res) < 0.2] = np.nan
+            packed_matxs.append(
+                linear_algebra_utils.PackedTriangularMatrix.pack(
+                    linear_algebra_utils.generate_ca_matx_from_coords(
+                        coords, dtype=np.float32, upper_only=True
+                    )
+                )
+            )
+
+        stack = np.stack(
+            [packed_matx[: packed_matxs[0].shape[0]] for packed_matx in packed_matxs]
+        )
+        deviation = np.abs(stack - np.nanmedian(stack, axis=0))
+        expected = np.nanmean(deviation, axis=1)
+
+        for block_size in (1, 7, linear_algebra_utils.DD_BLOCK_SIZE):
+            self.assertTrue(
+                np.allclose(
+                    linear_algebra_utils.median_deviations(
+                        packed_matxs, block_size=block_size
+                    ),
+                    expected,
+                ),
+                msg=f"Deviations differ in blocks of {block_size}",
+            )
+
+        self.assertEqual(
+            linear_algebra_utils.median_deviations(
+                [np.full(3, np.nan), packed_matxs[0]]
+            )[0],
+            np.inf,
+            msg="Matrix without observed residues is not furthest from the median",
+        )
+
 
 # Run unit tests on call of script
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+"""
+Unit tests for scheduling of tasks over worker processes
+"""
+
+# Third party imports
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Import functions to test
+from cluster_conformers.utils import parallel_utils
+
+# Import modified TestCase class
+from .test_case import TestCaseModified
+
+
+class TestParallelUtils(TestCaseModified):
+    def test_estimate_pair_costs(self):
+        """
+        Cost of a pair should grow with the square of the shorter chain length.
+        """
+
+        costs = parallel_utils.estimate_pair_costs([10, 100, 20], [(0, 1), (1, 2)])
+
+        self.assertTrue(
+            np.array_equal(costs, [10**2 + 1, 20**2 + 1]),
+            msg="Pair costs not estimated from the overlapping length",
+        )
+
+    def test_make_chunks(self):
+        """
+        Every task should be placed in exactly one chunk, with chunk costs balanced and
+        the most expensive chunk first.
+        """
+
+        tasks = list(range(10))
+        costs = [100, 1, 1, 1, 1, 50, 50, 1, 1, 1]
+
+        chunks = parallel_utils.make_chunks(tasks, costs, num_chunks=3)
+
+        self.assertListEqual(
+            sorted(task for chunk in chunks for task in chunk),
+            tasks,
+            msg="Tasks lost or duplicated when chunking",
+        )
+
+        chunk_costs = [sum(costs[task] for task in chunk) for chunk in chunks]
+        self.assertListEqual(
+            chunk_costs,
+            [100, 54, 53],
+            msg="Chunks are not balanced by cost or not ordered most expensive first",
+        )
+
+        # No empty chunks when there are fewer tasks than chunks
+        self.assertEqual(
+            len(parallel_utils.make_chunks(tasks[:2], costs[:2], num_chunks=5)),
+            2,
+            msg="Empty chunks returned",
+        )
+
+    @patch("cluster_conformers.utils.parallel_utils.available_cores", return_value=64)
+    def test_plan_workers(self, mock_available_cores):
+        """
+        Small stages should run serially, large stages on up to all available cores,
+        with the number of workers limited by max_workers and the number of tasks.
+        """
+
+        # Less work than starting two workers
+        self.assertEqual(
+            parallel_utils.plan_workers(0.02, num_tasks=100, startup_cost=0.01),
+            1,
+            msg="Small stage not planned to run serially",
+        )
+
+        # Optimum of sqrt(work / startup_cost) workers
+        self.assertEqual(
+            parallel_utils.plan_workers(1.0, num_tasks=100, startup_cost=0.01),
+            10,
+            msg="Number of workers does not minimise the modelled runtime",
+        )
+
+        # Large stage limited by available cores, max_workers and tasks
+        self.assertEqual(
+            parallel_utils.plan_workers(1e4, num_tasks=1000, startup_cost=0.01),
+            64,
+            msg="Number of workers not limited by available cores",
+        )
+        self.assertEqual(
+            parallel_utils.plan_workers(
+                1e4, num_tasks=1000, max_workers=16, startup_cost=0.01
+            ),
+            16,
+            msg="Number of workers not limited by max_workers",
+        )
+        self.assertEqual(
+            parallel_utils.plan_workers(1e4, num_tasks=5, startup_cost=0.01),
+            5,
+            msg="Number of workers not limited by the number of tasks",
+        )
+
+
+# Run unit tests on call of script
+if __name__ == "__main__":
+
+    unittest.main()
@@ -13,6 +13,7 @@ import unittest
 from unittest.mock import MagicMock, patch
 
 # import numpy as np
+import numpy as np
 from gemmi import cif
 from numpy import nan
 
@@ -42,6 +43,26 @@ MOCK_MMCIF_PATH = PATH_BASE + "/mock_data/mock_mmcifs/mock_structure.cif"
 # ""
 MOCK_MMCIF = cif.read_file(MOCK_MMCIF_PATH).sole_block()
 
+# Documents backing mock tables, kept alive for the duration of the tests
+MOCK_DOCUMENTS = []
+
+
+def make_mock_table(rows: "list[list[str]]") -> cif.Table:
+    """
+    Builds a Gemmi table of the ATOM_SITE_COLUMNS loop terms from a list of rows, as
+    returned by parsing_utils.extract_table().
+    """
+    document = cif.Document()
+    block = document.add_new_block("mock")
+    loop = block.init_loop("_atom_site.", parsing_utils.ATOM_SITE_COLUMNS)
+    for row in rows:
+        loop.add_row(row)
+
+    MOCK_DOCUMENTS.append(document)
+
+    return block.find("_atom_site.", parsing_utils.ATOM_SITE_COLUMNS)
+
+
 # Mock objects
 mock_table = [  # Test table with HETAMS, different chains and non-CAs
     ["ATOM", "CA", "1.0", "2.0", "3.0", "A", "1"],
@@ -66,6 +87,20 @@ class TestParsingUtils(TestCaseModified):
     :type TestCaseModified: _type_
     """
 
+    def assertStructureCoordsEqual(self, test_dict, expected_dict, msg=None):
+        """
+        Checks dictionaries of coordinate and UniProt residue index arrays, as returned
+        by parse_mmcif() and fill_missing_unps(), have equal keys and values.
+        """
+        self.assertSetEqual(set(test_dict.keys()), set(expected_dict.keys()), msg=msg)
+
+        for key, expected_values in expected_dict.items():
+            self.assertIsInstance(test_dict[key], np.ndarray, msg=msg)
+            self.assertTrue(
+                np.array_equal(test_dict[key], expected_values, equal_nan=True),
+                msg=msg,
+            )
+
     def test_extract_table(self):
         """
         Tests for the function responsible for extracting row-column information from a
@@ -166,10 +201,10 @@ class TestParsingUtils(TestCaseModified):
         """
 
         mock_input_dict = {
-            "unp_res_ids": {3, 4, 5, 7, 9, 10},
-            "cartn_x": [10.0, 1.41, 3.33, 49.1, 100.1, 72.02],
-            "cartn_y": [30.37, 44.16, 81.86, 53.95, 63.09, 21.7],
-            "cartn_z": [72.46, 8.15, 31.35, 89.18, 23.32, 26.19],
+            "unp_res_ids": np.array([3, 4, 5, 7, 9, 10]),
+            "cartn_x": np.array([10.0, 1.41, 3.33, 49.1, 100.1, 72.02]),
+            "cartn_y": np.array([30.37, 44.16, 81.86, 53.95, 63.09, 21.7]),
+            "cartn_z": np.array([72.46, 8.15, 31.35, 89.18, 23.32, 26.19]),
         }
 
         # Run test
@@ -177,10 +212,10 @@ class TestParsingUtils(TestCaseModified):
             structure_coords=mock_input_dict
         )
 
-        self.assertDictEqual(
+        self.assertStructureCoordsEqual(
             test_output_dict,
             {
-                "unp_res_ids": {1, 2, 3, 4, 5, 6, 7, 8, 9, 10},
+                "unp_res_ids": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
                 "cartn_x": [nan, nan, 10.0, 1.41, 3.33, nan, 49.1, nan, 100.1, 72.02],
                 "cartn_y": [
                     nan,
@@ -214,18 +249,20 @@ class TestParsingUtils(TestCaseModified):
     @patch(
         "cluster_conformers.utils.parsing_utils.extract_table",
         side_effect=[
-            # So long as the patched function returns a N*7-dimensional iterable, the
-            # remainder of the function should work as of 20/9/22
-            [  # Test table without any problematic values
-                ["ATOM", "CA", "1.0", "2.0", "3.0", "A", "1"],
-                ["ATOM", "CA", "10.0", "20.0", "30.0", "A", "2"],
-                ["ATOM", "CA", "100.0", "200.0", "300.0", "A", "3"],
-                ["ATOM", "CA", "-100.0", "-200.0", "-300.0", "A", "4"],
-            ],
+            # Patched function must return a N*7-dimensional Gemmi table, with columns
+            # ordered as in parsing_utils.ATOM_SITE_COLUMNS
+            make_mock_table(
+                [  # Test table without any problematic values
+                    ["ATOM", "CA", "1.0", "2.0", "3.0", "A", "1"],
+                    ["ATOM", "CA", "10.0", "20.0", "30.0", "A", "2"],
+                    ["ATOM", "CA", "100.0", "200.0", "300.0", "A", "3"],
+                    ["ATOM", "CA", "-100.0", "-200.0", "-300.0", "A", "4"],
+                ]
+            ),
             [],  # Test where the length of the table is zero
             # Test whether excludable are in fact excluded
-            mock_table,
-            mock_table,
+            make_mock_table(mock_table),
+            make_mock_table(mock_table),
         ],
     )
     def test_parse_mmcif(self, mock_extract_table):
@@ -233,9 +270,9 @@ class TestParsingUtils(TestCaseModified):
         Test for the parse_mmcif() function. The function extract_table(), which is
         tested above, is called within this function and should therefore be patched.
 
-        :param mock_extract_table: Mock N*7 iterable, where N=number of rows and
+        :param mock_extract_table: Mock N*7 table, where N=number of rows and
             7=number of columns.
-        :type mock_extract_table: Iterable
+        :type mock_extract_table: gemmi.cif.Table
         :raises TypeError: Should raise TypeError when emtpy table parsed.
         """
 
@@ -246,14 +283,14 @@ class TestParsingUtils(TestCaseModified):
 
         # Expected output from parsed mmCIF.
         expected_dict = {
-            "unp_res_ids": {1, 2, 3, 4},
+            "unp_res_ids": [1, 2, 3, 4],
             "cartn_x": [1.0, 10.0, 100.0, -100.0],
             "cartn_y": [2.0, 20.0, 200.0, -200.0],
             "cartn_z": [3.0, 30.0, 300.0, -300.0],
         }
 
         # Test function on a 'perfect' situation -- where there are no exceptions
-        self.assertDictEqual(
+        self.assertStructureCoordsEqual(
             parsing_utils.parse_mmcif(mock_mmcif, "A"),
             expected_dict,
             msg="Function cannot handle a situation in which there are no exceptions "
@@ -267,7 +304,7 @@ class TestParsingUtils(TestCaseModified):
 
         # Check whether a specific chain can be pulled out of a table containing
         # multiple chains
-        self.assertDictEqual(
+        self.assertStructureCoordsEqual(
             parsing_utils.parse_mmcif(mock_mmcif, "B"),
             expected_dict,
             msg="Function cannot pull out information pertaining to a single chain "
@@ -276,13 +313,55 @@ class TestParsingUtils(TestCaseModified):
 
         # Check whether a specific chain can be pulled out of a table containing
         # multiple chains and non-CA information
-        self.assertDictEqual(
+        self.assertStructureCoordsEqual(
             parsing_utils.parse_mmcif(mock_mmcif, "A"),
             expected_dict,
             msg="Function cannot pull out information pertaining to a single chain "
             "from a multi-chain structure, where other information must be ignored.",
         )
 
+    @patch(
+        "cluster_conformers.utils.parsing_utils.extract_table",
+        side_effect=[make_mock_table(mock_table)],
+    )
+    def test_parse_mmcif_chains(self, mock_extract_table):
+        """
+        Test for the parse_mmcif_chains() function, which should return the same
+        coordinates for each chain as parse_mmcif() from a single read of the table.
+
+        :param mock_extract_table: Mock N*7 table, where N=number of rows and
+            7=number of columns.
+        :type mock_extract_table: gemmi.cif.Table
+        """
+
+        mock_mmcif = MagicMock(spec=cif.Block, return_value=None)
+
+        expected_dict = {
+            "unp_res_ids": [1, 2, 3, 4],
+            "cartn_x": [1.0, 10.0, 100.0, -100.0],
+            "cartn_y": [2.0, 20.0, 200.0, -200.0],
+            "cartn_z": [3.0, 30.0, 300.0, -300.0],
+        }
+
+        test_output_dict = parsing_utils.parse_mmcif_chains(mock_mmcif, ["A", "B"])
+
+        # Table should only be extracted once for all chains
+        mock_extract_table.assert_called_once()
+
+        self.assertListEqual(
+            list(test_output_dict.keys()),
+            ["A", "B"],
+            msg="Chains are not returned in the order requested.",
+        )
+
+        for chain_id in ("A", "B"):
+            self.assertStructureCoordsEqual(
+                test_output_dict[chain_id],
+                expected_dict,
+                msg=f"Function cannot pull out information for chain {chain_id} from "
+                "a multi-chain structure parsed in a single pass.",
+            )
+
 
 # Run unit tests on call of script
 if __name__ == "__main__":
@@ -0,0 +1,95 @@
+"""
+Unit tests for the shared memory store of per-chain arrays
+"""
+
+# Third party imports
+import unittest
+from multiprocessing import Pool
+
+import numpy as np
+
+# Import functions to test
+from cluster_conformers.utils import shared_memory_utils
+
+# Import modified TestCase class
+from .test_case import TestCaseModified
+
+
+def sum_stored_array(handle, i):
+    """
+    Sums an array of a shared store from a worker process.
+    """
+    store = shared_memory_utils.SharedArrayStore.attach(handle)
+    return float(store.get("matxs", i).sum())
+
+
+class TestSharedArrayStore(TestCaseModified):
+    def setUp(self):
+        """
+        Arrays of different shapes and dtypes, as stored for clustering.
+        """
+
+        rng = np.random.default_rng(0)
+        self.matxs = [
+            rng.random((5, 5)).astype(np.float32),
+            rng.random((1, 1)).astype(np.float32),
+            np.zeros((0, 0), dtype=np.float32),
+            rng.random((12, 12)).astype(np.float32),
+        ]
+        self.unps = [np.arange(1, 6), np.array([7]), np.array([], dtype=int)]
+
+    def test_create_and_get(self):
+        """
+        Arrays returned by the store should be identical to those stored, including
+        their shape, and read-only.
+        """
+
+        with shared_memory_utils.SharedArrayStore.create(
+            {"matxs": self.matxs, "unps": self.unps}
+        ) as store:
+
+            self.assertEqual(store.count("matxs"), 4)
+            self.assertEqual(store.count("unps"), 3)
+
+            for i, matx in enumerate(self.matxs):
+                self.assertTrue(
+                    np.array_equal(store.get("matxs", i), matx)
+                    and store.get("matxs", i).shape == matx.shape,
+                    msg=f"2D array {i} not returned as stored",
+                )
+
+            for i, unps in enumerate(self.unps):
+                self.assertTrue(
+                    np.array_equal(store.get("unps", i), unps)
+                    and store.get("unps", i).ndim == 1,
+                    msg=f"1D array {i} not returned as stored",
+                )
+
+            with self.assertRaises(ValueError, msg="Stored arrays should be read-only"):
+                store.get("matxs", 0)[0, 0] = 1.0
+
+    def test_attach_from_workers(self):
+        """
+        Worker processes should read the same arrays by attaching with the handle.
+        """
+
+        with shared_memory_utils.SharedArrayStore.create(
+            {"matxs": self.matxs}
+        ) as store:
+
+            with Pool(processes=2) as pool:
+                sums = pool.starmap(
+                    sum_stored_array,
+                    [(store.handle, i) for i in range(len(self.matxs))],
+                )
+
+        self.assertTrue(
+            np.allclose(sums, [matx.sum() for matx in self.matxs]),
+            msg="Workers do not read the stored arrays",
+        )
+
+
+# Run unit tests on call of script
+if __name__ == "__main__":
+
+    unittest.main()